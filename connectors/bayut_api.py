@@ -15,7 +15,9 @@ from loguru import logger
 from core.config import settings
 from core.models import Listing
 from core.utils import normalize_location_name, normalize_rooms_bucket, calculate_price_per_sqft
+from core.location_names import resolve_location_name
 from core.api_manager import get_api_status
+from core.http_client import http_client
 
 
 class BayutAPIConnector:
@@ -151,7 +153,7 @@ class BayutAPIConnector:
 
             logger.info(f"Recuperation annonces Bayut RapidAPI : {community or 'toutes zones'}")
 
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.post(url, headers=headers, json=body)
                 response.raise_for_status()
                 data = response.json()
@@ -222,7 +224,7 @@ class BayutAPIConnector:
             
             logger.info(f"Recuperation transactions Bayut : page {page}")
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.post(url, headers=headers, json=body, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -291,7 +293,7 @@ class BayutAPIConnector:
             
             logger.info(f"Recherche propriétés Bayut : {location or 'toutes zones'}")
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.post(url, headers=headers, json=body, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -323,7 +325,7 @@ class BayutAPIConnector:
             headers = self._get_headers()
             params = {"query": query, "page": page}
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -358,7 +360,7 @@ class BayutAPIConnector:
             headers = self._get_headers()
             params = {"langs": langs}
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 return response.json()
@@ -443,7 +445,7 @@ class BayutAPIConnector:
             
             logger.info(f"Recherche projets off-plan : page {page}")
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.post(url, headers=headers, json=body, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -489,7 +491,7 @@ class BayutAPIConnector:
                 "langs": langs
             }
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -520,7 +522,7 @@ class BayutAPIConnector:
             headers = self._get_headers()
             params = {"query": query, "page": page, "langs": langs}
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -550,7 +552,7 @@ class BayutAPIConnector:
             headers = self._get_headers()
             params = {"langs": langs}
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 return response.json()
@@ -583,7 +585,7 @@ class BayutAPIConnector:
             headers = self._get_headers()
             params = {"query": query, "page": page, "langs": langs}
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -618,7 +620,7 @@ class BayutAPIConnector:
             headers = self._get_headers()
             params = {"query": query, "page": page, "langs": langs}
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -665,7 +667,7 @@ class BayutAPIConnector:
             if location_ids:
                 params["locations_ids"] = ",".join(map(str, location_ids))
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -695,7 +697,7 @@ class BayutAPIConnector:
             headers = self._get_headers()
             params = {"langs": langs}
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -725,7 +727,7 @@ class BayutAPIConnector:
             headers = self._get_headers()
             params = {"langs": langs}
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 return response.json()
@@ -756,7 +758,7 @@ class BayutAPIConnector:
             headers = self._get_headers()
             params = {"query": query}
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -793,7 +795,7 @@ class BayutAPIConnector:
             headers = self._get_headers()
             params = {"location_slug": location_slug}
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 return response.json()
@@ -957,7 +959,7 @@ class BayutAPIConnector:
                     listing_date=listing_date,
                     source="bayut",
                     
-                    community=normalize_location_name(community_name),
+                    community=resolve_location_name(community_name, level="area"),
                     project=normalize_location_name(project_name),
                     building=normalize_location_name(building_name),
                     
@@ -21,6 +21,7 @@ from loguru import logger
 from core.config import settings
 from core.models import PlanningPermit, ZoningChange
 from core.utils import normalize_location_name
+from core.http_client import http_client
 
 
 class DDAConnector:
@@ -84,7 +85,7 @@ class DDAConnector:
             
             logger.info(f"[LOADING] Récupération permis de construire DDA : {start_date} → {end_date}")
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -143,7 +144,7 @@ class DDAConnector:
             
             logger.info(f"[LOADING] Récupération changements de zonage DDA : {start_date} → {end_date}")
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -3,9 +3,9 @@ Connecteur Developers - Pipeline de supply future
 """
 from typing import List, Optional, Dict
 from datetime import date
-import httpx
 from loguru import logger
 from core.config import settings
+from core.http_client import http_client
 
 
 class DevelopersPipelineConnector:
@@ -33,7 +33,7 @@ class DevelopersPipelineConnector:
                 "Content-Type": "application/json"
             }
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers)
                 response.raise_for_status()
                 data = response.json()
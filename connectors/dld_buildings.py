@@ -4,6 +4,7 @@ Connecteur DLD - Buildings via Dubai Pulse API
 from typing import List, Dict, Optional
 import httpx
 from loguru import logger
+from core.http_client import http_client
 from connectors.dubai_pulse_auth import get_dubai_pulse_auth
 
 
@@ -66,7 +67,7 @@ class DLDBuildingsConnector:
             
             logger.info(f"🔄 Récupération bâtiments DLD...")
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
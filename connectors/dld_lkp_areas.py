@@ -11,8 +11,7 @@ Données disponibles :
 - Noms en anglais et arabe
 - Mapping pour normalisation des noms de zones
 """
-from typing import List, Optional, Dict
-import httpx
+from typing import List, Optional, Dict, Tuple
 from loguru import logger
 from core.config import settings
 from pydantic import BaseModel
@@ -36,6 +35,18 @@ class DLDLkpAreasConnector:
     Permet de récupérer la hiérarchie officielle des zones de Dubai
     """
     
+    # Abréviations courantes des zones (variantes du mapping de normalisation)
+    AREA_ABBREVIATIONS = {
+        "Jumeirah Beach Residence": "JBR",
+        "Jumeirah Village Circle": "JVC",
+        "Jumeirah Village Triangle": "JVT",
+        "Dubai International Financial Centre": "DIFC",
+        "Dubai Media City": "DMC",
+        "Dubai Internet City": "DIC",
+        "Dubai Marina": "Marina",
+        "Business Bay": "BB",
+    }
+    
     def __init__(self):
         self.api_key = settings.dld_api_key
         self.api_secret = settings.dld_api_secret
@@ -69,18 +80,19 @@ class DLDLkpAreasConnector:
             logger.info("Récupération hiérarchie zones DLD via Dubai Pulse API")
             
             # TODO: Implémenter l'appel API réel quand les credentials seront disponibles
+            # (client partagé : la réponse est mise en cache disque, cf. core.http_cache)
             # headers = {
             #     "Authorization": f"Bearer {self._get_access_token()}",
             #     "Content-Type": "application/json"
             # }
             # 
-            # response = httpx.get(
-            #     f"{self.base_url}/dld_lkp_areas",
-            #     headers=headers,
-            #     timeout=self.timeout
-            # )
-            # response.raise_for_status()
-            # data = response.json()
+            # with http_client(self.timeout) as client:
+            #     response = client.get(
+            #         f"{self.base_url}/open/dld/dld_lkp_areas",
+            #         headers=headers
+            #     )
+            #     response.raise_for_status()
+            #     data = response.json()
             # self._areas_cache = self._parse_areas(data)
             
             self._areas_cache = self._generate_mock_data()
@@ -160,20 +172,53 @@ class DLDLkpAreasConnector:
         """
         Normaliser un nom de zone selon la nomenclature officielle DLD
         
+        Passe par le dictionnaire d'alias DLD partagé
+        (core.location_names.official_location_names), construit une fois
+        par process à partir de build_area_mapping : les graphies observées
+        dans les transactions n'interviennent pas.
+        
         Args:
             name: Nom de zone à normaliser
             
         Returns:
             Nom normalisé ou nom original si non trouvé
         """
-        if not self._area_mapping:
-            self._build_area_mapping()
+        from core.location_names import official_location_names
         
-        name_lower = name.lower().strip()
-        return self._area_mapping.get(name_lower, name)
+        return official_location_names.lookup(name) or name
+    
+    def resolve_area_name(self, name: str) -> str:
+        """
+        Résoudre un nom de zone approximatif (annonces, APIs tierces)
+
+        Alias exact (nomenclature DLD et graphies observées dans les
+        transactions), avec repli sur la zone la plus proche par similarité
+        de trigrammes (core.location_index).
+        
+        Args:
+            name: Nom de zone brut ("jumeira village circle", "Barsha South")
+            
+        Returns:
+            Nom officiel ou nom normalisé si aucune zone n'est assez proche
+        """
+        from core.location_names import location_names
+        
+        return location_names.resolve(name, level="area") or name
+    
+    def search_area_names(self, name: str, k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Zones les plus proches d'un nom (similarité 0-1 décroissante)
+        
+        Args:
+            name: Nom recherché
+            k: Nombre de candidats
+        """
+        from core.location_names import location_names
+        
+        return [(match, score) for match, score, _ in location_names.search(name, k=k, level="area")]
     
-    def _build_area_mapping(self):
-        """Construire le mapping de normalisation des noms"""
+    def build_area_mapping(self) -> Dict[str, str]:
+        """Construire le mapping de normalisation des noms (variante -> nom officiel)"""
         areas = self.fetch_areas()
         self._area_mapping = {}
         
@@ -185,6 +230,8 @@ class DLDLkpAreasConnector:
             variants = self._get_name_variants(area.area_name_en)
             for variant in variants:
                 self._area_mapping[variant.lower()] = area.area_name_en
+        
+        return self._area_mapping
     
     def _get_name_variants(self, name: str) -> List[str]:
         """Générer des variantes de noms pour le mapping"""
@@ -195,19 +242,8 @@ class DLDLkpAreasConnector:
         variants.append(name.replace("_", " "))
         
         # Variantes abrégées
-        abbrev_map = {
-            "Jumeirah Beach Residence": "JBR",
-            "Jumeirah Village Circle": "JVC",
-            "Jumeirah Village Triangle": "JVT",
-            "Dubai International Financial Centre": "DIFC",
-            "Dubai Media City": "DMC",
-            "Dubai Internet City": "DIC",
-            "Dubai Marina": "Marina",
-            "Business Bay": "BB",
-        }
-        
-        if name in abbrev_map:
-            variants.append(abbrev_map[name])
+        if name in self.AREA_ABBREVIATIONS:
+            variants.append(self.AREA_ABBREVIATIONS[name])
         
         return variants
     
@@ -8,15 +8,21 @@ from loguru import logger
 from core.config import settings
 from core.models import Mortgage
 from core.utils import normalize_location_name
+from core.http_client import http_client
 
 
 class DLDMortgagesConnector:
-    """Connecteur pour les hypothèques DLD"""
+    """
+    Connecteur pour les hypothèques DLD
+    
+    last_fetch_complete est faux après un appel servi en mode simulation.
+    """
     
     def __init__(self):
         self.api_key = settings.dld_api_key
         self.base_url = settings.dld_api_base_url
         self.timeout = 30.0
+        self.last_fetch_complete = False
     
     def fetch_mortgages(
         self, 
@@ -24,6 +30,7 @@ class DLDMortgagesConnector:
         end_date: Optional[date] = None
     ) -> List[Mortgage]:
         """Récupérer les hypothèques DLD"""
+        self.last_fetch_complete = False
         if not self.api_key:
             logger.warning("DLD_API_KEY non configurée - mode simulation")
             return self._generate_mock_data(start_date, end_date)
@@ -44,13 +51,14 @@ class DLDMortgagesConnector:
                 "end_date": end_date.isoformat()
             }
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
             
             mortgages = self._parse_response(data)
             logger.info(f"DLD mortgages récupérées : {len(mortgages)}")
+            self.last_fetch_complete = True
             return mortgages
         
         except httpx.HTTPError as e:
@@ -16,6 +16,7 @@ from loguru import logger
 from core.config import settings
 from core.models import RentalIndex
 from core.utils import normalize_location_name
+from core.http_client import http_client
 from connectors.dubai_pulse_auth import get_dubai_pulse_auth
 
 
@@ -71,7 +72,7 @@ class DLDRentalIndexConnector:
             
             logger.info(f"🔄 Récupération index locatif DLD : {period_date}")
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -7,17 +7,24 @@ Sources de données :
 
 Documentation Bayut : https://docs.bayutapi.com/
 """
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from datetime import date, timedelta
 from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import math
 import httpx
 from loguru import logger
 from core.config import settings
 from core.models import Transaction
 from core.utils import normalize_rooms_bucket, calculate_price_per_sqft, normalize_location_name
+from core.http_client import http_client
 from connectors.dubai_pulse_auth import get_dubai_pulse_auth
 
 
+class IncompleteFetchError(RuntimeError):
+    """Récupération stricte impossible ou incomplète (pas de source réelle, pagination tronquée)"""
+
+
 class DLDTransactionsConnector:
     """
     Connecteur pour les transactions DLD
@@ -26,12 +33,22 @@ class DLDTransactionsConnector:
     1. Bayut RapidAPI /transactions (prioritaire si clé configurée)
     2. Dubai Pulse API dld_transactions-open-api (fallback)
     
+    Mode strict (strict=True) : les erreurs HTTP sont propagées, sans repli
+    MOCK ni résultat partiel ; une pagination tronquée ou l'absence de
+    source configurée lèvent IncompleteFetchError.
+    
+    last_fetch_complete indique si le dernier appel a récupéré toutes les
+    pages depuis une source réelle (faux après un repli MOCK ou un
+    résultat partiel) ; l'ingestion incrémentale n'avance son watermark
+    que dans ce cas.
+    
     Documentation Bayut : https://docs.bayutapi.com/
     """
     
     # Bayut RapidAPI
     RAPIDAPI_HOST = "uae-real-estate2.p.rapidapi.com"
     RAPIDAPI_BASE_URL = "https://uae-real-estate2.p.rapidapi.com"
+    BAYUT_PAGE_SIZE = 20
     
     def __init__(self):
         self.auth = get_dubai_pulse_auth()
@@ -41,6 +58,8 @@ class DLDTransactionsConnector:
         
         # RapidAPI (Bayut)
         self.rapidapi_key = settings.bayut_api_key
+        
+        self.last_fetch_complete = False
     
     def _get_rapidapi_headers(self) -> dict:
         """Headers pour RapidAPI Bayut"""
@@ -54,7 +73,8 @@ class DLDTransactionsConnector:
         self, 
         start_date: Optional[date] = None, 
         end_date: Optional[date] = None,
-        limit: int = 10000
+        limit: int = 10000,
+        strict: bool = False
     ) -> List[Transaction]:
         """
         Récupérer les transactions DLD
@@ -62,95 +82,222 @@ class DLDTransactionsConnector:
         Priorité des sources :
         1. Bayut RapidAPI (si BAYUT_API_KEY configurée)
         2. Dubai Pulse API (si DLD_API_KEY configurée)
-        3. Données MOCK (fallback)
+        3. Données MOCK (fallback, jamais en mode strict)
         
         Args:
             start_date: Date de début (défaut: 30 jours)
             end_date: Date de fin (défaut: aujourd'hui)
             limit: Nombre max de résultats (défaut: 10000)
+            strict: Lever une exception plutôt que renvoyer des données MOCK ou partielles
             
         Returns:
             Liste de transactions
         """
+        self.last_fetch_complete = False
+        
         # Priorité 1 : Bayut RapidAPI
         if self.rapidapi_key:
             logger.info("Utilisation de Bayut RapidAPI pour les transactions DLD")
-            return self._fetch_via_bayut(start_date, end_date)
+            return self._fetch_via_bayut(start_date, end_date, strict)
         
         # Priorité 2 : Dubai Pulse API
         try:
             self.auth.get_access_token()
-            logger.info("Utilisation de Dubai Pulse API pour les transactions DLD")
-            return self._fetch_via_dubai_pulse(start_date, end_date, limit)
         except ValueError:
+            if strict:
+                raise IncompleteFetchError("Aucune API de transactions configurée (BAYUT_API_KEY ou DLD_API_KEY)")
             logger.warning("Aucune API configurée - utilisation de données MOCK")
             logger.warning("Configure BAYUT_API_KEY ou DLD_API_KEY pour données réelles")
             return self._generate_mock_data(start_date, end_date)
+        
+        logger.info("Utilisation de Dubai Pulse API pour les transactions DLD")
+        return self._fetch_via_dubai_pulse(start_date, end_date, limit, strict)
+    
+    def iter_transactions(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        limit: int = 10000,
+        strict: bool = False
+    ) -> Iterator[List[Transaction]]:
+        """
+        Streamer les transactions DLD par paquets
+        
+        Même priorité de sources que fetch_transactions ; avec Bayut, chaque
+        paquet correspond à une page, transmise dès sa réception.
+        """
+        self.last_fetch_complete = False
+        if self.rapidapi_key:
+            logger.info("Utilisation de Bayut RapidAPI pour les transactions DLD")
+            yield from self._iter_via_bayut(start_date, end_date, strict)
+        else:
+            yield self.fetch_transactions(start_date, end_date, limit, strict)
     
     def _fetch_via_bayut(
         self,
         start_date: Optional[date],
-        end_date: Optional[date]
+        end_date: Optional[date],
+        strict: bool = False
     ) -> List[Transaction]:
         """Récupérer les transactions via Bayut RapidAPI"""
+        return [tx for batch in self._iter_via_bayut(start_date, end_date, strict) for tx in batch]
+    
+    def _iter_via_bayut(
+        self,
+        start_date: Optional[date],
+        end_date: Optional[date],
+        strict: bool = False
+    ) -> Iterator[List[Transaction]]:
+        """
+        Streamer les transactions Bayut page par page
         
+        Repli sur les données MOCK si la première page échoue ; une erreur
+        sur une page suivante arrête la pagination (résultat partiel).
+        En mode strict, toute erreur est propagée.
+        """
         # Dates par défaut : 30 derniers jours
         if not end_date:
             end_date = date.today()
         if not start_date:
             start_date = end_date - timedelta(days=30)
         
-        all_transactions = []
-        page = 0
-        max_pages = 10  # Limite de sécurité
+        fetched = 0
         
         try:
-            while page < max_pages:
-                url = f"{self.RAPIDAPI_BASE_URL}/transactions"
-                headers = self._get_rapidapi_headers()
-                
-                body = {
-                    "purpose": "for-sale",
-                    "category": "residential",
-                    "sort_by": "date",
-                    "order": "desc",
-                    "start_date": start_date.isoformat(),
-                    "end_date": end_date.isoformat()
-                }
-                
-                params = {"page": page}
-                
-                logger.info(f"Recuperation transactions Bayut : page {page}")
-                
-                with httpx.Client(timeout=self.timeout) as client:
-                    response = client.post(url, headers=headers, json=body, params=params)
-                    response.raise_for_status()
-                    data = response.json()
-                
-                results = data.get("results", [])
-                if not results:
-                    break
-                
-                transactions = self._parse_bayut_transactions(results)
-                all_transactions.extend(transactions)
-                
-                # Si moins de 20 résultats, c'est la dernière page
-                if len(results) < 20:
-                    break
-                
-                page += 1
+            for transactions in self._iter_bayut_pages(start_date, end_date, strict):
+                fetched += len(transactions)
+                yield transactions
             
-            logger.info(f"{len(all_transactions)} transactions DLD via Bayut")
-            return all_transactions
+            logger.info(f"{fetched} transactions DLD via Bayut")
             
         except httpx.HTTPError as e:
             logger.error(f"Erreur HTTP Bayut transactions : {e}")
             if hasattr(e, 'response') and e.response is not None:
                 logger.error(f"Reponse : {e.response.text[:500]}")
-            return self._generate_mock_data(start_date, end_date)
+            if strict:
+                raise
+            if not fetched:
+                yield self._generate_mock_data(start_date, end_date)
         except Exception as e:
             logger.error(f"Erreur Bayut transactions : {e}")
-            return self._generate_mock_data(start_date, end_date)
+            if strict:
+                raise
+            if not fetched:
+                yield self._generate_mock_data(start_date, end_date)
+    
+    def _iter_bayut_pages(
+        self,
+        start_date: date,
+        end_date: date,
+        strict: bool = False
+    ) -> Iterator[List[Transaction]]:
+        """
+        Pagination Bayut concurrente
+        
+        La première page donne la taille de page et, si la réponse l'indique,
+        le nombre total de pages : les pages restantes sont alors récupérées
+        en parallèle. Sinon, les pages sont demandées par vagues concurrentes
+        jusqu'à la première page incomplète. Plafond : bayut_transactions_max_pages
+        (IncompleteFetchError en mode strict s'il est atteint).
+        """
+        max_pages = settings.bayut_transactions_max_pages
+        concurrency = max(1, settings.bayut_max_concurrency)
+        
+        first = self._fetch_bayut_page(start_date, end_date, 0)
+        results = first.get("results", [])
+        if not results:
+            self.last_fetch_complete = True
+            return
+        
+        yield self._parse_bayut_transactions(results)
+        
+        # Si moins de 20 résultats, c'est la dernière page
+        page_size = len(results)
+        if page_size < self.BAYUT_PAGE_SIZE:
+            self.last_fetch_complete = True
+            return
+        
+        page_count = self._bayut_page_count(first, page_size)
+        truncated = False
+        
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            if page_count is not None:
+                truncated = page_count > max_pages
+                logger.info(f"Transactions Bayut : {page_count} pages à récupérer")
+                
+                futures = [
+                    executor.submit(self._fetch_bayut_page, start_date, end_date, page)
+                    for page in range(1, min(page_count, max_pages))
+                ]
+                for future in as_completed(futures):
+                    page_results = future.result().get("results", [])
+                    if page_results:
+                        yield self._parse_bayut_transactions(page_results)
+            else:
+                # Nombre de pages inconnu : vagues de pages consécutives
+                next_page = 1
+                exhausted = False
+                while not exhausted and next_page < max_pages:
+                    wave = range(next_page, min(next_page + concurrency, max_pages))
+                    pages = executor.map(
+                        lambda page: self._fetch_bayut_page(start_date, end_date, page), wave
+                    )
+                    for data in pages:
+                        page_results = data.get("results", [])
+                        if page_results:
+                            yield self._parse_bayut_transactions(page_results)
+                        if len(page_results) < page_size:
+                            exhausted = True
+                            break
+                    next_page = wave.stop
+                truncated = not exhausted
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        
+        if truncated:
+            if strict:
+                raise IncompleteFetchError(f"Plafond de {max_pages} pages Bayut atteint ({start_date} -> {end_date})")
+            logger.warning(f"Plafond de {max_pages} pages Bayut atteint : transactions tronquées")
+        else:
+            self.last_fetch_complete = True
+    
+    def _fetch_bayut_page(self, start_date: date, end_date: date, page: int) -> dict:
+        """Récupérer une page brute de transactions Bayut"""
+        url = f"{self.RAPIDAPI_BASE_URL}/transactions"
+        headers = self._get_rapidapi_headers()
+        
+        body = {
+            "purpose": "for-sale",
+            "category": "residential",
+            "sort_by": "date",
+            "order": "desc",
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat()
+        }
+        
+        params = {"page": page}
+        
+        logger.info(f"Recuperation transactions Bayut : page {page}")
+        
+        with http_client(self.timeout) as client:
+            response = client.post(url, headers=headers, json=body, params=params)
+            response.raise_for_status()
+            return response.json()
+    
+    def _bayut_page_count(self, data: dict, page_size: int) -> Optional[int]:
+        """Nombre total de pages annoncé par la réponse Bayut (None si absent)"""
+        pagination = data.get("pagination") or {}
+        
+        for pages in (data.get("nbPages"), data.get("total_pages"), pagination.get("total_pages")):
+            if isinstance(pages, int) and pages > 0:
+                return pages
+        
+        for total in (data.get("nbHits"), data.get("total"), data.get("count"), pagination.get("total")):
+            if isinstance(total, int) and total > 0:
+                return math.ceil(total / page_size)
+        
+        return None
     
     def _parse_bayut_transactions(self, results: list) -> List[Transaction]:
         """Parser les transactions depuis Bayut RapidAPI"""
@@ -269,9 +416,10 @@ class DLDTransactionsConnector:
         self,
         start_date: Optional[date],
         end_date: Optional[date],
-        limit: int
+        limit: int,
+        strict: bool = False
     ) -> List[Transaction]:
-        """Récupérer les transactions via Dubai Pulse API"""
+        """Récupérer les transactions via Dubai Pulse API (repli MOCK sauf en mode strict)"""
         
         # Dates par défaut : dernières 24h
         if not end_date:
@@ -292,24 +440,29 @@ class DLDTransactionsConnector:
             
             logger.info(f"Recuperation transactions DLD Dubai Pulse : {start_date} -> {end_date}")
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
             
             transactions = self._parse_response(data)
             logger.info(f"{len(transactions)} transactions DLD Dubai Pulse recuperees")
+            self.last_fetch_complete = True
             return transactions
         
         except httpx.HTTPError as e:
             logger.error(f"Erreur HTTP Dubai Pulse API : {e}")
             if hasattr(e, 'response') and e.response is not None:
                 logger.error(f"Reponse : {e.response.text[:500]}")
+            if strict:
+                raise
             # Fallback sur données mock en cas d'erreur
             logger.warning("Fallback sur donnees MOCK")
             return self._generate_mock_data(start_date, end_date)
         except Exception as e:
             logger.error(f"Erreur DLD transactions : {e}")
+            if strict:
+                raise
             logger.warning("Fallback sur donnees MOCK")
             return self._generate_mock_data(start_date, end_date)
     
@@ -6,6 +6,7 @@ from typing import Optional
 from datetime import datetime, timedelta
 from loguru import logger
 from core.config import settings
+from core.http_client import http_client
 
 
 class DubaiPulseAuth:
@@ -63,7 +64,7 @@ class DubaiPulseAuth:
             )
         
         try:
-            with httpx.Client(timeout=30.0) as client:
+            with http_client(30.0) as client:
                 response = client.post(
                     self.oauth_url,
                     data={
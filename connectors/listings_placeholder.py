@@ -3,9 +3,9 @@ Connecteur Listings - Annonces autorisées UNIQUEMENT
 """
 from typing import List, Optional, Dict
 from datetime import date, timedelta
-import httpx
 from loguru import logger
 from core.config import settings
+from core.http_client import http_client
 
 
 class ListingsConnector:
@@ -42,7 +42,7 @@ class ListingsConnector:
             if community:
                 params["community"] = community
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(self.api_url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
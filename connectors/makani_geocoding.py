@@ -15,12 +15,20 @@ Documentation : https://geohub.dubaipulse.gov.ae
 """
 from typing import Optional, Dict, List, Tuple
 from decimal import Decimal
+import asyncio
 import httpx
 from loguru import logger
 from core.config import settings
 from core.models import MakaniAddress
 from core.utils import normalize_location_name
 from core.api_manager import get_api_status
+from core.geocode_cache import GeocodeCache, location_key
+from core.http_client import async_http_client, http_client
+from core.rate_limit import TokenBucket
+
+
+# Débit Makani partagé par toutes les instances et tous les batchs du process
+_rate_limiter = TokenBucket(settings.makani_rate_limit_per_second)
 
 
 class MakaniGeocodingConnector:
@@ -35,10 +43,12 @@ class MakaniGeocodingConnector:
     - Métadonnées de localisation
     """
     
-    def __init__(self):
+    def __init__(self, cache: Optional[GeocodeCache] = None):
         self.api_key = settings.makani_api_key
         self.base_url = settings.makani_api_url or "https://api.dubaipulse.gov.ae/makani"
         self.timeout = 30.0
+        self.max_retries = settings.makani_max_retries
+        self.cache = cache
     
     def search_address(
         self, 
@@ -70,31 +80,27 @@ class MakaniGeocodingConnector:
         self,
         community: Optional[str],
         project: Optional[str],
-        building: Optional[str]
+        building: Optional[str],
+        raise_errors: bool = False
     ) -> Optional[MakaniAddress]:
-        """Récupération des vraies données API"""
+        """
+        Récupération des vraies données API
+        
+        Args:
+            raise_errors: Propager les erreurs API au lieu de retourner None
+                (distingue « adresse inconnue » d'un échec, cf. batch_search)
+        """
         
         try:
             # Construire la requête de recherche
-            query_parts = []
-            if building:
-                query_parts.append(building)
-            if project:
-                query_parts.append(project)
-            if community:
-                query_parts.append(community)
-            
-            search_query = ", ".join(query_parts)
+            search_query = self._build_search_query(community, project, building)
             
             if not search_query:
                 logger.warning("Aucun critère de recherche fourni")
                 return None
             
             url = f"{self.base_url}/search"
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
+            headers = self._headers()
             params = {
                 "query": search_query,
                 "limit": 1
@@ -102,7 +108,7 @@ class MakaniGeocodingConnector:
             
             logger.debug(f"[SEARCH] Recherche Makani : {search_query}")
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -117,11 +123,77 @@ class MakaniGeocodingConnector:
         
         except httpx.HTTPError as e:
             logger.error(f"[ERROR] Erreur HTTP Makani API : {e}")
+            if raise_errors:
+                raise
             return None
         except Exception as e:
             logger.error(f"[ERROR] Erreur Makani API : {e}")
+            if raise_errors:
+                raise
             return None
     
+    async def _afetch_real_address(
+        self,
+        client: httpx.AsyncClient,
+        community: Optional[str],
+        project: Optional[str],
+        building: Optional[str]
+    ) -> Optional[MakaniAddress]:
+        """
+        Variante asynchrone de _fetch_real_address (cf. abatch_search)
+        
+        Client partagé, limitation de débit commune au process, retry avec
+        backoff exponentiel sur erreurs réseau, 429 et 5xx. Les erreurs
+        définitives sont propagées.
+        """
+        search_query = self._build_search_query(community, project, building)
+        if not search_query:
+            return None
+        
+        url = f"{self.base_url}/search"
+        params = {
+            "query": search_query,
+            "limit": 1
+        }
+        
+        attempt = 0
+        while True:
+            await _rate_limiter.aacquire()
+            try:
+                response = await client.get(url, params=params)
+                response.raise_for_status()
+                data = response.json()
+                break
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                delay = _retry_delay(e, attempt)
+                logger.debug(f"Makani : nouvel essai dans {delay:.1f}s ({e})")
+                await asyncio.sleep(delay)
+                attempt += 1
+        
+        if not data.get("results"):
+            logger.debug(f"Aucun résultat Makani pour : {search_query}")
+            return None
+        
+        return self._parse_address(data["results"][0])
+    
+    def _build_search_query(
+        self,
+        community: Optional[str],
+        project: Optional[str],
+        building: Optional[str]
+    ) -> str:
+        """Requête texte Makani : « building, project, community »"""
+        return ", ".join(part for part in (building, project, community) if part)
+    
+    def _headers(self) -> Dict[str, str]:
+        """En-têtes d'authentification Makani"""
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+    
     def get_by_makani_number(self, makani_number: str) -> Optional[MakaniAddress]:
         """
         Récupérer une adresse par son numéro Makani
@@ -143,7 +215,7 @@ class MakaniGeocodingConnector:
                 "Content-Type": "application/json"
             }
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers)
                 response.raise_for_status()
                 data = response.json()
@@ -185,7 +257,7 @@ class MakaniGeocodingConnector:
                 "lon": longitude
             }
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -337,17 +409,144 @@ class MakaniGeocodingConnector:
         """
         Recherche en batch pour optimiser les appels API
         
+        Le cache persistant (si configuré) est consulté avant tout appel :
+        seules les localisations absentes ou expirées interrogent l'API, et
+        leurs résultats (y compris « non trouvé ») y sont enregistrés. Les
+        erreurs API et les adresses mock ne sont jamais mises en cache.
+        
         Args:
             locations: Liste de tuples (community, project, building)
             
         Returns:
             Dict avec clé = "community|project|building", valeur = MakaniAddress
         """
-        results = {}
+        pending, results, to_fetch = self._prepare_batch(locations)
+        fetched, transient = {}, {}
         
+        if to_fetch and not get_api_status('makani'):
+            transient = {
+                cache_key: self._generate_mock_address(*location)
+                for cache_key, location in to_fetch.items()
+            }
+        else:
+            for cache_key, (community, project, building) in to_fetch.items():
+                try:
+                    fetched[cache_key] = self._fetch_real_address(community, project, building, raise_errors=True)
+                except Exception:
+                    continue
+        
+        return self._finish_batch(pending, results, fetched, transient, len(to_fetch))
+    
+    async def abatch_search(
+        self,
+        locations: List[Tuple[str, str, str]],
+        concurrency: Optional[int] = None
+    ) -> Dict[str, Optional[MakaniAddress]]:
+        """
+        Recherche en batch concurrente (asyncio)
+        
+        Même contrat et même cache que batch_search, mais les appels API
+        partagent un httpx.AsyncClient et s'exécutent en parallèle, bornés
+        par un sémaphore, limités en débit par hôte et relancés avec
+        backoff en cas d'erreur transitoire.
+        
+        Args:
+            locations: Liste de tuples (community, project, building)
+            concurrency: Appels simultanés max (défaut settings.makani_concurrency)
+            
+        Returns:
+            Dict avec clé = "community|project|building", valeur = MakaniAddress
+        """
+        pending, results, to_fetch = self._prepare_batch(locations)
+        fetched, transient = {}, {}
+        
+        if to_fetch and not get_api_status('makani'):
+            transient = {
+                cache_key: self._generate_mock_address(*location)
+                for cache_key, location in to_fetch.items()
+            }
+        elif to_fetch:
+            semaphore = asyncio.Semaphore(concurrency or settings.makani_concurrency)
+            
+            async with async_http_client(self.timeout, headers=self._headers()) as client:
+                async def fetch_one(cache_key: str, location: Tuple[str, str, str]):
+                    async with semaphore:
+                        try:
+                            fetched[cache_key] = await self._afetch_real_address(client, *location)
+                        except Exception as e:
+                            logger.error(f"[ERROR] Erreur Makani API ({', '.join(filter(None, location))}) : {e}")
+                
+                await asyncio.gather(*(
+                    fetch_one(cache_key, location) for cache_key, location in to_fetch.items()
+                ))
+        
+        return self._finish_batch(pending, results, fetched, transient, len(to_fetch))
+    
+    def _prepare_batch(
+        self,
+        locations: List[Tuple[str, str, str]]
+    ) -> Tuple[Dict[str, Tuple], Dict[str, Optional[MakaniAddress]], Dict[str, Tuple[str, str, str]]]:
+        """
+        Résoudre un batch depuis le cache persistant
+        
+        Returns:
+            (pending, results, to_fetch) : clé de résultat -> (localisation,
+            clé de cache), résultats déjà connus, et localisations à
+            interroger, dédoublonnées par clé de cache
+        """
+        pending = {}
         for community, project, building in locations:
             key = f"{community or ''}|{project or ''}|{building or ''}"
-            address = self.search_address(community, project, building)
-            results[key] = address
+            pending[key] = ((community, project, building), location_key(community, project, building))
+        
+        cached = self.cache.get_many(cache_key for _, cache_key in pending.values()) if self.cache else {}
+        
+        results = {}
+        to_fetch = {}
+        for key, (location, cache_key) in pending.items():
+            if cache_key in cached:
+                results[key] = cached[cache_key]
+            else:
+                to_fetch.setdefault(cache_key, location)
+        
+        return pending, results, to_fetch
+    
+    def _finish_batch(
+        self,
+        pending: Dict[str, Tuple],
+        results: Dict[str, Optional[MakaniAddress]],
+        fetched: Dict[str, Optional[MakaniAddress]],
+        transient: Dict[str, MakaniAddress],
+        lookups: int
+    ) -> Dict[str, Optional[MakaniAddress]]:
+        """Compléter les résultats d'un batch et persister les réponses API"""
+        for key, (_, cache_key) in pending.items():
+            if key not in results:
+                results[key] = fetched.get(cache_key, transient.get(cache_key))
+        
+        if self.cache and fetched:
+            self.cache.put_many(fetched)
+        
+        logger.debug(
+            f"Makani batch : {len(pending)} localisations, "
+            f"{len(pending) - lookups} résolues sans appel, {lookups} recherches"
+        )
         
         return results
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Erreur transitoire : réseau, 429 ou 5xx"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """Délai avant nouvel essai : Retry-After si fourni, sinon backoff exponentiel"""
+    if isinstance(error, httpx.HTTPStatusError):
+        retry_after = error.response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+    return settings.makani_retry_backoff_seconds * (2 ** attempt)
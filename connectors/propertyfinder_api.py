@@ -9,11 +9,12 @@ Documentation : https://rapidapi.com/market-data-point1-market-data-point-defaul
 from typing import List, Optional, Dict
 from datetime import date
 from decimal import Decimal
-import httpx
 from loguru import logger
 from core.config import settings
 from core.models import Listing
-from core.utils import normalize_location_name, normalize_rooms_bucket, calculate_price_per_sqft
+from core.utils import normalize_rooms_bucket, calculate_price_per_sqft
+from core.location_names import resolve_location_name
+from core.http_client import http_client
 
 
 class PropertyFinderAPIConnector:
@@ -110,7 +111,7 @@ class PropertyFinderAPIConnector:
             
             logger.info(f"PropertyFinder search : {location_name or 'all'}, page {page}")
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -197,7 +198,7 @@ class PropertyFinderAPIConnector:
                     listing_date=None,  # Non disponible
                     source="propertyfinder",
                     
-                    community=normalize_location_name(location_name),
+                    community=resolve_location_name(location_name, level="area"),
                     project=None,
                     building=None,
                     
@@ -9,11 +9,12 @@ Documentation: https://rapidapi.com/uae-real-estate-data-real-time-api
 from typing import List, Optional, Dict
 from datetime import date
 from decimal import Decimal
-import httpx
 from loguru import logger
 from core.config import settings
 from core.models import Listing
-from core.utils import normalize_location_name, normalize_rooms_bucket, calculate_price_per_sqft
+from core.utils import normalize_rooms_bucket, calculate_price_per_sqft
+from core.location_names import resolve_location_name
+from core.http_client import http_client
 
 
 class UAERealTimeAPIConnector:
@@ -79,7 +80,7 @@ class UAERealTimeAPIConnector:
             
             logger.info(f"UAE RealTime agents directory : page {page}")
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 return response.json()
@@ -123,7 +124,7 @@ class UAERealTimeAPIConnector:
             if location:
                 params["location"] = location
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -166,7 +167,7 @@ class UAERealTimeAPIConnector:
             
             logger.info(f"UAE RealTime agencies directory : page {page}")
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 return response.json()
@@ -231,7 +232,7 @@ class UAERealTimeAPIConnector:
             
             logger.info(f"UAE RealTime properties : {location or 'all'}, page {page}")
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -305,7 +306,7 @@ class UAERealTimeAPIConnector:
                     listing_date=None,
                     source="uae_realtime",
                     
-                    community=normalize_location_name(location_name),
+                    community=resolve_location_name(location_name, level="area"),
                     project=item.get("project"),
                     building=item.get("building"),
                     
@@ -397,7 +398,7 @@ class UAERealTimeAPIConnector:
             
             logger.info(f"UAE RealTime transactions : {location or 'all'}, page {page}")
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -8,11 +8,12 @@ Documentation : https://zylalabs.com/api-marketplace/real-estate/uae-real-estate
 from typing import List, Optional, Dict
 from datetime import date
 from decimal import Decimal
-import httpx
 from loguru import logger
 from core.config import settings
 from core.models import Listing
-from core.utils import normalize_location_name, normalize_rooms_bucket, calculate_price_per_sqft
+from core.utils import normalize_rooms_bucket, calculate_price_per_sqft
+from core.location_names import resolve_location_name
+from core.http_client import http_client
 
 
 class ZylaLabsAPIConnector:
@@ -81,7 +82,7 @@ class ZylaLabsAPIConnector:
                 "lang": lang
             }
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -130,7 +131,7 @@ class ZylaLabsAPIConnector:
             
             logger.info(f"Zyla properties : location {location_external_ids}, page {page}")
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 return response.json()
@@ -159,7 +160,7 @@ class ZylaLabsAPIConnector:
             
             logger.info(f"Zyla recent : {limit} propriétés")
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -188,7 +189,7 @@ class ZylaLabsAPIConnector:
             headers = self._get_headers()
             params = {"listing_id": listing_id}
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 return response.json()
@@ -228,7 +229,7 @@ class ZylaLabsAPIConnector:
             
             logger.info(f"Zyla search : '{query}'")
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 return response.json()
@@ -259,7 +260,7 @@ class ZylaLabsAPIConnector:
             headers = self._get_headers()
             params = {"query": query} if query else {}
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -296,7 +297,7 @@ class ZylaLabsAPIConnector:
             
             logger.info("Zyla market stats")
             
-            with httpx.Client(timeout=self.timeout) as client:
+            with http_client(self.timeout) as client:
                 response = client.get(url, headers=headers)
                 response.raise_for_status()
                 return response.json()
@@ -385,7 +386,7 @@ class ZylaLabsAPIConnector:
                 listing_date=None,
                 source="zylalabs",
                 
-                community=normalize_location_name(community),
+                community=resolve_location_name(community, level="area"),
                 project=item.get("title"),
                 building=None,
                 
@@ -38,6 +38,20 @@ class Settings(BaseSettings):
     # Table prefix (empty for local, "dld_" for Supabase)
     table_prefix: str = get_secret("TABLE_PREFIX", "")
     
+    # Pool de connexions PostgreSQL (psycopg_pool)
+    db_pool_enabled: bool = get_secret("DB_POOL_ENABLED", "false").lower() in ("1", "true", "yes")
+    db_pool_min_size: int = int(get_secret("DB_POOL_MIN_SIZE", "1"))
+    db_pool_max_size: int = int(get_secret("DB_POOL_MAX_SIZE", "10"))
+    db_pool_max_idle_seconds: float = float(get_secret("DB_POOL_MAX_IDLE_SECONDS", "300"))
+    db_pool_timeout_seconds: float = float(get_secret("DB_POOL_TIMEOUT_SECONDS", "30"))
+    
+    # Nombre de lignes à partir duquel execute_batch_insert passe en COPY
+    db_copy_threshold: int = int(get_secret("DB_COPY_THRESHOLD", "1000"))
+    # Taille des paquets envoyés en pipeline par execute_batch
+    db_batch_chunk_size: int = int(get_secret("DB_BATCH_CHUNK_SIZE", "500"))
+    # Lignes par paquet pour les lectures en streaming (iter_query)
+    db_stream_batch_size: int = int(get_secret("DB_STREAM_BATCH_SIZE", "5000"))
+    
     # OpenAI
     openai_api_key: str = get_secret("OPENAI_API_KEY", "")
     openai_model: str = "gpt-4-turbo-preview"
@@ -50,19 +64,44 @@ class Settings(BaseSettings):
     # Bayut API via RapidAPI (lead indicators + transactions DLD)
     bayut_api_key: str = get_secret("BAYUT_API_KEY", "")
     bayut_api_url: str = get_secret("BAYUT_API_URL", "https://uae-real-estate2.p.rapidapi.com")
+    bayut_transactions_max_pages: int = int(get_secret("BAYUT_TRANSACTIONS_MAX_PAGES", "200"))
+    bayut_max_concurrency: int = int(get_secret("BAYUT_MAX_CONCURRENCY", "4"))
+    bayut_requests_per_second: float = float(get_secret("BAYUT_REQUESTS_PER_SECOND", "5"))
+    bayut_monthly_quota: int = int(get_secret("BAYUT_MONTHLY_QUOTA", "0"))
     
     # PropertyFinder API via RapidAPI
     propertyfinder_api_key: str = get_secret("PROPERTYFINDER_API_KEY", "")
+    propertyfinder_requests_per_second: float = float(get_secret("PROPERTYFINDER_REQUESTS_PER_SECOND", "5"))
+    propertyfinder_monthly_quota: int = int(get_secret("PROPERTYFINDER_MONTHLY_QUOTA", "0"))
     
     # Zyla Labs UAE Real Estate API
     zylalabs_api_key: str = get_secret("ZYLALABS_API_KEY", "")
+    zylalabs_requests_per_second: float = float(get_secret("ZYLALABS_REQUESTS_PER_SECOND", "2"))
+    zylalabs_monthly_quota: int = int(get_secret("ZYLALABS_MONTHLY_QUOTA", "0"))
     
     # UAE Real Estate Data-Real Time API via RapidAPI
     uae_realtime_api_key: str = get_secret("UAE_REALTIME_API_KEY", "")
+    uae_realtime_requests_per_second: float = float(get_secret("UAE_REALTIME_REQUESTS_PER_SECOND", "5"))
+    uae_realtime_monthly_quota: int = int(get_secret("UAE_REALTIME_MONTHLY_QUOTA", "0"))
+    
+    # Limitation de débit RapidAPI (rafale max par clé, quota 0 = inconnu)
+    rapidapi_burst: int = int(get_secret("RAPIDAPI_BURST", "5"))
+    
+    # Normalisation des noms de lieux (taille du cache LRU par process)
+    location_name_cache_size: int = int(get_secret("LOCATION_NAME_CACHE_SIZE", "65536"))
+    location_fuzzy_match_enabled: bool = get_secret("LOCATION_FUZZY_MATCH_ENABLED", "true").lower() in ("1", "true", "yes")
+    location_fuzzy_min_similarity: float = float(get_secret("LOCATION_FUZZY_MIN_SIMILARITY", "0.6"))
+    location_fuzzy_min_margin: float = float(get_secret("LOCATION_FUZZY_MIN_MARGIN", "0.1"))
     
     # Makani Geocoding (Dubai Municipality)
     makani_api_key: str = get_secret("MAKANI_API_KEY", "")
     makani_api_url: str = get_secret("MAKANI_API_URL", "https://api.dubaipulse.gov.ae/makani")
+    makani_cache_ttl_days: int = int(get_secret("MAKANI_CACHE_TTL_DAYS", "90"))
+    makani_negative_cache_ttl_days: int = int(get_secret("MAKANI_NEGATIVE_CACHE_TTL_DAYS", "7"))
+    makani_concurrency: int = int(get_secret("MAKANI_CONCURRENCY", "10"))
+    makani_rate_limit_per_second: float = float(get_secret("MAKANI_RATE_LIMIT_PER_SECOND", "20"))
+    makani_max_retries: int = int(get_secret("MAKANI_MAX_RETRIES", "3"))
+    makani_retry_backoff_seconds: float = float(get_secret("MAKANI_RETRY_BACKOFF_SECONDS", "0.5"))
     
     # DDA Planning & Zoning
     dda_api_key: str = get_secret("DDA_API_KEY", "")
@@ -75,9 +114,30 @@ class Settings(BaseSettings):
     # Developers API
     developers_api_key: str = get_secret("DEVELOPERS_API_KEY", "")
     
+    # HTTP (clients partagés entre connecteurs, limites par hôte)
+    http_max_connections_per_host: int = int(get_secret("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+    http_max_keepalive_per_host: int = int(get_secret("HTTP_MAX_KEEPALIVE_PER_HOST", "10"))
+    http_keepalive_expiry_seconds: float = float(get_secret("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+    http2_enabled: bool = get_secret("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes")
+    http_cache_enabled: bool = get_secret("HTTP_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    http_cache_dir: str = get_secret("HTTP_CACHE_DIR", "data/http_cache")
+    
     # Refresh
     polling_interval_minutes: int = int(get_secret("POLLING_INTERVAL_MINUTES", "15"))
     cache_ttl_minutes: int = int(get_secret("CACHE_TTL_MINUTES", "10"))
+    cache_max_entries: int = int(get_secret("CACHE_MAX_ENTRIES", "512"))
+    cache_max_bytes: int = int(get_secret("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    cache_stale_minutes: int = int(get_secret("CACHE_STALE_MINUTES", "30"))
+    cache_backend: str = get_secret("CACHE_BACKEND", "memory")  # memory, sqlite, redis
+    cache_sqlite_path: str = get_secret("CACHE_SQLITE_PATH", "data/cache/realtime.sqlite3")  # relatif à la racine du projet
+    cache_redis_url: str = get_secret("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    cache_invalidation_poll_seconds: float = float(get_secret("CACHE_INVALIDATION_POLL_SECONDS", "1"))
+    cache_warm_top_communities: int = int(get_secret("CACHE_WARM_TOP_COMMUNITIES", "10"))
+    
+    # Backfill historique (jobs/backfill.py)
+    backfill_chunk_days: int = int(get_secret("BACKFILL_CHUNK_DAYS", "30"))
+    backfill_workers: int = int(get_secret("BACKFILL_WORKERS", "4"))
+    backfill_checkpoint_dir: str = get_secret("BACKFILL_CHECKPOINT_DIR", "data/backfill")
     
     # Alertes
     alert_email: Optional[str] = get_secret("ALERT_EMAIL") or None
@@ -0,0 +1,132 @@
+"""
+Cache de géocodage persistant (table geocode_cache)
+
+Conserve les résultats Makani entre les runs, y compris les recherches
+sans résultat (cache négatif), chaque entrée ayant sa propre expiration.
+Le cache est best-effort : une erreur base de données équivaut à un miss.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from loguru import logger
+
+from core.config import settings
+from core.db import db
+from core.models import MakaniAddress
+from core.utils import normalize_location_name
+
+
+# Champs MakaniAddress persistés (colonnes homonymes de geocode_cache)
+ADDRESS_FIELDS = [
+    "makani_number", "community", "project", "building", "street",
+    "latitude", "longitude", "metro_station",
+    "metro_distance_m", "beach_distance_m", "mall_distance_m"
+]
+
+
+def location_key(
+    community: Optional[str],
+    project: Optional[str],
+    building: Optional[str]
+) -> str:
+    """Clé de cache normalisée "community|project|building" (minuscules)"""
+    parts = (normalize_location_name(part) or "" for part in (community, project, building))
+    return "|".join(part.lower() for part in parts)
+
+
+class GeocodeCache:
+    """
+    Cache persistant des adresses Makani
+
+    - get_many : entrées non expirées (None = adresse inconnue de Makani)
+    - put_many : upsert des résultats, TTL distinct pour le cache négatif
+    """
+
+    def __init__(
+        self,
+        ttl_days: Optional[int] = None,
+        negative_ttl_days: Optional[int] = None
+    ):
+        self.ttl = timedelta(days=ttl_days or settings.makani_cache_ttl_days)
+        self.negative_ttl = timedelta(days=negative_ttl_days or settings.makani_negative_cache_ttl_days)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Optional[MakaniAddress]]:
+        """
+        Récupérer les entrées valides pour un ensemble de clés
+
+        Returns:
+            Dict clé -> MakaniAddress (ou None si cache négatif) ; les clés
+            absentes ou expirées ne figurent pas dans le résultat
+        """
+        keys = sorted(set(keys))
+        if not keys:
+            return {}
+
+        query = f"""
+        SELECT location_key, found, {", ".join(ADDRESS_FIELDS)}
+        FROM geocode_cache
+        WHERE location_key = ANY(%s)
+            AND expires_at > NOW()
+        """
+
+        try:
+            rows = db.execute_query(query, (keys,))
+        except Exception as e:
+            logger.warning(f"Lecture du cache géocodage impossible : {e}")
+            return {}
+
+        results = {}
+        for row in rows:
+            if row["found"]:
+                results[row["location_key"]] = MakaniAddress(
+                    **{field: row[field] for field in ADDRESS_FIELDS}
+                )
+            else:
+                results[row["location_key"]] = None
+
+        logger.debug(f"Cache géocodage : {len(results)}/{len(keys)} clés trouvées")
+        return results
+
+    def put_many(self, entries: Dict[str, Optional[MakaniAddress]]) -> int:
+        """
+        Enregistrer des résultats de géocodage (None = aucune adresse trouvée)
+
+        Returns:
+            Nombre d'entrées écrites
+        """
+        if not entries:
+            return 0
+
+        now = datetime.now()
+        columns = ["location_key", "found"] + ADDRESS_FIELDS + ["fetched_at", "expires_at"]
+
+        values = []
+        for key, address in entries.items():
+            if address is not None:
+                values.append(
+                    (key, True)
+                    + tuple(getattr(address, field) for field in ADDRESS_FIELDS)
+                    + (now, now + self.ttl)
+                )
+            else:
+                values.append(
+                    (key, False)
+                    + (None,) * len(ADDRESS_FIELDS)
+                    + (now, now + self.negative_ttl)
+                )
+
+        try:
+            return db.execute_batch_insert(
+                "geocode_cache", columns, values,
+                conflict_columns=["location_key"],
+                update_columns=columns[1:]
+            )
+        except Exception as e:
+            logger.warning(f"Écriture du cache géocodage impossible : {e}")
+            return 0
+
+    def purge_expired(self) -> int:
+        """Supprimer les entrées expirées"""
+        with db.get_cursor(dict_cursor=False) as cursor:
+            cursor.execute("DELETE FROM geocode_cache WHERE expires_at <= NOW()")
+            return cursor.rowcount
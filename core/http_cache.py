@@ -0,0 +1,209 @@
+"""
+Cache disque des réponses HTTP de référence (requêtes conditionnelles)
+
+Les endpoints quasi statiques (localisations, plans, promoteurs, agences,
+zones DLD) sont servis depuis le disque tant que leur TTL n'est pas
+écoulé : aucune requête, aucun quota consommé. Une entrée expirée est
+revalidée avec If-None-Match / If-Modified-Since ; un 304 prolonge
+l'entrée sans retransférer le corps.
+
+Le cache est branché dans le transport partagé (core.http_client) : les
+connecteurs n'ont rien à faire. Clé : méthode + URL + empreinte du corps
+(les en-têtes d'authentification n'en font pas partie).
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from loguru import logger
+
+from core.config import settings
+
+
+# (hôte, préfixe de chemin, TTL en secondes) des endpoints mis en cache
+CACHE_RULES: List[Tuple[str, str, int]] = [
+    ("uae-real-estate2.p.rapidapi.com", "/locations_search", 7 * 86400),
+    ("uae-real-estate2.p.rapidapi.com", "/floorplans", 30 * 86400),
+    ("uae-real-estate2.p.rapidapi.com", "/developers_search", 7 * 86400),
+    ("uae-real-estate2.p.rapidapi.com", "/agency/", 86400),
+    ("api.dubaipulse.gov.ae", "/open/dld/dld_lkp_areas", 30 * 86400),
+]
+
+# En-têtes qui ne décrivent plus le corps stocké (déjà décodé)
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class CachePlan:
+    """Requête éligible au cache : clé, TTL et entrée existante éventuelle"""
+
+    def __init__(self, key: str, ttl: int, entry: Optional[Dict[str, Any]]):
+        self.key = key
+        self.ttl = ttl
+        self.entry = entry
+
+    @property
+    def fresh(self) -> bool:
+        return self.entry is not None and self.entry["expires_at"] > time.time()
+
+
+class HttpResponseCache:
+    """Cache de réponses sur disque, un fichier JSON par requête"""
+
+    def __init__(self, directory: Optional[str] = None, enabled: Optional[bool] = None):
+        self.directory = directory or settings.http_cache_dir
+        self.enabled = settings.http_cache_enabled if enabled is None else enabled
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "revalidated": 0, "stores": 0}
+
+    # ----------------------------------------------------------------
+    # Cycle de vie d'une requête
+    # ----------------------------------------------------------------
+
+    def plan(self, request: httpx.Request) -> Optional[CachePlan]:
+        """Préparer une requête : None si l'endpoint n'est pas mis en cache"""
+        if not self.enabled:
+            return None
+
+        ttl = self._ttl_for(request.url)
+        if ttl is None:
+            return None
+
+        try:
+            body = request.content
+        except httpx.RequestNotRead:
+            return None
+
+        key = hashlib.sha256(
+            b"\n".join([request.method.encode(), str(request.url).encode(), hashlib.sha256(body).digest()])
+        ).hexdigest()
+
+        plan = CachePlan(key, ttl, self._read(key))
+        if not plan.fresh and plan.entry is not None:
+            # Entrée expirée : revalidation conditionnelle
+            if plan.entry.get("etag"):
+                request.headers["If-None-Match"] = plan.entry["etag"]
+            if plan.entry.get("last_modified"):
+                request.headers["If-Modified-Since"] = plan.entry["last_modified"]
+        return plan
+
+    def cached_response(self, plan: CachePlan, request: httpx.Request) -> httpx.Response:
+        """Réponse servie depuis une entrée fraîche"""
+        self._count("hits")
+        return self._build_response(plan.entry, request)
+
+    def complete(self, plan: CachePlan, request: httpx.Request, response: httpx.Response) -> httpx.Response:
+        """
+        Traiter la réponse réseau (corps déjà lu)
+
+        304 : l'entrée est prolongée et servie ; 200 : elle est (re)stockée.
+        """
+        if response.status_code == 304 and plan.entry is not None:
+            plan.entry["expires_at"] = time.time() + plan.ttl
+            self._write(plan.key, plan.entry)
+            self._count("revalidated")
+            return self._build_response(plan.entry, request)
+
+        self._count("misses")
+
+        cache_control = response.headers.get("cache-control", "").lower()
+        if response.status_code == 200 and "no-store" not in cache_control:
+            self._write(plan.key, {
+                "url": str(request.url),
+                "status_code": response.status_code,
+                "headers": [
+                    [name, value] for name, value in response.headers.items()
+                    if name.lower() not in _DROPPED_HEADERS
+                ],
+                "content": base64.b64encode(response.content).decode("ascii"),
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "stored_at": time.time(),
+                "expires_at": time.time() + plan.ttl,
+            })
+            self._count("stores")
+
+        return response
+
+    # ----------------------------------------------------------------
+    # Stockage
+    # ----------------------------------------------------------------
+
+    def _ttl_for(self, url: httpx.URL) -> Optional[int]:
+        for host, path_prefix, ttl in CACHE_RULES:
+            if url.host == host and url.path.startswith(path_prefix):
+                return ttl
+        return None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Entrée de cache HTTP illisible {path} : {e}")
+            return None
+
+    def _write(self, key: str, entry: Dict[str, Any]):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Écriture du cache HTTP impossible : {e}")
+
+    def _build_response(self, entry: Dict[str, Any], request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            entry["status_code"],
+            headers=entry["headers"],
+            content=base64.b64decode(entry["content"]),
+            request=request,
+            extensions={"from_cache": True}
+        )
+
+    def clear(self) -> int:
+        """Supprimer toutes les entrées"""
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    os.remove(os.path.join(root, name))
+                    removed += 1
+        return removed
+
+    # ----------------------------------------------------------------
+    # Statistiques
+    # ----------------------------------------------------------------
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs hits / misses / revalidated / stores et taux de hit"""
+        with self._lock:
+            stats = dict(self._stats)
+        served = stats["hits"] + stats["revalidated"]
+        lookups = served + stats["misses"]
+        stats["hit_rate"] = round(served / lookups, 3) if lookups else 0.0
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {counter: 0 for counter in self._stats}
+
+
+# Instance globale
+response_cache = HttpResponseCache()
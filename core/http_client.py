@@ -0,0 +1,394 @@
+"""
+Clients HTTP partagés entre connecteurs (keep-alive + pool de connexions)
+
+Tous les connecteurs passent par http_client() / async_http_client() au
+lieu d'ouvrir un httpx.Client par requête : les connexions TCP/TLS sont
+réutilisées d'un appel à l'autre. Chaque hôte dispose de son propre pool
+(limites par hôte), en HTTP/2 si le paquet h2 est installé.
+
+Les endpoints de référence sont servis par le cache disque
+(core.http_cache) avant tout accès réseau. Les requêtes portant une clé
+RapidAPI/ZylaLabs configurée passent par le limiteur de débit de la clé
+(core.rate_limit).
+
+Le code synchrone qui enchaîne plusieurs lots asynchrones passe par
+AsyncRunner plutôt que par asyncio.run() : une seule boucle (donc un seul
+pool async) pour tous les lots, fermée avec son transport en fin de run.
+
+Les statistiques par hôte (requêtes, connexions ouvertes, réutilisation,
+latence) sont exposées par http_stats().
+"""
+import asyncio
+import atexit
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+
+import httpx
+from loguru import logger
+
+from core.config import settings
+from core.http_cache import response_cache
+from core.rate_limit import rate_limits
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+HostKey = Tuple[str, str, Optional[int]]
+
+
+class _HostStats:
+    """Compteurs d'un hôte"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.connections_opened = 0
+        self.total_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        reused = max(0, self.requests - self.connections_opened)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "connections_opened": self.connections_opened,
+            "reused_requests": reused,
+            "reuse_rate": round(reused / self.requests, 3) if self.requests else 0.0,
+            "avg_latency_ms": round(self.total_latency_ms / self.requests, 1) if self.requests else 0.0,
+            "max_latency_ms": round(self.max_latency_ms, 1),
+        }
+
+
+class HttpClientRegistry:
+    """
+    Registre process-wide des clients HTTP
+
+    Un transport de routage unique (sync) et un par boucle asyncio (async)
+    répartissent les requêtes vers un transport httpx par hôte. Les clients
+    retournés partagent ces transports : leur création ne coûte rien et
+    ne doit pas être suivie d'un close().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[HostKey, _HostStats] = {}
+        self._sync_transport: Optional[_HostRoutingTransport] = None
+        self._async_transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _AsyncHostRoutingTransport]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._clients: Dict[float, httpx.Client] = {}
+
+    # ----------------------------------------------------------------
+    # Clients
+    # ----------------------------------------------------------------
+
+    def client(self, timeout: float = 30.0) -> httpx.Client:
+        """Client synchrone partagé (un par valeur de timeout)"""
+        with self._lock:
+            client = self._clients.get(timeout)
+            if client is None:
+                if self._sync_transport is None:
+                    self._sync_transport = _HostRoutingTransport(self)
+                client = httpx.Client(transport=self._sync_transport, timeout=timeout)
+                self._clients[timeout] = client
+            return client
+
+    def async_client(self, timeout: float = 30.0, headers: Optional[Dict[str, str]] = None) -> httpx.AsyncClient:
+        """Client asynchrone adossé au transport partagé de la boucle courante"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._async_transports.get(loop)
+            if transport is None:
+                transport = _AsyncHostRoutingTransport(self)
+                self._async_transports[loop] = transport
+        return httpx.AsyncClient(transport=transport, timeout=timeout, headers=headers)
+
+    async def aclose_loop(self):
+        """Fermer le transport async de la boucle courante (appelé par AsyncRunner)"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._async_transports.pop(loop, None)
+        if transport is not None:
+            await transport.aclose()
+
+    def close(self):
+        """Fermer les connexions synchrones (transports async : aclose_loop)"""
+        with self._lock:
+            if self._sync_transport is not None:
+                self._sync_transport.close()
+            self._sync_transport = None
+            self._clients = {}
+
+    # ----------------------------------------------------------------
+    # Transports par hôte
+    # ----------------------------------------------------------------
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.http_max_connections_per_host,
+            max_keepalive_connections=settings.http_max_keepalive_per_host,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds
+        )
+
+    def _http2(self) -> bool:
+        return settings.http2_enabled and HTTP2_AVAILABLE
+
+    def new_transport(self) -> httpx.HTTPTransport:
+        return httpx.HTTPTransport(limits=self._limits(), http2=self._http2())
+
+    def new_async_transport(self) -> httpx.AsyncHTTPTransport:
+        return httpx.AsyncHTTPTransport(limits=self._limits(), http2=self._http2())
+
+    # ----------------------------------------------------------------
+    # Statistiques
+    # ----------------------------------------------------------------
+
+    def _host_stats(self, key: HostKey) -> _HostStats:
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _HostStats()
+            return stats
+
+    def record_connection(self, key: HostKey):
+        stats = self._host_stats(key)
+        with self._lock:
+            stats.connections_opened += 1
+
+    def record_request(self, key: HostKey, latency_ms: float, error: bool = False):
+        stats = self._host_stats(key)
+        with self._lock:
+            stats.requests += 1
+            stats.errors += int(error)
+            stats.total_latency_ms += latency_ms
+            stats.max_latency_ms = max(stats.max_latency_ms, latency_ms)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Statistiques par hôte ("scheme://host[:port]")"""
+        with self._lock:
+            return {
+                _format_host(key): stats.as_dict()
+                for key, stats in sorted(self._stats.items(), key=lambda item: _format_host(item[0]))
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {}
+
+
+class _HostRoutingTransport(httpx.BaseTransport):
+    """Transport synchrone : un pool httpx par hôte + instrumentation"""
+
+    def __init__(self, registry: HttpClientRegistry):
+        self._registry = registry
+        self._transports: Dict[HostKey, httpx.HTTPTransport] = {}
+        self._lock = threading.Lock()
+
+    def _transport_for(self, key: HostKey) -> httpx.HTTPTransport:
+        with self._lock:
+            transport = self._transports.get(key)
+            if transport is None:
+                transport = self._transports[key] = self._registry.new_transport()
+            return transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        plan = response_cache.plan(request)
+        if plan is not None and plan.fresh:
+            return response_cache.cached_response(plan, request)
+
+        key = _host_key(request.url)
+        transport = self._transport_for(key)
+        request.extensions["trace"] = _sync_trace(self._registry, key, request.extensions.get("trace"))
+
+        limiter = rate_limits.for_request(request.url.host, request.headers)
+        if limiter is not None:
+            limiter.acquire()
+
+        start = time.perf_counter()
+        try:
+            response = transport.handle_request(request)
+        except Exception:
+            self._registry.record_request(key, (time.perf_counter() - start) * 1000, error=True)
+            if limiter is not None:
+                limiter.record_error()
+            raise
+        self._registry.record_request(key, (time.perf_counter() - start) * 1000)
+        if limiter is not None:
+            limiter.record_response(response.status_code, response.headers)
+        if plan is not None:
+            response.read()
+            response = response_cache.complete(plan, request, response)
+        return response
+
+    def close(self):
+        with self._lock:
+            for transport in self._transports.values():
+                transport.close()
+            self._transports = {}
+
+
+class _AsyncHostRoutingTransport(httpx.AsyncBaseTransport):
+    """Transport asynchrone : un pool httpx par hôte + instrumentation"""
+
+    def __init__(self, registry: HttpClientRegistry):
+        self._registry = registry
+        self._transports: Dict[HostKey, httpx.AsyncHTTPTransport] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        plan = response_cache.plan(request)
+        if plan is not None and plan.fresh:
+            return response_cache.cached_response(plan, request)
+
+        key = _host_key(request.url)
+        transport = self._transports.get(key)
+        if transport is None:
+            transport = self._transports[key] = self._registry.new_async_transport()
+        request.extensions["trace"] = _async_trace(self._registry, key, request.extensions.get("trace"))
+
+        limiter = rate_limits.for_request(request.url.host, request.headers)
+        if limiter is not None:
+            await limiter.aacquire()
+
+        start = time.perf_counter()
+        try:
+            response = await transport.handle_async_request(request)
+        except Exception:
+            self._registry.record_request(key, (time.perf_counter() - start) * 1000, error=True)
+            if limiter is not None:
+                limiter.record_error()
+            raise
+        self._registry.record_request(key, (time.perf_counter() - start) * 1000)
+        if limiter is not None:
+            limiter.record_response(response.status_code, response.headers)
+        if plan is not None:
+            await response.aread()
+            response = response_cache.complete(plan, request, response)
+        return response
+
+    async def aclose(self):
+        for transport in self._transports.values():
+            await transport.aclose()
+        self._transports = {}
+
+
+def _host_key(url: httpx.URL) -> HostKey:
+    return (url.scheme, url.host, url.port)
+
+
+def _format_host(key: HostKey) -> str:
+    scheme, host, port = key
+    return f"{scheme}://{host}:{port}" if port else f"{scheme}://{host}"
+
+
+def _sync_trace(registry: HttpClientRegistry, key: HostKey, chained: Optional[Callable]) -> Callable:
+    """Callback de trace httpcore : compte les nouvelles connexions TCP"""
+    def trace(event_name: str, info: Dict):
+        if event_name == "connection.connect_tcp.complete":
+            registry.record_connection(key)
+        if chained is not None:
+            chained(event_name, info)
+    return trace
+
+
+def _async_trace(registry: HttpClientRegistry, key: HostKey, chained: Optional[Callable]) -> Callable:
+    """Variante asynchrone de _sync_trace (httpcore attend une coroutine)"""
+    async def trace(event_name: str, info: Dict):
+        if event_name == "connection.connect_tcp.complete":
+            registry.record_connection(key)
+        if chained is not None:
+            await chained(event_name, info)
+    return trace
+
+
+# Instance globale
+http_registry = HttpClientRegistry()
+atexit.register(http_registry.close)
+
+
+class AsyncRunner:
+    """
+    Boucle asyncio dédiée, réutilisée d'un appel à l'autre
+
+    asyncio.run() crée une boucle par appel, donc un nouveau pool async
+    (aucune réutilisation keep-alive entre lots). Le runner garde la même
+    boucle pour tous les lots et ferme son transport partagé en sortie :
+
+        with AsyncRunner() as runner:
+            for batch in batches:
+                runner.run(connector.abatch_search(batch))
+    """
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+
+    def run(self, coroutine):
+        """Exécuter une coroutine sur la boucle du runner"""
+        return self._loop.run_until_complete(coroutine)
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        try:
+            self._loop.run_until_complete(http_registry.aclose_loop())
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+        finally:
+            self._loop.close()
+
+    def __enter__(self) -> "AsyncRunner":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@contextmanager
+def http_client(timeout: float = 30.0) -> Iterator[httpx.Client]:
+    """
+    Client HTTP partagé, à utiliser comme httpx.Client :
+
+        with http_client(self.timeout) as client:
+            response = client.get(url)
+
+    Le client n'est pas fermé en sortie de bloc : les connexions restent
+    disponibles pour les appels suivants.
+    """
+    yield http_registry.client(timeout)
+
+
+@asynccontextmanager
+async def async_http_client(
+    timeout: float = 30.0,
+    headers: Optional[Dict[str, str]] = None
+) -> AsyncIterator[httpx.AsyncClient]:
+    """Équivalent asynchrone de http_client (pool partagé par boucle asyncio)"""
+    yield http_registry.async_client(timeout, headers)
+
+
+def http_stats() -> Dict[str, Dict[str, Any]]:
+    """Statistiques par hôte : requêtes, connexions ouvertes, réutilisation, latence"""
+    return http_registry.stats()
+
+
+def log_http_stats():
+    """Journaliser les statistiques HTTP par hôte et celles du cache de réponses"""
+    for host, stats in http_stats().items():
+        logger.info(
+            f"HTTP {host} : {stats['requests']} requêtes, "
+            f"{stats['connections_opened']} connexions ouvertes "
+            f"(réutilisation {stats['reuse_rate']:.0%}), "
+            f"latence moy. {stats['avg_latency_ms']} ms"
+        )
+
+    cache_stats = response_cache.stats()
+    if cache_stats["hits"] or cache_stats["misses"] or cache_stats["revalidated"]:
+        logger.info(
+            f"Cache HTTP : {cache_stats['hits']} hits, {cache_stats['revalidated']} revalidés (304), "
+            f"{cache_stats['misses']} misses (taux {cache_stats['hit_rate']:.0%})"
+        )
@@ -0,0 +1,299 @@
+"""
+Canonicalisation des noms de lieux (alias -> nom canonique)
+
+Dictionnaire construit une fois par process à partir de :
+- la nomenclature officielle DLD (DLDLkpAreasConnector : noms officiels,
+  variantes et abréviations comme JBR, JVC, DIFC) ;
+- les données observées : parmi les graphies d'un même nom dans les
+  transactions (casse, tirets, espaces), la plus fréquente devient la
+  forme canonique.
+
+La nomenclature officielle prime sur les données observées. Les clés
+d'alias sont en minuscules, tirets/underscores remplacés par des espaces.
+
+Les noms absents du dictionnaire sont résolus par similarité de
+trigrammes (core.location_index) sur l'ensemble des zones, projets et
+bâtiments connus : resolve() sert à canonicaliser les localisations des
+annonces à l'ingestion.
+"""
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from core.config import settings
+from core.db import db
+from core.utils import normalize_location_name, normalize_location_name_cache_info
+
+
+@lru_cache(maxsize=settings.location_name_cache_size)
+def alias_key(name: str) -> str:
+    """Clé de rapprochement d'un nom : minuscules, sans ponctuation de liaison"""
+    return " ".join(name.lower().replace("-", " ").replace("_", " ").split())
+
+
+class LocationNameCanonicalizer:
+    """
+    Service de canonicalisation chargé paresseusement (une fois par process)
+
+    canonical() retourne la forme canonique connue d'un nom, sinon le nom
+    normalisé (normalize_location_name).
+    """
+
+    def __init__(self, include_observed: bool = True):
+        self.include_observed = include_observed
+        self._lock = threading.Lock()
+        self._aliases: Optional[Dict[str, str]] = None
+        self._index = None
+        # Compteurs indicatifs (incréments non verrouillés)
+        self._lookups = 0
+        self._alias_hits = 0
+        self._fuzzy_lookups = 0
+        self._fuzzy_hits = 0
+
+    def _ensure_loaded(self) -> Dict[str, str]:
+        aliases = self._aliases
+        if aliases is not None:
+            return aliases
+
+        with self._lock:
+            if self._aliases is None:
+                aliases = {}
+                if self.include_observed:
+                    aliases.update(_observed_aliases())
+                aliases.update(_official_aliases())
+                self._aliases = aliases
+                logger.info(f"Dictionnaire de noms de lieux chargé : {len(aliases)} alias")
+            return self._aliases
+
+    def _ensure_index(self):
+        index = self._index
+        if index is not None:
+            return index
+
+        from core.location_index import TrigramIndex
+
+        with self._lock:
+            if self._index is None:
+                entries = _official_entries()
+                if self.include_observed:
+                    entries += _observed_entries()
+                self._index = TrigramIndex(entries)
+                logger.info(f"Index trigrammes des noms de lieux construit : {len(self._index)} noms")
+            return self._index
+
+    def canonical(self, name: Optional[str]) -> Optional[str]:
+        """Nom canonique (ou nom normalisé si aucun alias ne correspond)"""
+        return self.lookup(name) or normalize_location_name(name)
+
+    def lookup(self, name: Optional[str]) -> Optional[str]:
+        """Nom canonique si le nom est un alias connu, sinon None"""
+        normalized = normalize_location_name(name)
+        if normalized is None:
+            return None
+
+        self._lookups += 1
+        canonical = self._ensure_loaded().get(alias_key(normalized))
+        if canonical is not None:
+            self._alias_hits += 1
+        return canonical
+
+    def resolve(self, name: Optional[str], level: Optional[str] = None) -> Optional[str]:
+        """
+        Nom canonique avec repli flou
+
+        Alias exact d'abord, puis nom le plus proche de l'index trigrammes
+        (seuils location_fuzzy_*), sinon le nom normalisé.
+
+        Args:
+            name: Nom brut (annonce, API tierce)
+            level: Restreindre le repli flou à un niveau (area, project, building)
+        """
+        canonical = self.lookup(name)
+        if canonical is not None:
+            return canonical
+
+        normalized = normalize_location_name(name)
+        if normalized is None or not settings.location_fuzzy_match_enabled:
+            return normalized
+
+        self._fuzzy_lookups += 1
+        match = _resolve_fuzzy(self._ensure_index(), alias_key(normalized), level)
+        if match is None:
+            return normalized
+        self._fuzzy_hits += 1
+        return self._ensure_loaded().get(alias_key(match), match)
+
+    def search(self, name: Optional[str], k: int = 5, level: Optional[str] = None) -> List[Tuple[str, float, str]]:
+        """k noms connus les plus proches : (nom, similarité, niveau)"""
+        return self._ensure_index().search(normalize_location_name(name), k=k, level=level)
+
+    def add_aliases(self, mapping: Dict[str, str]):
+        """Ajouter des alias (nom -> canonique) au dictionnaire chargé"""
+        aliases = self._ensure_loaded()
+        with self._lock:
+            for alias, canonical in mapping.items():
+                aliases[alias_key(alias)] = canonical
+
+    def reload(self):
+        """Forcer la reconstruction du dictionnaire au prochain appel"""
+        with self._lock:
+            self._aliases = None
+            self._index = None
+        _resolve_fuzzy.cache_clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Taux de hit du normaliseur mémoïsé et du dictionnaire d'alias"""
+        normalize_info = normalize_location_name_cache_info()
+        normalize_calls = normalize_info.hits + normalize_info.misses
+        return {
+            "normalize": {
+                "hits": normalize_info.hits,
+                "misses": normalize_info.misses,
+                "size": normalize_info.currsize,
+                "hit_rate": round(normalize_info.hits / normalize_calls, 3) if normalize_calls else 0.0,
+            },
+            "canonical": {
+                "lookups": self._lookups,
+                "alias_hits": self._alias_hits,
+                "aliases": len(self._aliases or {}),
+                "hit_rate": round(self._alias_hits / self._lookups, 3) if self._lookups else 0.0,
+            },
+            "fuzzy": {
+                "lookups": self._fuzzy_lookups,
+                "hits": self._fuzzy_hits,
+                "names": len(self._index) if self._index is not None else 0,
+                "hit_rate": round(self._fuzzy_hits / self._fuzzy_lookups, 3) if self._fuzzy_lookups else 0.0,
+            },
+        }
+
+
+@lru_cache(maxsize=settings.location_name_cache_size)
+def _resolve_fuzzy(index, key: str, level: Optional[str]) -> Optional[str]:
+    """Résolution floue mémoïsée (les mêmes graphies reviennent d'un lot à l'autre)"""
+    return index.best(
+        key,
+        level=level,
+        min_similarity=settings.location_fuzzy_min_similarity,
+        min_margin=settings.location_fuzzy_min_margin
+    )
+
+
+def _official_aliases() -> Dict[str, str]:
+    """Alias de la nomenclature DLD (noms officiels, variantes, abréviations)"""
+    from connectors.dld_lkp_areas import DLDLkpAreasConnector
+
+    try:
+        mapping = DLDLkpAreasConnector().build_area_mapping()
+    except Exception as e:
+        logger.warning(f"Nomenclature DLD indisponible pour la canonicalisation : {e}")
+        return {}
+    return {alias_key(alias): canonical for alias, canonical in mapping.items()}
+
+
+# Niveaux DLD -> niveaux de l'index (les sous-zones sont des communautés d'annonces)
+_DLD_LEVELS = {"area": "area", "subarea": "area", "project": "project"}
+
+
+def _official_entries() -> List[Tuple[str, str]]:
+    """Zones et projets de la nomenclature DLD"""
+    from connectors.dld_lkp_areas import DLDLkpAreasConnector
+
+    try:
+        areas = DLDLkpAreasConnector().fetch_areas()
+    except Exception as e:
+        logger.warning(f"Nomenclature DLD indisponible pour l'index des noms : {e}")
+        return []
+    return [
+        (area.area_name_en, _DLD_LEVELS[area.area_level])
+        for area in areas if area.area_level in _DLD_LEVELS
+    ]
+
+
+def _observed_entries() -> List[Tuple[str, str]]:
+    """Communautés, projets et bâtiments distincts des transactions"""
+    query = """
+    SELECT DISTINCT community AS name, 'area' AS level FROM transactions WHERE community IS NOT NULL
+    UNION
+    SELECT DISTINCT project, 'project' FROM transactions WHERE project IS NOT NULL
+    UNION
+    SELECT DISTINCT building, 'building' FROM transactions WHERE building IS NOT NULL
+    """
+    try:
+        rows = db.execute_query(query)
+    except Exception as e:
+        logger.warning(f"Noms observés indisponibles pour l'index des noms : {e}")
+        return []
+
+    entries = []
+    for row in rows:
+        name = normalize_location_name(row["name"])
+        if name is not None:
+            entries.append((name, row["level"]))
+    return entries
+
+
+def _observed_aliases() -> Dict[str, str]:
+    """Graphie la plus fréquente de chaque nom observé dans les transactions"""
+    query = """
+    SELECT name, SUM(n) AS n
+    FROM (
+        SELECT community AS name, COUNT(*) AS n FROM transactions WHERE community IS NOT NULL GROUP BY community
+        UNION ALL
+        SELECT project, COUNT(*) FROM transactions WHERE project IS NOT NULL GROUP BY project
+        UNION ALL
+        SELECT building, COUNT(*) FROM transactions WHERE building IS NOT NULL GROUP BY building
+    ) names
+    GROUP BY name
+    """
+    try:
+        rows = db.execute_query(query)
+    except Exception as e:
+        logger.warning(f"Noms observés indisponibles pour la canonicalisation : {e}")
+        return {}
+
+    best: Dict[str, tuple] = {}
+    for row in rows:
+        name = normalize_location_name(row["name"])
+        if name is None:
+            continue
+        key = alias_key(name)
+        candidate = (int(row["n"]), name)
+        if key not in best or candidate > best[key]:
+            best[key] = candidate
+
+    return {key: name for key, (_, name) in best.items()}
+
+
+# Instance globale
+location_names = LocationNameCanonicalizer()
+
+# Nomenclature DLD seule (aucune requête sur les transactions)
+official_location_names = LocationNameCanonicalizer(include_observed=False)
+
+
+def canonical_location_name(name: Optional[str]) -> Optional[str]:
+    """Raccourci vers location_names.canonical()"""
+    return location_names.canonical(name)
+
+
+def resolve_location_name(name: Optional[str], level: Optional[str] = None) -> Optional[str]:
+    """Raccourci vers location_names.resolve()"""
+    return location_names.resolve(name, level)
+
+
+def location_name_stats() -> Dict[str, Any]:
+    """Statistiques de hit du normaliseur et du dictionnaire d'alias"""
+    return location_names.stats()
+
+
+def log_location_name_stats():
+    """Journaliser les taux de hit de la normalisation des noms"""
+    stats = location_name_stats()
+    logger.info(
+        f"Noms de lieux : normalisation {stats['normalize']['hit_rate']:.0%} de hits "
+        f"({stats['normalize']['size']} noms en cache), "
+        f"alias {stats['canonical']['alias_hits']}/{stats['canonical']['lookups']}, "
+        f"flou {stats['fuzzy']['hits']}/{stats['fuzzy']['lookups']}"
+    )
@@ -0,0 +1,255 @@
+"""
+Limitation de débit des APIs RapidAPI (Bayut, PropertyFinder, UAE Real-Time, ZylaLabs)
+
+Un seau à jetons par API et par clé (requêtes/seconde + rafale) et un
+suivi du quota mensuel. Le transport HTTP partagé (core.http_client) acquiert
+automatiquement un jeton pour toute requête portant une clé connue ; les
+connecteurs n'ont rien à faire de plus.
+
+Le quota restant provient des en-têtes RapidAPI
+(x-ratelimit-requests-remaining) quand ils sont présents, sinon du quota
+configuré moins les requêtes comptées depuis le début du mois dans ce
+process. quota_snapshot() l'expose au poller.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from loguru import logger
+
+from core.config import settings
+
+
+class QuotaExhaustedError(RuntimeError):
+    """Quota mensuel de la clé API épuisé : la requête n'est pas envoyée"""
+
+
+class TokenBucket:
+    """
+    Seau à jetons thread-safe et asyncio-safe
+
+    Chaque appel réserve un créneau sous verrou puis attend hors verrou
+    (time.sleep ou asyncio.sleep) : threads et coroutines se partagent
+    le même budget sans se bloquer mutuellement pendant l'attente.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int = 1):
+        self.rate = rate_per_second
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Consommer un jeton, retourne le délai d'attente en secondes"""
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def pause(self, seconds: float):
+        """Suspendre le seau (429 avec Retry-After)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class ApiRateLimiter:
+    """Débit + quota mensuel d'une clé API"""
+
+    def __init__(self, name: str, rate_per_second: float, burst: int, monthly_quota: int):
+        self.name = name
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.monthly_quota = monthly_quota
+        self._lock = threading.Lock()
+        self._month = _current_month()
+        self._used = 0
+        self._throttled = 0
+        self._in_flight = 0
+        self._reported_remaining: Optional[int] = None
+        self._reported_limit: Optional[int] = None
+
+    def _roll_month(self):
+        month = _current_month()
+        if month != self._month:
+            self._month = month
+            self._used = 0
+            self._reported_remaining = None
+
+    def _remaining(self) -> Optional[int]:
+        self._roll_month()
+        if self._reported_remaining is not None:
+            return max(0, self._reported_remaining)
+        if self.monthly_quota > 0:
+            return max(0, self.monthly_quota - self._used)
+        return None
+
+    def remaining(self) -> Optional[int]:
+        """Requêtes restantes ce mois-ci (None si quota inconnu)"""
+        with self._lock:
+            return self._remaining()
+
+    def _consume(self):
+        with self._lock:
+            remaining = self._remaining()
+            if remaining is not None and remaining <= 0:
+                raise QuotaExhaustedError(f"Quota mensuel {self.name} épuisé")
+            self._used += 1
+            self._in_flight += 1
+            if self._reported_remaining is not None:
+                self._reported_remaining -= 1
+
+    def acquire(self):
+        """Attendre un jeton (lève QuotaExhaustedError si le quota est épuisé)"""
+        self._consume()
+        self.bucket.acquire()
+
+    async def aacquire(self):
+        self._consume()
+        await self.bucket.aacquire()
+
+    def record_response(self, status_code: int, headers: Mapping[str, str]):
+        """
+        Mettre à jour le quota depuis les en-têtes RapidAPI, pause sur 429
+
+        Le restant annoncé ne compte pas les requêtes encore en vol : elles
+        en sont déduites.
+        """
+        remaining = _int_header(headers, "x-ratelimit-requests-remaining")
+        limit = _int_header(headers, "x-ratelimit-requests-limit")
+
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if remaining is not None:
+                self._reported_remaining = remaining - self._in_flight
+            if limit is not None:
+                self._reported_limit = limit
+            if status_code == 429:
+                self._throttled += 1
+
+        if status_code == 429:
+            retry_after = _int_header(headers, "retry-after") or 1
+            self.bucket.pause(retry_after)
+            logger.warning(f"{self.name} : 429 reçu, pause de {retry_after}s")
+
+    def record_error(self):
+        """Requête échouée sans réponse (erreur réseau)"""
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "used_this_month": self._used,
+                "remaining": self._remaining(),
+                "monthly_quota": self._reported_limit or self.monthly_quota or None,
+                "rate_per_second": self.bucket.rate,
+                "throttled": self._throttled,
+            }
+
+
+# Hôte API -> (nom, préfixe des settings <prefix>_requests_per_second / <prefix>_monthly_quota)
+RATE_LIMITED_APIS = {
+    "uae-real-estate2.p.rapidapi.com": ("bayut", "bayut"),
+    "uae-real-estate-api-propertyfinder-ae-data.p.rapidapi.com": ("propertyfinder", "propertyfinder"),
+    "uae-real-estate-data-real-time-api.p.rapidapi.com": ("uae_realtime", "uae_realtime"),
+    "zylalabs.com": ("zylalabs", "zylalabs"),
+}
+
+
+class RateLimitRegistry:
+    """
+    Limiteurs process-wide, un par (API, clé)
+
+    Une même clé RapidAPI peut servir plusieurs APIs dont les quotas sont
+    distincts : le limiteur est donc indexé par hôte et par clé.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limiters: Dict[Tuple[str, str], ApiRateLimiter] = {}
+
+    def get(self, host: str, api_key: Optional[str]) -> Optional[ApiRateLimiter]:
+        """Limiteur d'une API suivie (None pour un hôte non limité ou sans clé)"""
+        api = RATE_LIMITED_APIS.get(host)
+        if api is None or not api_key:
+            return None
+
+        with self._lock:
+            limiter = self._limiters.get((host, api_key))
+            if limiter is None:
+                name, prefix = api
+                limiter = self._limiters[(host, api_key)] = ApiRateLimiter(
+                    name,
+                    getattr(settings, f"{prefix}_requests_per_second"),
+                    settings.rapidapi_burst,
+                    getattr(settings, f"{prefix}_monthly_quota")
+                )
+            return limiter
+
+    def for_request(self, host: str, headers: Mapping[str, str]) -> Optional[ApiRateLimiter]:
+        """Limiteur d'une requête sortante (clé x-rapidapi-key ou Bearer)"""
+        api_key = headers.get("x-rapidapi-key")
+        if not api_key:
+            authorization = headers.get("authorization", "")
+            if authorization.startswith("Bearer "):
+                api_key = authorization[len("Bearer "):]
+        return self.get(host, api_key)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """État par limiteur ("nom:empreinte", la clé n'est jamais exposée)"""
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {
+            f"{limiter.name}:{_fingerprint(api_key)}": limiter.snapshot()
+            for (_, api_key), limiter in sorted(limiters.items(), key=lambda item: item[1].name)
+        }
+
+    def reset(self):
+        with self._lock:
+            self._limiters = {}
+
+
+def _current_month() -> str:
+    return datetime.now().strftime("%Y-%m")
+
+
+def _fingerprint(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()[:8]
+
+
+def _int_header(headers: Mapping[str, str], name: str) -> Optional[int]:
+    value = headers.get(name)
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+# Instance globale
+rate_limits = RateLimitRegistry()
+
+
+def quota_snapshot() -> Dict[str, Dict[str, Any]]:
+    """Quota restant, consommation et 429 par API et par clé"""
+    return rate_limits.snapshot()
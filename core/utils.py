@@ -3,6 +3,8 @@ Utilitaires généraux
 """
 from typing import Optional
 from datetime import datetime, date
+from functools import lru_cache
+import sys
 import pytz
 from decimal import Decimal
 from loguru import logger
@@ -73,15 +75,30 @@ def format_sqft(area: Optional[Decimal]) -> str:
 
 
 def normalize_location_name(name: Optional[str]) -> Optional[str]:
-    """Normaliser un nom de lieu (community, project, building)"""
+    """
+    Normaliser un nom de lieu (community, project, building)
+    
+    Mémoïsé : les mêmes quelques milliers de noms reviennent à chaque
+    ligne, chacun n'est nettoyé qu'une fois par process.
+    """
     if not name:
         return None
     
-    # Nettoyer et standardiser
-    name = name.strip()
-    name = " ".join(name.split())  # Supprimer espaces multiples
+    return _normalize_location_name_cached(name)
+
+
+@lru_cache(maxsize=settings.location_name_cache_size)
+def _normalize_location_name_cached(name: str) -> Optional[str]:
+    # Nettoyer et standardiser (strip + espaces multiples)
+    name = " ".join(name.split())
     
-    return name if name else None
+    # Interné : une seule instance par nom dans les features et les caches
+    return sys.intern(name) if name else None
+
+
+def normalize_location_name_cache_info():
+    """Statistiques du cache LRU de normalize_location_name (hits, misses, currsize)"""
+    return _normalize_location_name_cached.cache_info()
 
 
 def calculate_discount_pct(price: Decimal, market_median: Decimal) -> Decimal:
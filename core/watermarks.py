@@ -0,0 +1,78 @@
+"""
+Watermarks d'ingestion incrémentale (table ingestion_watermarks)
+
+Chaque source mémorise la date du dernier enregistrement vu. Les
+ingestions suivantes ne demandent que les dates à partir de ce watermark
+(jour inclus : les APIs ne filtrent pas plus finement que la date) ; les
+doublons du jour sont écartés par ON CONFLICT.
+
+last_new_at date le dernier run ayant inséré des lignes : un snapshot
+dashboard calculé avant cette date est périmé.
+
+Le watermark ne doit avancer qu'après une récupération complète depuis
+une source réelle (connecteur.last_fetch_complete) : sinon les dates
+manquantes ne seraient plus jamais redemandées.
+"""
+from datetime import date
+from typing import Dict, Optional
+
+from loguru import logger
+
+from core.db import db
+
+
+def get_watermark(source: str) -> Optional[Dict]:
+    """Watermark d'une source (None si jamais ingérée ou base indisponible)"""
+    try:
+        rows = db.execute_query(
+            """
+            SELECT source, last_record_date, last_new_count, last_run_at, last_new_at
+            FROM ingestion_watermarks
+            WHERE source = %s
+            """,
+            (source,)
+        )
+    except Exception as e:
+        logger.warning(f"Lecture du watermark {source} impossible : {e}")
+        return None
+    return rows[0] if rows else None
+
+
+def incremental_start(source: str, start_date: Optional[date]) -> Optional[date]:
+    """Début de fenêtre effectif : jamais avant le watermark de la source"""
+    watermark = get_watermark(source)
+    if not watermark or not watermark["last_record_date"]:
+        return start_date
+    if start_date is None or watermark["last_record_date"] > start_date:
+        logger.info(f"Watermark {source} : reprise à partir du {watermark['last_record_date']}")
+        return watermark["last_record_date"]
+    return start_date
+
+
+def advance_watermark(
+    source: str,
+    last_record_date: Optional[date],
+    new_count: int
+):
+    """
+    Enregistrer un run d'ingestion
+
+    Le watermark n'avance que si last_record_date est plus récent que
+    celui en base ; last_new_count et last_run_at sont toujours mis à jour.
+    Passer last_record_date=None pour un run incomplet (watermark inchangé).
+    """
+    query = """
+    INSERT INTO ingestion_watermarks (source, last_record_date, last_new_count, last_run_at, last_new_at)
+    VALUES (%s, %s, %s, NOW(), CASE WHEN %s > 0 THEN NOW() END)
+    ON CONFLICT (source) DO UPDATE SET
+        last_record_date = GREATEST(ingestion_watermarks.last_record_date, EXCLUDED.last_record_date),
+        last_new_count = EXCLUDED.last_new_count,
+        last_run_at = EXCLUDED.last_run_at,
+        last_new_at = COALESCE(EXCLUDED.last_new_at, ingestion_watermarks.last_new_at)
+    """
+    try:
+        with db.get_cursor(dict_cursor=False) as cursor:
+            cursor.execute(query, (source, last_record_date, new_count, new_count))
+    except Exception as e:
+        # Non bloquant : le prochain run repartira de l'ancien watermark
+        logger.warning(f"Mise à jour du watermark {source} impossible : {e}")
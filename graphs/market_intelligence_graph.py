@@ -11,6 +11,7 @@ from typing import TypedDict, Annotated
 from datetime import date, timedelta
 from loguru import logger
 from langgraph.graph import StateGraph, END
+from core.db import db
 from pipelines.ingest_transactions import ingest_transactions
 from pipelines.ingest_mortgages import ingest_mortgages
 from pipelines.ingest_rental_index import ingest_rental_index
@@ -21,8 +22,10 @@ from pipelines.compute_kpis import compute_kpis
 from pipelines.detect_anomalies import detect_anomalies
 from pipelines.compute_scores import compute_scores
 from pipelines.compute_risk_summary import compute_risk_summary
+from pipelines.compute_dashboard_snapshot import compute_dashboard_snapshot, has_fresh_snapshot
 from ai_agents.chief_investment_officer import ChiefInvestmentOfficer
 from alerts.notifier import AlertNotifier
+from realtime.cache import cache
 
 
 class MarketIntelligenceState(TypedDict):
@@ -39,7 +42,9 @@ class MarketIntelligenceState(TypedDict):
     opportunities_count: int
     risk_summaries_count: int
     brief_generated: bool
+    dashboard_snapshots_count: int
     alerts_sent: int
+    downstream_skipped: bool
     errors: list
 
 
@@ -51,7 +56,8 @@ def node_ingest_transactions(state: MarketIntelligenceState) -> MarketIntelligen
         target_date = state['target_date']
         count = ingest_transactions(
             start_date=target_date - timedelta(days=1),
-            end_date=target_date
+            end_date=target_date,
+            incremental=True
         )
         state['transactions_count'] = count
         logger.info(f"✅ Transactions ingérées : {count}")
@@ -70,7 +76,8 @@ def node_ingest_mortgages(state: MarketIntelligenceState) -> MarketIntelligenceS
         target_date = state['target_date']
         count = ingest_mortgages(
             start_date=target_date - timedelta(days=1),
-            end_date=target_date
+            end_date=target_date,
+            incremental=True
         )
         state['mortgages_count'] = count
         logger.info(f"✅ Hypothèques ingérées : {count}")
@@ -96,6 +103,47 @@ def node_ingest_rental_index(state: MarketIntelligenceState) -> MarketIntelligen
     return state
 
 
+def node_check_new_data(state: MarketIntelligenceState) -> MarketIntelligenceState:
+    """
+    Node : Détecter un run sans données nouvelles
+    
+    Les étapes aval ne sont sautées que si aucune transaction, hypothèque
+    ni ligne d'index locatif nouvelle n'a été ingérée ET qu'elles ont déjà
+    tourné pour la date cible (baselines présentes) : le premier run du
+    jour calcule toujours.
+    """
+    if (
+        state['transactions_count'] or state['mortgages_count']
+        or state['rental_index_count'] or state['errors']
+    ):
+        return state
+    
+    try:
+        rows = db.execute_query(
+            "SELECT 1 FROM market_baselines WHERE calculation_date = %s LIMIT 1",
+            (state['target_date'],)
+        )
+    except Exception as e:
+        logger.warning(f"Vérification des baselines impossible, calculs exécutés : {e}")
+        return state
+    
+    if rows:
+        logger.info("⏭️  Aucune donnée nouvelle depuis le dernier run : calculs sautés")
+        state['downstream_skipped'] = True
+    
+    return state
+
+
+def route_after_ingestion(state: MarketIntelligenceState) -> str:
+    """Router : calculs aval, ou seulement le snapshot dashboard si rien de nouveau"""
+    return "build_dashboard_snapshot" if state['downstream_skipped'] else "compute_features"
+
+
+def route_after_snapshot(state: MarketIntelligenceState) -> str:
+    """Router : pas de nouvelles alertes sur un run sans donnée nouvelle"""
+    return END if state['downstream_skipped'] else "send_alerts"
+
+
 def node_compute_features(state: MarketIntelligenceState) -> MarketIntelligenceState:
     """Node : Calcul des features normalisées"""
     logger.info("🔄 Node: Compute Features")
@@ -225,6 +273,30 @@ def node_generate_brief(state: MarketIntelligenceState) -> MarketIntelligenceSta
     return state
 
 
+def node_build_dashboard_snapshot(state: MarketIntelligenceState) -> MarketIntelligenceState:
+    """
+    Node : Snapshot des données dashboard (global + communautés)
+    
+    Sur un run sans donnée nouvelle, le snapshot n'est écrit que s'il
+    manque ou est antérieur aux dernières lignes ingérées.
+    """
+    logger.info("🔄 Node: Build Dashboard Snapshot")
+    
+    try:
+        target_date = state['target_date']
+        if state['downstream_skipped'] and has_fresh_snapshot(target_date):
+            logger.info("⏭️  Snapshot dashboard déjà à jour")
+            return state
+        count = compute_dashboard_snapshot(target_date)
+        state['dashboard_snapshots_count'] = count
+        logger.info(f"✅ Snapshots dashboard écrits : {count}")
+    except Exception as e:
+        logger.error(f"❌ Erreur dashboard snapshot : {e}")
+        state['errors'].append(f"build_dashboard_snapshot: {e}")
+    
+    return state
+
+
 def node_send_alerts(state: MarketIntelligenceState) -> MarketIntelligenceState:
     """Node : Envoi des alertes"""
     logger.info("🔄 Node: Send Alerts")
@@ -250,6 +322,7 @@ def create_market_intelligence_graph() -> StateGraph:
     1. ingest_transactions
     2. ingest_mortgages
     3. ingest_rental_index (nouveau)
+       → snapshot (12) puis fin si aucune donnée nouvelle et calculs du jour déjà faits
     4. compute_features (nouveau)
     5. compute_baselines
     6. compute_regimes
@@ -258,7 +331,8 @@ def create_market_intelligence_graph() -> StateGraph:
     9. compute_scores
     10. compute_risk_summary (nouveau)
     11. generate_brief
-    12. send_alerts
+    12. build_dashboard_snapshot (lecture dashboard par clé primaire)
+    13. send_alerts
     """
     
     workflow = StateGraph(MarketIntelligenceState)
@@ -267,6 +341,7 @@ def create_market_intelligence_graph() -> StateGraph:
     workflow.add_node("ingest_transactions", node_ingest_transactions)
     workflow.add_node("ingest_mortgages", node_ingest_mortgages)
     workflow.add_node("ingest_rental_index", node_ingest_rental_index)
+    workflow.add_node("check_new_data", node_check_new_data)
     workflow.add_node("compute_features", node_compute_features)
     workflow.add_node("compute_baselines", node_compute_baselines)
     workflow.add_node("compute_regimes", node_compute_regimes)
@@ -275,13 +350,19 @@ def create_market_intelligence_graph() -> StateGraph:
     workflow.add_node("compute_scores", node_compute_scores)
     workflow.add_node("compute_risk_summary", node_compute_risk_summary)
     workflow.add_node("generate_brief", node_generate_brief)
+    workflow.add_node("build_dashboard_snapshot", node_build_dashboard_snapshot)
     workflow.add_node("send_alerts", node_send_alerts)
     
     # Définir les edges (flux enrichi)
     workflow.set_entry_point("ingest_transactions")
     workflow.add_edge("ingest_transactions", "ingest_mortgages")
     workflow.add_edge("ingest_mortgages", "ingest_rental_index")
-    workflow.add_edge("ingest_rental_index", "compute_features")
+    workflow.add_edge("ingest_rental_index", "check_new_data")
+    workflow.add_conditional_edges(
+        "check_new_data",
+        route_after_ingestion,
+        {"compute_features": "compute_features", "build_dashboard_snapshot": "build_dashboard_snapshot"}
+    )
     workflow.add_edge("compute_features", "compute_baselines")
     workflow.add_edge("compute_baselines", "compute_regimes")
     workflow.add_edge("compute_regimes", "compute_kpis")
@@ -289,7 +370,12 @@ def create_market_intelligence_graph() -> StateGraph:
     workflow.add_edge("detect_anomalies", "compute_scores")
     workflow.add_edge("compute_scores", "compute_risk_summary")
     workflow.add_edge("compute_risk_summary", "generate_brief")
-    workflow.add_edge("generate_brief", "send_alerts")
+    workflow.add_edge("generate_brief", "build_dashboard_snapshot")
+    workflow.add_conditional_edges(
+        "build_dashboard_snapshot",
+        route_after_snapshot,
+        {"send_alerts": "send_alerts", END: END}
+    )
     workflow.add_edge("send_alerts", END)
     
     return workflow.compile()
@@ -325,7 +411,9 @@ def run_daily_pipeline(target_date: date = None) -> MarketIntelligenceState:
         opportunities_count=0,
         risk_summaries_count=0,
         brief_generated=False,
+        dashboard_snapshots_count=0,
         alerts_sent=0,
+        downstream_skipped=False,
         errors=[]
     )
     
@@ -333,6 +421,10 @@ def run_daily_pipeline(target_date: date = None) -> MarketIntelligenceState:
     graph = create_market_intelligence_graph()
     final_state = graph.invoke(initial_state)
     
+    # Données ou snapshot recalculés : invalider le cache partagé (app, poller, autres workers)
+    if not final_state['downstream_skipped'] or final_state['dashboard_snapshots_count']:
+        cache.invalidate()
+    
     # Résumé enrichi
     logger.info("=" * 60)
     logger.info("📊 RÉSUMÉ DU PIPELINE ENRICHI")
@@ -357,7 +449,10 @@ def run_daily_pipeline(target_date: date = None) -> MarketIntelligenceState:
     logger.info("-" * 40)
     logger.info("SORTIES :")
     logger.info(f"  Brief CIO : {'✅' if final_state['brief_generated'] else '❌'}")
+    logger.info(f"  Snapshots dashboard : {final_state['dashboard_snapshots_count']}")
     logger.info(f"  Alertes : {final_state['alerts_sent']}")
+    if final_state['downstream_skipped']:
+        logger.info("  Calculs : sautés (aucune donnée nouvelle)")
     
     if final_state['errors']:
         logger.warning(f"⚠️  Erreurs : {len(final_state['errors'])}")
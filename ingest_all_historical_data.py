@@ -12,7 +12,7 @@ from connectors.bayut_api import BayutAPIConnector
 from connectors.dld_rental_index import DLDRentalIndexConnector
 from pipelines.ingest_transactions import ingest_transactions
 from pipelines.ingest_rental_index import ingest_rental_index as ingest_rental_pipeline
-import time
+from jobs.backfill import run_backfill
 
 
 def ingest_historical_transactions(months_back: int = 12):
@@ -31,38 +31,17 @@ def ingest_historical_transactions(months_back: int = 12):
     
     logger.info(f"Période: {start_date} → {end_date}")
     
-    # Récupérer les transactions par tranches de 30 jours
-    current_date = start_date
-    total_transactions = 0
+    # Tranches de 30 jours en parallèle, reprise des tranches non terminées
+    # (mode strict : une tranche incomplète échoue au lieu d'être marquée terminée)
+    summary = run_backfill(
+        "transactions",
+        start_date,
+        end_date,
+        lambda chunk_start, chunk_end: ingest_transactions(start_date=chunk_start, end_date=chunk_end, strict=True)
+    )
     
-    while current_date < end_date:
-        chunk_end = min(current_date + timedelta(days=30), end_date)
-        
-        logger.info(f"Récupération: {current_date} → {chunk_end}")
-        
-        try:
-            # Utiliser le pipeline d'ingestion
-            inserted = ingest_transactions(
-                start_date=current_date,
-                end_date=chunk_end
-            )
-            
-            if inserted > 0:
-                logger.success(f"  ✓ {inserted} transactions insérées")
-                total_transactions += inserted
-            else:
-                logger.warning(f"  ⚠ Aucune transaction pour cette période")
-            
-            # Pause pour éviter rate limiting
-            time.sleep(2)
-            
-        except Exception as e:
-            logger.error(f"  ✗ Erreur: {e}")
-        
-        current_date = chunk_end
-    
-    logger.success(f"✓ TOTAL: {total_transactions} transactions historiques ingérées")
-    return total_transactions
+    logger.success(f"✓ TOTAL: {summary['rows']} transactions historiques ingérées")
+    return summary['rows']
 
 
 def ingest_historical_listings(days_back: int = 90):
@@ -153,7 +132,6 @@ def ingest_historical_listings(days_back: int = 90):
                         logger.debug(f"    Skip listing {listing.listing_id}: {e}")
                 
                 page += 1
-                time.sleep(1)  # Rate limiting
             
             logger.success(f"  ✓ {location_total} annonces insérées pour {location}")
             total_listings += location_total
@@ -8,8 +8,10 @@ from loguru import logger
 from connectors.dld_transactions import DLDTransactionsConnector
 from connectors.bayut_api import BayutAPIConnector
 from connectors.dld_rental_index import DLDRentalIndexConnector
+from core.config import settings
+from core.models import Transaction
+from jobs.backfill import run_backfill, chunk_id, parse_chunk_id
 import pandas as pd
-import time
 import os
 
 
@@ -28,30 +30,40 @@ def fetch_all_transactions(months_back: int = 12):
     
     logger.info(f"Période: {start_date} → {end_date}")
     
-    all_transactions = []
-    current_date = start_date
+    # Chaque tranche est écrite sur disque : une relance ne refait que les tranches manquantes
+    chunk_dir = os.path.join(settings.backfill_checkpoint_dir, "transactions_csv")
+    os.makedirs(chunk_dir, exist_ok=True)
     
-    while current_date < end_date:
-        chunk_end = min(current_date + timedelta(days=30), end_date)
+    def fetch_chunk(chunk_start: date, chunk_end: date) -> int:
+        transactions = connector.fetch_transactions(start_date=chunk_start, end_date=chunk_end, strict=True)
         
-        logger.info(f"Récupération: {current_date} → {chunk_end}")
+        tmp_path = os.path.join(chunk_dir, f"{chunk_id((chunk_start, chunk_end))}.jsonl.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for transaction in transactions:
+                f.write(transaction.model_dump_json() + "\n")
+        os.replace(tmp_path, tmp_path[:-len(".tmp")])
         
-        try:
-            transactions = connector.fetch_transactions(
-                start_date=current_date,
-                end_date=chunk_end
-            )
-            
-            if transactions:
-                logger.info(f"  ✓ {len(transactions)} transactions")
-                all_transactions.extend(transactions)
-            
-            time.sleep(2)  # Rate limiting
-            
-        except Exception as e:
-            logger.error(f"  ✗ Erreur: {e}")
-        
-        current_date = chunk_end
+        return len(transactions)
+    
+    run_backfill("transactions_csv", start_date, end_date, fetch_chunk)
+    
+    # Recharger les fichiers de tranches qui recouvrent la période (y compris
+    # ceux des runs précédents, dont les tranches de bord diffèrent)
+    transactions_by_id = {}
+    for filename in sorted(os.listdir(chunk_dir)):
+        if not filename.endswith(".jsonl"):
+            continue
+        chunk_start, chunk_end = parse_chunk_id(filename[:-len(".jsonl")])
+        if chunk_end < start_date or chunk_start > end_date:
+            continue
+        with open(os.path.join(chunk_dir, filename), encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                transaction = Transaction.model_validate_json(line)
+                if start_date <= transaction.transaction_date <= end_date:
+                    transactions_by_id[transaction.transaction_id] = transaction
+    all_transactions = list(transactions_by_id.values())
     
     logger.success(f"✓ TOTAL: {len(all_transactions)} transactions récupérées")
     return all_transactions
@@ -101,7 +113,6 @@ def fetch_all_listings(days_back: int = 90):
                 all_listings.extend(listings)
                 
                 page += 1
-                time.sleep(1)
             
         except Exception as e:
             logger.error(f"  ✗ Erreur {location}: {e}")
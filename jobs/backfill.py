@@ -0,0 +1,215 @@
+"""
+Backfill historique reprenable
+
+Découpe une période en tranches de dates, exécute les tranches en
+parallèle sur un pool de workers et enregistre un checkpoint par tranche
+(statut, nombre de lignes, erreur). Une relance ne rejoue que les tranches
+non terminées.
+
+Les tranches sont alignées sur une grille fixe (blocs de chunk_days jours
+comptés depuis BACKFILL_EPOCH) : d'un jour à l'autre, seules les tranches
+de bord changent, les tranches intérieures gardent leur identifiant et ne
+sont pas rejouées. Une tranche contenue dans une tranche déjà terminée
+est aussi considérée comme terminée. Une tranche qui se termine aujourd'hui
+(ou plus tard) reste "open" : ses données peuvent encore arriver.
+
+process_chunk doit lever une exception sur toute récupération incomplète
+(erreur HTTP, repli MOCK, pagination tronquée) : sinon la tranche serait
+enregistrée comme terminée avec des données partielles.
+
+Le débit vers les APIs est borné par le limiteur process-wide des
+connecteurs : ajouter des workers n'augmente pas le budget de requêtes.
+"""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from core.config import settings
+
+
+ChunkFunction = Callable[[date, date], int]
+
+# Origine de la grille des tranches (ne pas modifier : les identifiants en dépendent)
+BACKFILL_EPOCH = date(2000, 1, 1)
+
+
+def split_date_range(start_date: date, end_date: date, chunk_days: int) -> List[Tuple[date, date]]:
+    """
+    Découper [start_date, end_date] en tranches alignées sur la grille
+
+    Les bornes des tranches sont des multiples de chunk_days jours depuis
+    BACKFILL_EPOCH ; seules la première et la dernière tranche sont
+    rognées aux bornes de la période.
+    """
+    chunks = []
+    offset = (start_date - BACKFILL_EPOCH).days % chunk_days
+    current = start_date
+    chunk_end = start_date + timedelta(days=chunk_days - 1 - offset)
+    while current <= end_date:
+        chunk_end = min(chunk_end, end_date)
+        chunks.append((current, chunk_end))
+        current = chunk_end + timedelta(days=1)
+        chunk_end = current + timedelta(days=chunk_days - 1)
+    return chunks
+
+
+def chunk_id(chunk: Tuple[date, date]) -> str:
+    """Identifiant de tranche "YYYY-MM-DD_YYYY-MM-DD" """
+    return f"{chunk[0].isoformat()}_{chunk[1].isoformat()}"
+
+
+def parse_chunk_id(key: str) -> Tuple[date, date]:
+    """Inverse de chunk_id"""
+    start, end = key.split("_")
+    return date.fromisoformat(start), date.fromisoformat(end)
+
+
+class BackfillCheckpoint:
+    """
+    Checkpoints d'un job de backfill (fichier JSON, écriture atomique)
+
+    Un fichier par job : {chunk_id: {status, row_count, error, attempts, updated_at}}
+    Statuts : running, done, open (tranche récente, à rejouer), failed
+    """
+
+    def __init__(self, job_name: str, directory: Optional[str] = None):
+        self.job_name = job_name
+        self.directory = directory or settings.backfill_checkpoint_dir
+        self.path = os.path.join(self.directory, f"{job_name}.json")
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict] = self._read()
+
+    def _read(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Checkpoint {self.path} illisible, reprise de zéro : {e}")
+            return {}
+
+    def _write(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def status(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._state.get(key, {}).get("status")
+
+    def is_done(self, chunk: Tuple[date, date]) -> bool:
+        """Tranche terminée, elle-même ou via une tranche terminée qui la contient"""
+        with self._lock:
+            if self._state.get(chunk_id(chunk), {}).get("status") == "done":
+                return True
+            for key, entry in self._state.items():
+                if entry.get("status") != "done":
+                    continue
+                done_start, done_end = parse_chunk_id(key)
+                if done_start <= chunk[0] and chunk[1] <= done_end:
+                    return True
+        return False
+
+    def mark(self, key: str, status: str, row_count: int = 0, error: Optional[str] = None):
+        """Enregistrer l'état d'une tranche (persisté immédiatement)"""
+        with self._lock:
+            entry = self._state.setdefault(key, {"attempts": 0})
+            if status == "running":
+                entry["attempts"] = entry.get("attempts", 0) + 1
+            entry.update({
+                "status": status,
+                "row_count": row_count,
+                "error": error,
+                "updated_at": datetime.now().isoformat(timespec="seconds")
+            })
+            self._write()
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for entry in self._state.values():
+                counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+            return counts
+
+
+def run_backfill(
+    job_name: str,
+    start_date: date,
+    end_date: date,
+    process_chunk: ChunkFunction,
+    chunk_days: Optional[int] = None,
+    workers: Optional[int] = None,
+    checkpoint: Optional[BackfillCheckpoint] = None
+) -> Dict[str, int]:
+    """
+    Exécuter un backfill reprenable
+
+    Args:
+        job_name: Nom du job (nom du fichier de checkpoint)
+        start_date: Début de période (inclus)
+        end_date: Fin de période (incluse)
+        process_chunk: Fonction (début, fin) -> nombre de lignes traitées
+        chunk_days: Taille des tranches (défaut settings.backfill_chunk_days)
+        workers: Tranches en parallèle (défaut settings.backfill_workers)
+        checkpoint: Store de checkpoints (défaut BackfillCheckpoint(job_name))
+
+    Returns:
+        Résumé : chunks, skipped, done, open, failed, rows
+    """
+    chunk_days = chunk_days or settings.backfill_chunk_days
+    workers = workers or settings.backfill_workers
+    checkpoint = checkpoint or BackfillCheckpoint(job_name)
+
+    chunks = split_date_range(start_date, end_date, chunk_days)
+    pending = [chunk for chunk in chunks if not checkpoint.is_done(chunk)]
+
+    logger.info(
+        f"Backfill {job_name} : {len(chunks)} tranches de {chunk_days} jours, "
+        f"{len(chunks) - len(pending)} déjà terminées, {len(pending)} à traiter ({workers} workers)"
+    )
+
+    summary = {"chunks": len(chunks), "skipped": len(chunks) - len(pending), "done": 0, "open": 0, "failed": 0, "rows": 0}
+    today = date.today()
+
+    def run_chunk(chunk: Tuple[date, date]) -> Tuple[int, str]:
+        key = chunk_id(chunk)
+        checkpoint.mark(key, "running")
+        try:
+            rows = process_chunk(*chunk)
+        except Exception as e:
+            checkpoint.mark(key, "failed", error=str(e)[:500])
+            raise
+        # Tranche non close : de nouvelles données peuvent encore arriver
+        status = "open" if chunk[1] >= today else "done"
+        checkpoint.mark(key, status, row_count=rows)
+        return rows, status
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_chunk, chunk): chunk for chunk in pending}
+        for future in as_completed(futures):
+            chunk = futures[future]
+            try:
+                rows, status = future.result()
+            except Exception as e:
+                summary["failed"] += 1
+                logger.error(f"  ✗ {chunk[0]} → {chunk[1]} : {e}")
+                continue
+
+            summary[status] += 1
+            summary["rows"] += rows
+            logger.info(f"  ✓ {chunk[0]} → {chunk[1]} : {rows} lignes")
+
+    if summary["failed"]:
+        logger.warning(f"Backfill {job_name} : {summary['failed']} tranches en échec, relancer pour les reprendre")
+    else:
+        logger.success(f"✓ Backfill {job_name} terminé : {summary['rows']} lignes")
+
+    return summary
@@ -4,7 +4,10 @@ Job quotidien - Exécution automatique du pipeline
 from datetime import date
 from loguru import logger
 from core.utils import setup_logging, get_dubai_today
+from core.http_client import log_http_stats
+from core.location_names import log_location_name_stats
 from graphs.market_intelligence_graph import run_daily_pipeline
+from realtime.refresher import warm_dashboard_cache
 
 
 def main():
@@ -22,6 +25,13 @@ def main():
         # Exécuter le pipeline complet via LangGraph
         final_state = run_daily_pipeline(target_date)
         
+        # Dashboard prêt pour le premier visiteur
+        warm_dashboard_cache(target_date)
+        
+        # Réutilisation des connexions et latence par API
+        log_http_stats()
+        log_location_name_stats()
+        
         # Vérifier les erreurs
         if final_state['errors']:
             logger.warning(f"⚠️  Job terminé avec {len(final_state['errors'])} erreurs")
@@ -0,0 +1,236 @@
+"""
+Pipeline : Snapshot des données dashboard
+
+Matérialise en fin de pipeline (après le brief CIO) les données lues par
+le dashboard dans robin.dashboard_snapshots :
+- une ligne marché global (community = '') : KPIs, stats journalières,
+  top quartiers, types de biens, opportunités, régimes, brief ;
+- une ligne par communauté active sur 30 jours : KPIs, répartition par
+  typologie, top opportunités et régimes de la communauté.
+
+Les tranches par communauté sont calculées par 4 requêtes groupées, quel
+que soit le nombre de communautés. Le dashboard lit ensuite une seule
+ligne par clé primaire (DataRefresher.get_snapshot).
+
+Sérialisation JSON : Decimal -> float, dates -> ISO 8601, UUID -> str.
+normalize_payload ramène les deux chemins de lecture (snapshot JSON et
+calcul direct) aux mêmes types : float, date/datetime, str.
+
+Fraîcheur : un snapshot n'est servi que s'il est postérieur au dernier
+run d'ingestion ayant inséré des lignes (ingestion_watermarks.last_new_at) ;
+sinon le dashboard recalcule depuis la base jusqu'au snapshot suivant.
+"""
+import json
+import re
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from loguru import logger
+
+from core.db import db
+from core.utils import get_dubai_today
+
+
+# Opportunités conservées par communauté
+TOP_OPPORTUNITIES_PER_COMMUNITY = 5
+
+# Snapshot s (alias) postérieur à toute ingestion de lignes nouvelles
+FRESH_SNAPSHOT_CONDITION = """
+    NOT EXISTS (
+        SELECT 1 FROM ingestion_watermarks w
+        WHERE w.last_new_at > s.computed_at
+    )
+"""
+
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_ISO_DATETIME = re.compile(r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}")
+
+
+def compute_dashboard_snapshot(target_date: Optional[date] = None) -> int:
+    """
+    Calculer et enregistrer les snapshots dashboard d'une date
+
+    Les lignes existantes de la date sont remplacées dans une seule
+    transaction : le dashboard ne voit jamais un snapshot partiel.
+
+    Args:
+        target_date: Date cible (défaut: aujourd'hui)
+
+    Returns:
+        Nombre de lignes écrites (global + communautés)
+    """
+    from realtime.refresher import DataRefresher
+
+    if not target_date:
+        target_date = get_dubai_today()
+
+    logger.info(f"Calcul du snapshot dashboard pour {target_date}")
+
+    snapshots = {"": DataRefresher.compute_dashboard_payload(target_date)}
+    snapshots.update(_community_slices(target_date))
+
+    # computed_at = horloge de la base, comme last_new_at des watermarks
+    values = [
+        (target_date, community, json.dumps(payload, default=_json_default))
+        for community, payload in snapshots.items()
+    ]
+
+    with db.get_cursor(dict_cursor=False) as cursor:
+        cursor.execute("DELETE FROM dashboard_snapshots WHERE snapshot_date = %s", (target_date,))
+        cursor.executemany(
+            """
+            INSERT INTO dashboard_snapshots (snapshot_date, community, payload, computed_at)
+            VALUES (%s, %s, %s, NOW())
+            """,
+            values
+        )
+
+    logger.info(f"Snapshot dashboard : marché global + {len(values) - 1} communautés")
+    return len(values)
+
+
+def has_fresh_snapshot(target_date: date) -> bool:
+    """Snapshot marché global de la date présent et postérieur aux dernières ingestions"""
+    query = f"""
+    SELECT 1 FROM dashboard_snapshots s
+    WHERE s.snapshot_date = %s AND s.community = ''
+        AND {FRESH_SNAPSHOT_CONDITION}
+    """
+    return bool(db.execute_query(query, (target_date,)))
+
+
+def normalize_payload(value: Any) -> Any:
+    """
+    Types communs des données dashboard, quelle que soit la source
+
+    Decimal -> float, UUID -> str, chaînes ISO 8601 (snapshot JSON) ->
+    date / datetime ; les dates et entiers du calcul direct sont conservés.
+    """
+    if isinstance(value, dict):
+        return {key: normalize_payload(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [normalize_payload(item) for item in value]
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, str):
+        try:
+            if _ISO_DATE.match(value):
+                return date.fromisoformat(value)
+            if _ISO_DATETIME.match(value):
+                return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _community_slices(target_date: date) -> Dict[str, Dict[str, Any]]:
+    """Données dashboard par communauté (requêtes groupées)"""
+    slices: Dict[str, Dict[str, Any]] = {}
+
+    for row in _community_kpis(target_date):
+        community = row.pop("community")
+        slices[community] = {
+            "community": community,
+            "kpis": row,
+            "property_types": {"by_rooms": []},
+            "top_opportunities": [],
+            "regimes": [],
+        }
+
+    for row in _community_rooms(target_date):
+        community = row.pop("community")
+        if community in slices:
+            slices[community]["property_types"]["by_rooms"].append(row)
+
+    for row in _community_opportunities(target_date):
+        if row["community"] in slices:
+            slices[row["community"]]["top_opportunities"].append(row)
+
+    for row in _community_regimes(target_date):
+        if row["community"] in slices:
+            slices[row["community"]]["regimes"].append(row)
+
+    return slices
+
+
+def _community_kpis(target_date: date) -> List[Dict]:
+    """KPIs 30 jours par communauté (mêmes fenêtres que les KPIs globaux)"""
+    query = """
+    SELECT
+        community,
+        COUNT(*) FILTER (WHERE transaction_date = %s) AS transactions_today,
+        COUNT(*) FILTER (WHERE transaction_date >= %s - INTERVAL '7 days') AS transactions_7d,
+        COUNT(*) AS transactions_30d,
+        COALESCE(SUM(price_aed) FILTER (WHERE transaction_date = %s), 0) AS volume_today,
+        COALESCE(SUM(price_aed) FILTER (WHERE transaction_date >= %s - INTERVAL '7 days'), 0) AS volume_7d,
+        COALESCE(SUM(price_aed), 0) AS volume_30d,
+        COALESCE(AVG(price_per_sqft), 0) AS avg_price_sqft,
+        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY price_per_sqft) AS median_price_sqft,
+        AVG(area_sqft) AS avg_area
+    FROM transactions
+    WHERE transaction_date >= %s - INTERVAL '30 days'
+        AND transaction_date <= %s
+        AND community IS NOT NULL
+    GROUP BY community
+    """
+    return db.execute_query(query, (target_date,) * 6) or []
+
+
+def _community_rooms(target_date: date) -> List[Dict]:
+    """Répartition par typologie (rooms_bucket) par communauté"""
+    query = """
+    SELECT
+        community,
+        COALESCE(rooms_bucket, 'Unknown') AS rooms_bucket,
+        COUNT(*) AS count,
+        AVG(price_per_sqft) AS avg_price_sqft,
+        AVG(price_aed) AS avg_price,
+        SUM(price_aed) AS total_volume
+    FROM transactions
+    WHERE transaction_date >= %s - INTERVAL '30 days'
+        AND transaction_date <= %s
+        AND community IS NOT NULL
+    GROUP BY community, rooms_bucket
+    ORDER BY community, count DESC
+    """
+    return db.execute_query(query, (target_date, target_date)) or []
+
+
+def _community_opportunities(target_date: date) -> List[Dict]:
+    """Top opportunités actives du jour par communauté"""
+    query = """
+    SELECT *
+    FROM (
+        SELECT o.*, ROW_NUMBER() OVER (PARTITION BY community ORDER BY global_score DESC) AS community_rank
+        FROM opportunities o
+        WHERE detection_date = %s AND status = 'active' AND community IS NOT NULL
+    ) ranked
+    WHERE community_rank <= %s
+    ORDER BY community, community_rank
+    """
+    return db.execute_query(query, (target_date, TOP_OPPORTUNITIES_PER_COMMUNITY)) or []
+
+
+def _community_regimes(target_date: date) -> List[Dict]:
+    """Régimes de marché du jour par communauté"""
+    query = """
+    SELECT * FROM market_regimes
+    WHERE regime_date = %s AND community IS NOT NULL
+    ORDER BY community, confidence_score DESC
+    """
+    return db.execute_query(query, (target_date,)) or []
+
+
+def _json_default(value: Any) -> Any:
+    """Types non JSON des résultats de requêtes"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Type non sérialisable : {type(value).__name__}")
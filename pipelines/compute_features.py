@@ -7,15 +7,23 @@ Normalise les données de transactions et listings en features exploitables :
 - Filtrage des outliers (< 500 AED/sqft ou > 10 000 AED/sqft)
 - Différenciation listing (ask) vs transaction (real paid)
 - Enrichissement avec données Makani (geo-features)
+
+Les paquets sont traités en colonnes (pandas/NumPy, _build_feature_frame)
+sans instancier de Feature par ligne ; _process_transactions et
+_process_listings restent la référence ligne à ligne (mêmes règles,
+mêmes compteurs de rejet).
 """
 from datetime import date, datetime, timedelta
-from typing import Optional, List, Dict, Tuple
+from typing import Optional, List, Dict, Tuple, Iterator
 from decimal import Decimal
+import asyncio
 import time
+import numpy as np
+import pandas as pd
 from loguru import logger
 
 from core.db import db
-from core.models import Feature, Transaction, Listing, QualityLog
+from core.models import Feature, Transaction, Listing, QualityLog, MakaniAddress
 from core.utils import (
     normalize_location_name, 
     normalize_rooms_bucket, 
@@ -23,12 +31,32 @@ from core.utils import (
     get_dubai_today
 )
 from connectors.makani_geocoding import MakaniGeocodingConnector
+from core.geocode_cache import GeocodeCache
+from core.http_client import AsyncRunner
 
 
 # Seuils de filtrage des outliers
 MIN_PRICE_PER_SQFT = 500
 MAX_PRICE_PER_SQFT = 10000
 
+# Colonnes de la table features (ordre d'insertion)
+FEATURE_COLUMNS = [
+    'source_type', 'source_id', 'record_date',
+    'community', 'project', 'building', 'rooms_bucket', 'property_type',
+    'price_aed', 'price_per_sqft', 'area_sqft',
+    'is_offplan', 'days_on_market', 'price_change_count',
+    'makani_number', 'latitude', 'longitude',
+    'metro_distance_m', 'beach_distance_m', 'mall_distance_m', 'location_score'
+]
+
+GEO_FIELDS = ["makani_number", "latitude", "longitude", "metro_distance_m", "beach_distance_m", "mall_distance_m"]
+
+# Colonnes source propres à chaque type (identifiant, date, prix, prix/sqft)
+SOURCE_COLUMNS = {
+    "transaction": ("transaction_id", "transaction_date", "price_aed", "price_per_sqft"),
+    "listing": ("listing_id", "listing_date", "asking_price_aed", "asking_price_per_sqft"),
+}
+
 
 def compute_features(target_date: Optional[date] = None) -> Tuple[int, QualityLog]:
     """
@@ -69,28 +97,42 @@ def compute_features(target_date: Optional[date] = None) -> Tuple[int, QualityLo
         "field_completeness": {}
     }
     
-    all_features = []
-    
-    # 1. Récupérer et traiter les transactions
-    transactions = _fetch_recent_transactions(target_date)
-    tx_features, tx_stats = _process_transactions(transactions)
-    all_features.extend(tx_features)
-    _merge_quality_stats(quality_stats, tx_stats, "transaction")
-    
-    # 2. Récupérer et traiter les listings
-    listings = _fetch_recent_listings(target_date)
-    listing_features, listing_stats = _process_listings(listings)
-    all_features.extend(listing_features)
-    _merge_quality_stats(quality_stats, listing_stats, "listing")
-    
-    # 3. Enrichir avec Makani (batch pour optimiser)
-    all_features = _enrich_with_makani(all_features)
+    # Traitement en streaming : les sources sont lues par paquets
+    # (cursor serveur), chaque paquet est normalisé, enrichi et inséré
+    # avant de lire le suivant -> mémoire bornée quelle que soit la fenêtre
+    location_cache: Dict[str, dict] = {}
+    non_null_counts: Dict[str, int] = {}
+    features_total = 0
+    inserted_count = 0
+    
+    sources = [
+        ("transaction", _iter_recent_transactions(target_date)),
+        ("listing", _iter_recent_listings(target_date)),
+    ]
     
-    # 4. Insérer dans la base
-    inserted_count = _insert_features(all_features)
+    # Une boucle asyncio pour tous les lots Makani du run (pool HTTP réutilisé)
+    with AsyncRunner() as runner:
+        for source_type, batches in sources:
+            for batch in batches:
+                # 1-2. Normaliser et filtrer (en colonnes)
+                frame, stats = _build_feature_frame(batch, source_type)
+                _merge_quality_stats(quality_stats, stats, source_type)
+                
+                # 3. Enrichir avec Makani (cache partagé entre paquets)
+                frame = _enrich_frame_with_makani(frame, location_cache, runner)
+                
+                # 4. Insérer dans la base
+                inserted_count += _insert_feature_frame(frame)
+                
+                # 5. Compter les champs renseignés pour la complétude
+                for field in COMPLETENESS_FIELDS:
+                    non_null_counts[field] = non_null_counts.get(field, 0) + int(frame[field].notna().sum())
+                features_total += len(frame)
     
-    # 5. Calculer les stats de complétude
-    quality_stats["field_completeness"] = _calculate_field_completeness(all_features)
+    quality_stats["field_completeness"] = {
+        field: round(count / features_total * 100, 1)
+        for field, count in non_null_counts.items()
+    } if features_total else {}
     
     # Créer le log de qualité
     execution_time_ms = int((time.time() - start_time) * 1000)
@@ -116,8 +158,8 @@ def compute_features(target_date: Optional[date] = None) -> Tuple[int, QualityLo
     return inserted_count, quality_log
 
 
-def _fetch_recent_transactions(target_date: date) -> List[Dict]:
-    """Récupérer les transactions récentes (7 derniers jours)"""
+def _iter_recent_transactions(target_date: date) -> Iterator[Dict[str, list]]:
+    """Streamer les transactions récentes (7 derniers jours) par paquets"""
     query = """
     SELECT 
         transaction_id,
@@ -136,17 +178,11 @@ def _fetch_recent_transactions(target_date: date) -> List[Dict]:
         AND transaction_date <= %s
     ORDER BY transaction_date DESC
     """
-    try:
-        results = db.execute_query(query, (target_date, target_date))
-        logger.info(f"Transactions récupérées : {len(results)}")
-        return results or []
-    except Exception as e:
-        logger.error(f"Erreur récupération transactions : {e}")
-        return []
+    yield from _iter_source(query, (target_date, target_date), "transactions")
 
 
-def _fetch_recent_listings(target_date: date) -> List[Dict]:
-    """Récupérer les listings récents (actifs des 30 derniers jours)"""
+def _iter_recent_listings(target_date: date) -> Iterator[Dict[str, list]]:
+    """Streamer les listings récents (actifs des 30 derniers jours) par paquets"""
     query = """
     SELECT 
         listing_id,
@@ -166,13 +202,25 @@ def _fetch_recent_listings(target_date: date) -> List[Dict]:
         AND listing_date >= %s - INTERVAL '30 days'
     ORDER BY listing_date DESC
     """
+    yield from _iter_source(query, (target_date,), "listings")
+
+
+def _iter_source(query: str, params: tuple, label: str) -> Iterator[Dict[str, list]]:
+    """
+    Streamer une requête source par paquets (db.iter_query, format colonnes)
+    
+    Une erreur de lecture est loggée puis propagée : le run échoue au
+    lieu d'être déclaré réussi sur une source tronquée.
+    """
+    count = 0
     try:
-        results = db.execute_query(query, (target_date,))
-        logger.info(f"Listings récupérés : {len(results)}")
-        return results or []
+        for batch in db.iter_query(query, params, row_format="columns"):
+            count += len(next(iter(batch.values()), []))
+            yield batch
     except Exception as e:
-        logger.error(f"Erreur récupération listings : {e}")
-        return []
+        logger.error(f"Erreur récupération {label} après {count} lignes : {e}")
+        raise
+    logger.info(f"Lignes {label} récupérées : {count}")
 
 
 def _process_transactions(transactions: List[Dict]) -> Tuple[List[Feature], Dict]:
@@ -337,136 +385,263 @@ def _process_listings(listings: List[Dict]) -> Tuple[List[Feature], Dict]:
     return features, stats
 
 
-def _enrich_with_makani(features: List[Feature]) -> List[Feature]:
+def _build_feature_frame(columns: Dict[str, list], source_type: str) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Normaliser et filtrer un paquet source en colonnes
+    
+    Applique les règles de _process_transactions / _process_listings sur
+    des tableaux entiers : validation, calcul du prix/sqft, filtrage des
+    outliers, normalisation des noms et comptage des rejets (mêmes raisons,
+    même priorité que le chemin ligne à ligne).
+    
+    Args:
+        columns: Paquet au format colonnes (nom -> liste de valeurs)
+        source_type: 'transaction' ou 'listing'
+    
+    Returns:
+        Tuple (DataFrame des features acceptées, colonnes FEATURE_COLUMNS
+        en dtype object, stats de qualité)
+    """
+    id_column, date_column, price_column, psf_column = SOURCE_COLUMNS[source_type]
+    total = len(columns.get(id_column, []))
+    
+    def column(name: str, default=None) -> np.ndarray:
+        values = columns.get(name)
+        if values is None:
+            values = [default] * total
+        array = np.empty(total, dtype=object)
+        array[:] = values
+        return array
+    
+    prices = column(price_column)
+    areas = column("area_sqft")
+    price_num = _to_float(prices)
+    area_num = _to_float(areas)
+    
+    # Valeurs "fausses" (None, 0, "") : absentes ; non numériques : invalides
+    price_empty = pd.isna(prices) | (prices == "") | (price_num == 0)
+    area_empty = pd.isna(areas) | (areas == "") | (area_num == 0)
+    
+    remaining = np.ones(total, dtype=bool)
+    reasons = {"outliers": 0, "missing_price": 0, "missing_area": 0, "invalid_data": 0}
+    
+    def reject(mask: np.ndarray, reason: str):
+        nonlocal remaining
+        mask = remaining & mask
+        reasons[reason] += int(mask.sum())
+        remaining &= ~mask
+    
+    reject(~price_empty & np.isnan(price_num), "invalid_data")
+    reject(price_empty | (price_num <= 0), "missing_price")
+    reject(~area_empty & np.isnan(area_num), "invalid_data")
+    reject(area_empty | (area_num <= 0), "missing_area")
+    
+    # Prix/sqft : valeur source, sinon calcul exact en Decimal (lignes concernées uniquement)
+    psf = column(psf_column)
+    psf_num = _to_float(psf)
+    psf_empty = pd.isna(psf) | (psf == "") | (psf_num == 0)
+    
+    to_compute = np.flatnonzero(remaining & psf_empty)
+    for i in to_compute:
+        psf[i] = calculate_price_per_sqft(Decimal(str(prices[i])), Decimal(str(areas[i])))
+    psf_num[to_compute] = [float(psf[i]) if psf[i] is not None else np.nan for i in to_compute]
+    
+    # Un prix/sqft nul (arrondi à 0.00) n'est pas filtré et n'est pas conservé
+    psf_set = ~(pd.isna(psf) | (psf_num == 0))
+    reject(psf_set & np.isnan(psf_num), "invalid_data")
+    reject(psf_set & ((psf_num < MIN_PRICE_PER_SQFT) | (psf_num > MAX_PRICE_PER_SQFT)), "outliers")
+    
+    # Champs que Feature refuserait (bool / int non nuls)
+    record_dates = column(date_column)
+    if source_type == "transaction":
+        is_offplan = column("is_offplan", False)
+        price_changes = np.zeros(total, dtype=object)
+        days_on_market = np.full(total, None, dtype=object)
+        reject(pd.isna(record_dates) | pd.isna(is_offplan), "invalid_data")
+    else:
+        is_offplan = np.full(total, False, dtype=object)
+        price_changes = column("price_changes", 0)
+        days_on_market = column("days_on_market")
+        record_dates = np.where(pd.isna(record_dates), date.today(), record_dates)
+        reject(pd.isna(price_changes), "invalid_data")
+    
+    keep = np.flatnonzero(remaining)
+    accepted = len(keep)
+    
+    frame = pd.DataFrame({
+        "source_type": np.full(accepted, source_type, dtype=object),
+        "source_id": np.array([str(v) for v in column(id_column)[keep]], dtype=object),
+        "record_date": record_dates[keep],
+        "community": _normalize_names(column("community")[keep]),
+        "project": _normalize_names(column("project")[keep]),
+        "building": _normalize_names(column("building")[keep]),
+        "rooms_bucket": column("rooms_bucket")[keep],
+        "property_type": column("property_type")[keep],
+        "price_aed": _to_decimals(prices[keep]),
+        "price_per_sqft": _to_decimals(np.where(psf_set, psf, None)[keep]),
+        "area_sqft": _to_decimals(areas[keep]),
+        "is_offplan": is_offplan[keep],
+        "days_on_market": days_on_market[keep],
+        "price_change_count": price_changes[keep],
+    }, dtype=object)
+    for field in GEO_FIELDS + ["location_score"]:
+        frame[field] = np.full(accepted, None, dtype=object)
+    
+    stats = {
+        "total": total,
+        "accepted": accepted,
+        "rejected": total - accepted,
+        "rejection_reasons": reasons
+    }
+    return frame, stats
+
+
+def _to_float(values: np.ndarray) -> np.ndarray:
+    """Valeurs numériques en float64 (None et valeurs non numériques -> NaN)"""
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float, copy=True)
+
+
+def _normalize_names(values: np.ndarray) -> np.ndarray:
+    """normalize_location_name sur les valeurs distinctes, puis diffusion"""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    normalized = np.empty(len(uniques) + 1, dtype=object)
+    normalized[:-1] = [normalize_location_name(name) for name in uniques]
+    normalized[-1] = None  # code -1 : valeur nulle
+    return normalized[codes]
+
+
+def _to_decimals(values: np.ndarray) -> np.ndarray:
+    """Convertir en Decimal (valeurs déjà Decimal conservées, None conservé)"""
+    result = np.empty(len(values), dtype=object)
+    result[:] = [
+        v if v is None or isinstance(v, Decimal) else Decimal(str(v))
+        for v in values
+    ]
+    return result
+
+
+def _fill_location_cache(
+    makani_connector: MakaniGeocodingConnector,
+    locations: List[Tuple[Optional[str], Optional[str], Optional[str]]],
+    location_cache: Dict[str, dict],
+    runner: Optional[AsyncRunner] = None
+):
+    """Géocoder les localisations absentes du cache de run (dict vide = inconnue)"""
+    missing = {}
+    for community, project, building in locations:
+        cache_key = f"{community}|{project}|{building}"
+        if cache_key not in location_cache:
+            missing[cache_key] = (community, project, building)
+    
+    if not missing:
+        return
+    
+    addresses = _search_locations(makani_connector, list(missing.values()), runner)
+    
+    for cache_key, (community, project, building) in missing.items():
+        address = addresses.get(f"{community or ''}|{project or ''}|{building or ''}")
+        
+        if address:
+            location_cache[cache_key] = {
+                "makani_number": address.makani_number,
+                "latitude": address.latitude,
+                "longitude": address.longitude,
+                "metro_distance_m": address.metro_distance_m,
+                "beach_distance_m": address.beach_distance_m,
+                "mall_distance_m": address.mall_distance_m,
+                "location_score": makani_connector.calculate_location_score(address)
+            }
+        else:
+            location_cache[cache_key] = {}
+
+
+def _enrich_frame_with_makani(
+    frame: pd.DataFrame,
+    location_cache: Optional[Dict[str, dict]] = None,
+    runner: Optional[AsyncRunner] = None
+) -> pd.DataFrame:
     """
     Enrichir les features avec les données Makani (geo-features)
     
-    Optimise les appels en batch et avec cache
+    Le cache de run évite les doublons entre paquets, le cache persistant
+    geocode_cache les appels API pour les bâtiments déjà géocodés. Les
+    localisations distinctes du paquet sont géocodées une fois, puis
+    les geo-features sont diffusées par code de localisation. runner :
+    boucle asyncio partagée entre les paquets du run (cf. _search_locations).
     """
-    if not features:
-        return features
+    if frame.empty:
+        return frame
     
-    logger.info(f"Enrichissement Makani pour {len(features)} features")
+    logger.info(f"Enrichissement Makani pour {len(frame)} features")
     
     try:
-        makani_connector = MakaniGeocodingConnector()
+        makani_connector = MakaniGeocodingConnector(cache=GeocodeCache())
         
-        # Créer un cache pour éviter les appels dupliqués
-        location_cache: Dict[str, dict] = {}
+        if location_cache is None:
+            location_cache = {}
         
-        for feature in features:
-            # Clé de cache basée sur la localisation
-            cache_key = f"{feature.community}|{feature.project}|{feature.building}"
-            
-            if cache_key not in location_cache:
-                # Appel API Makani
-                address = makani_connector.search_address(
-                    community=feature.community,
-                    project=feature.project,
-                    building=feature.building
-                )
-                
-                if address:
-                    location_cache[cache_key] = {
-                        "makani_number": address.makani_number,
-                        "latitude": address.latitude,
-                        "longitude": address.longitude,
-                        "metro_distance_m": address.metro_distance_m,
-                        "beach_distance_m": address.beach_distance_m,
-                        "mall_distance_m": address.mall_distance_m,
-                        "location_score": makani_connector.calculate_location_score(address)
-                    }
-                else:
-                    location_cache[cache_key] = {}
-            
-            # Appliquer les données du cache
-            geo_data = location_cache.get(cache_key, {})
-            if geo_data:
-                feature.makani_number = geo_data.get("makani_number")
-                feature.latitude = geo_data.get("latitude")
-                feature.longitude = geo_data.get("longitude")
-                feature.metro_distance_m = geo_data.get("metro_distance_m")
-                feature.beach_distance_m = geo_data.get("beach_distance_m")
-                feature.mall_distance_m = geo_data.get("mall_distance_m")
-                feature.location_score = Decimal(str(geo_data.get("location_score", 0)))
+        codes, locations = pd.factorize(
+            pd.Series(list(zip(frame["community"], frame["project"], frame["building"])), dtype=object)
+        )
+        _fill_location_cache(makani_connector, list(locations), location_cache, runner)
+        
+        geo = [location_cache.get(f"{c}|{p}|{b}", {}) for c, p, b in locations]
+        for field in GEO_FIELDS:
+            frame[field] = np.array([g.get(field) for g in geo], dtype=object)[codes]
+        frame["location_score"] = np.array(
+            [Decimal(str(g.get("location_score", 0))) if g else None for g in geo],
+            dtype=object
+        )[codes]
         
         logger.info(f"Enrichissement Makani terminé : {len(location_cache)} localisations uniques")
         
     except Exception as e:
         logger.warning(f"Erreur enrichissement Makani : {e}")
     
-    return features
+    return frame
 
 
-def _insert_features(features: List[Feature]) -> int:
-    """Insérer les features dans la base de données"""
-    if not features:
-        return 0
+def _search_locations(
+    makani_connector: MakaniGeocodingConnector,
+    locations: List[Tuple[str, str, str]],
+    runner: Optional[AsyncRunner] = None
+) -> Dict[str, Optional[MakaniAddress]]:
+    """
+    Géocodage concurrent (abatch_search), séquentiel si une boucle asyncio tourne déjà
     
-    columns = [
-        'source_type', 'source_id', 'record_date',
-        'community', 'project', 'building', 'rooms_bucket', 'property_type',
-        'price_aed', 'price_per_sqft', 'area_sqft',
-        'is_offplan', 'days_on_market', 'price_change_count',
-        'makani_number', 'latitude', 'longitude',
-        'metro_distance_m', 'beach_distance_m', 'mall_distance_m', 'location_score'
-    ]
+    Sans runner fourni, une boucle est créée puis fermée (avec son pool)
+    pour ce seul appel.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        if runner is not None:
+            return runner.run(makani_connector.abatch_search(locations))
+        with AsyncRunner() as own_runner:
+            return own_runner.run(makani_connector.abatch_search(locations))
+    
+    return makani_connector.batch_search(locations)
+
+
+def _insert_feature_frame(frame: pd.DataFrame) -> int:
+    """Insérer un DataFrame de features (colonnes FEATURE_COLUMNS, valeurs Python)"""
+    if frame.empty:
+        return 0
     
-    values = []
-    for f in features:
-        values.append((
-            f.source_type,
-            f.source_id,
-            f.record_date,
-            f.community,
-            f.project,
-            f.building,
-            f.rooms_bucket,
-            f.property_type,
-            f.price_aed,
-            f.price_per_sqft,
-            f.area_sqft,
-            f.is_offplan,
-            f.days_on_market,
-            f.price_change_count,
-            f.makani_number,
-            f.latitude,
-            f.longitude,
-            f.metro_distance_m,
-            f.beach_distance_m,
-            f.mall_distance_m,
-            f.location_score
-        ))
+    values = list(zip(*(frame[column].tolist() for column in FEATURE_COLUMNS)))
     
     try:
-        # Utiliser UPSERT pour éviter les doublons
-        query = f"""
-        INSERT INTO features ({', '.join(columns)})
-        VALUES ({', '.join(['%s'] * len(columns))})
-        ON CONFLICT (source_type, source_id) DO UPDATE SET
-            record_date = EXCLUDED.record_date,
-            community = EXCLUDED.community,
-            project = EXCLUDED.project,
-            building = EXCLUDED.building,
-            rooms_bucket = EXCLUDED.rooms_bucket,
-            property_type = EXCLUDED.property_type,
-            price_aed = EXCLUDED.price_aed,
-            price_per_sqft = EXCLUDED.price_per_sqft,
-            area_sqft = EXCLUDED.area_sqft,
-            is_offplan = EXCLUDED.is_offplan,
-            days_on_market = EXCLUDED.days_on_market,
-            price_change_count = EXCLUDED.price_change_count,
-            makani_number = EXCLUDED.makani_number,
-            latitude = EXCLUDED.latitude,
-            longitude = EXCLUDED.longitude,
-            metro_distance_m = EXCLUDED.metro_distance_m,
-            beach_distance_m = EXCLUDED.beach_distance_m,
-            mall_distance_m = EXCLUDED.mall_distance_m,
-            location_score = EXCLUDED.location_score
-        """
-        
-        db.execute_batch(query, values)
-        return len(values)
+        # UPSERT sur (source_type, source_id) ; COPY + merge au-delà du seuil
+        return db.execute_batch_insert(
+            'features',
+            FEATURE_COLUMNS,
+            values,
+            conflict_columns=['source_type', 'source_id'],
+            update_columns=FEATURE_COLUMNS[2:]
+        )
         
     except Exception as e:
         logger.error(f"Erreur insertion features : {e}")
@@ -484,21 +659,8 @@ def _merge_quality_stats(main_stats: Dict, source_stats: Dict, source_type: str)
             main_stats["rejection_reasons"][reason] += count
 
 
-def _calculate_field_completeness(features: List[Feature]) -> Dict[str, float]:
-    """Calculer le taux de complétude par champ"""
-    if not features:
-        return {}
-    
-    total = len(features)
-    fields = ["community", "project", "building", "rooms_bucket", "property_type",
-              "price_aed", "price_per_sqft", "area_sqft", "location_score"]
-    
-    completeness = {}
-    for field in fields:
-        non_null = sum(1 for f in features if getattr(f, field, None) is not None)
-        completeness[field] = round(non_null / total * 100, 1)
-    
-    return completeness
+COMPLETENESS_FIELDS = ["community", "project", "building", "rooms_bucket", "property_type",
+                       "price_aed", "price_per_sqft", "area_sqft", "location_score"]
 
 
 def _save_quality_log(quality_log: QualityLog):
@@ -47,7 +47,7 @@ TARGET_YIELD = 0.06  # 6%
 WINDOWS = [7, 30, 90]
 
 
-def compute_kpis(target_date: Optional[date] = None) -> int:
+def compute_kpis(target_date: Optional[date] = None, set_based: bool = True) -> int:
     """
     Pipeline principal de calcul des KPIs
     
@@ -56,6 +56,8 @@ def compute_kpis(target_date: Optional[date] = None) -> int:
     
     Args:
         target_date: Date cible (défaut: aujourd'hui)
+        set_based: Charger les données sources de tous les scopes en quelques
+            requêtes groupées (défaut) au lieu de ~10 requêtes par scope/fenêtre
         
     Returns:
         Nombre de KPIs insérés
@@ -75,15 +77,23 @@ def compute_kpis(target_date: Optional[date] = None) -> int:
     
     all_kpis = []
     
+    # Données sources de tous les scopes (quelques requêtes groupées)
+    bulk = _fetch_bulk_kpi_inputs(target_date) if set_based else None
+    
     for community, rooms_bucket in scopes:
         for window_days in WINDOWS:
             try:
-                kpi = _compute_kpi_for_scope(
-                    target_date, 
-                    community, 
-                    rooms_bucket, 
-                    window_days
-                )
+                if bulk is not None:
+                    kpi = _compute_kpi_from_bulk(
+                        bulk, target_date, community, rooms_bucket, window_days
+                    )
+                else:
+                    kpi = _compute_kpi_for_scope(
+                        target_date, 
+                        community, 
+                        rooms_bucket, 
+                        window_days
+                    )
                 if kpi:
                     all_kpis.append(kpi)
                     qlogger.accept()
@@ -148,6 +158,33 @@ def _compute_kpi_for_scope(
     anomaly_data = _get_anomaly_stats(target_date, community, rooms_bucket, window_days)
     offplan_data = _get_offplan_stats(target_date, community, rooms_bucket, window_days)
     
+    return _build_kpi(
+        target_date, community, rooms_bucket, window_days,
+        tx_data, listing_data, rental_data, supply_data,
+        regime_data, geo_data, anomaly_data, offplan_data
+    )
+
+
+def _build_kpi(
+    target_date: date,
+    community: str,
+    rooms_bucket: str,
+    window_days: int,
+    tx_data: Dict,
+    listing_data: Dict,
+    rental_data: Dict,
+    supply_data: Dict,
+    regime_data: Dict,
+    geo_data: Dict,
+    anomaly_data: Dict,
+    offplan_data: Dict
+) -> Optional[KPI]:
+    """
+    Construire le KPI d'un scope à partir des données sources
+    
+    Partagé par le calcul par scope et le calcul set-based pour garantir
+    des valeurs identiques.
+    """
     # Vérifier données minimales
     if not tx_data.get("tx_count") or tx_data["tx_count"] < 3:
         return None
@@ -211,7 +248,7 @@ def _get_transaction_stats(
     WHERE source_type = 'transaction'
         AND community = %s
         AND rooms_bucket = %s
-        AND record_date >= %s - INTERVAL '%s days'
+        AND record_date >= %s - make_interval(days => %s)
         AND record_date <= %s
         AND price_per_sqft IS NOT NULL
     """
@@ -392,7 +429,7 @@ def _get_anomaly_stats(
     FROM opportunities
     WHERE community = %s
         AND rooms_bucket = %s
-        AND detection_date >= %s - INTERVAL '%s days'
+        AND detection_date >= %s - make_interval(days => %s)
         AND detection_date <= %s
         AND status = 'active'
     """
@@ -424,7 +461,7 @@ def _get_offplan_stats(
         AND community = %s
         AND rooms_bucket = %s
         AND is_offplan = TRUE
-        AND record_date >= %s - INTERVAL '%s days'
+        AND record_date >= %s - make_interval(days => %s)
         AND price_per_sqft IS NOT NULL
     """
     
@@ -436,7 +473,7 @@ def _get_offplan_stats(
         AND community = %s
         AND rooms_bucket = %s
         AND is_offplan = FALSE
-        AND record_date >= %s - INTERVAL '%s days'
+        AND record_date >= %s - make_interval(days => %s)
         AND price_per_sqft IS NOT NULL
     """
     
@@ -454,6 +491,298 @@ def _get_offplan_stats(
     return {}
 
 
+# ====================================================================
+# RÉCUPÉRATION SET-BASED (tous les scopes en une passe)
+# ====================================================================
+
+def _fetch_bulk_kpi_inputs(target_date: date) -> Dict[str, Dict]:
+    """
+    Récupérer les données sources de tous les scopes en requêtes groupées
+    
+    Mêmes filtres et mêmes conversions que les fonctions _get_* par scope,
+    mais une requête par source (GROUP BY scope, fenêtres via unnest)
+    au lieu d'une requête par scope et par fenêtre.
+    
+    Returns:
+        Dict source -> {clé de scope: données}
+    """
+    return {
+        "tx": _bulk_transaction_stats(target_date),
+        "tx_12m": _bulk_tx_count_12m(target_date),
+        "momentum": _bulk_momentum(),
+        "listing": _bulk_listing_stats(target_date),
+        "rental": _bulk_rental_stats(),
+        "supply": _bulk_supply_data(),
+        "regime": _bulk_regime_data(),
+        "geo": _bulk_geo_stats(),
+        "anomaly": _bulk_anomaly_stats(target_date),
+    }
+
+
+def _compute_kpi_from_bulk(
+    bulk: Dict[str, Dict],
+    target_date: date,
+    community: str,
+    rooms_bucket: str,
+    window_days: int
+) -> Optional[KPI]:
+    """Calculer les KPIs d'un scope à partir des données pré-chargées"""
+    scope = (community, rooms_bucket)
+    windowed = (community, rooms_bucket, window_days)
+    
+    tx_row = bulk["tx"].get(windowed, {})
+    tx_data = {}
+    if tx_row.get("tx_count"):
+        tx_data = {
+            "tx_count": tx_row["tx_count"],
+            "median_psf": tx_row["median_psf"],
+            "avg_sqft": tx_row["avg_sqft"],
+            "tx_count_12m": bulk["tx_12m"].get(scope, 0),
+            "momentum": bulk["momentum"].get(windowed)
+        }
+    offplan_data = {
+        "median_offplan_psf": tx_row.get("median_offplan_psf"),
+        "median_ready_psf": tx_row.get("median_ready_psf")
+    }
+    
+    return _build_kpi(
+        target_date, community, rooms_bucket, window_days,
+        tx_data,
+        bulk["listing"].get(scope, {"listing_count": 0, "median_psf": None}),
+        bulk["rental"].get(scope, {}),
+        bulk["supply"].get(community, {"planned_units_12m": 0}),
+        bulk["regime"].get(community, {"confidence": Decimal("0.5")}),
+        bulk["geo"].get(scope, {}),
+        bulk["anomaly"].get(windowed, {"days_active": 0}),
+        offplan_data
+    )
+
+
+def _bulk_transaction_stats(target_date: date) -> Dict[Tuple[str, str, int], Dict]:
+    """Stats transactions + médianes offplan/ready par scope et fenêtre"""
+    # Les stats transactions sont bornées à target_date, les médianes
+    # offplan/ready ne le sont pas (comme _get_offplan_stats)
+    query = """
+    SELECT 
+        f.community,
+        f.rooms_bucket,
+        w.window_days,
+        COUNT(*) FILTER (WHERE f.record_date <= %s) as tx_count,
+        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY f.price_per_sqft)
+            FILTER (WHERE f.record_date <= %s) as median_psf,
+        AVG(f.area_sqft) FILTER (WHERE f.record_date <= %s) as avg_sqft,
+        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY f.price_per_sqft)
+            FILTER (WHERE f.is_offplan = TRUE) as median_offplan_psf,
+        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY f.price_per_sqft)
+            FILTER (WHERE f.is_offplan = FALSE) as median_ready_psf
+    FROM features f
+    CROSS JOIN unnest(%s::int[]) AS w(window_days)
+    WHERE f.source_type = 'transaction'
+        AND f.community IS NOT NULL
+        AND f.rooms_bucket IS NOT NULL
+        AND f.price_per_sqft IS NOT NULL
+        AND f.record_date >= %s - make_interval(days => w.window_days)
+    GROUP BY f.community, f.rooms_bucket, w.window_days
+    """
+    stats = {}
+    try:
+        rows = db.execute_query(query, (target_date, target_date, target_date, WINDOWS, target_date))
+        for row in rows or []:
+            stats[(row["community"], row["rooms_bucket"], row["window_days"])] = {
+                "tx_count": row.get("tx_count", 0),
+                "median_psf": Decimal(str(row["median_psf"])) if row.get("median_psf") else None,
+                "avg_sqft": Decimal(str(row["avg_sqft"])) if row.get("avg_sqft") else None,
+                "median_offplan_psf": row["median_offplan_psf"] if row.get("median_offplan_psf") else None,
+                "median_ready_psf": row["median_ready_psf"] if row.get("median_ready_psf") else None
+            }
+    except Exception as e:
+        logger.warning(f"Erreur transaction stats (bulk) : {e}")
+    return stats
+
+
+def _bulk_tx_count_12m(target_date: date) -> Dict[Tuple[str, str], int]:
+    """Nombre de transactions sur 12 mois par scope (pour SPI)"""
+    query = """
+    SELECT community, rooms_bucket, COUNT(*) as tx_count_12m
+    FROM features
+    WHERE source_type = 'transaction'
+        AND community IS NOT NULL
+        AND rooms_bucket IS NOT NULL
+        AND record_date >= %s - INTERVAL '365 days'
+    GROUP BY community, rooms_bucket
+    """
+    try:
+        rows = db.execute_query(query, (target_date,))
+        return {(r["community"], r["rooms_bucket"]): r["tx_count_12m"] for r in rows or []}
+    except Exception as e:
+        logger.warning(f"Erreur tx 12m (bulk) : {e}")
+    return {}
+
+
+def _bulk_momentum() -> Dict[Tuple[str, str, int], Optional[Decimal]]:
+    """Dernier momentum connu par scope et fenêtre (market_baselines)"""
+    query = """
+    SELECT DISTINCT ON (community, rooms_bucket, window_days)
+        community, rooms_bucket, window_days, momentum
+    FROM market_baselines
+    WHERE community IS NOT NULL
+        AND rooms_bucket IS NOT NULL
+        AND window_days = ANY(%s)
+    ORDER BY community, rooms_bucket, window_days, calculation_date DESC
+    """
+    try:
+        rows = db.execute_query(query, (WINDOWS,))
+        return {(r["community"], r["rooms_bucket"], r["window_days"]): r["momentum"] for r in rows or []}
+    except Exception as e:
+        logger.warning(f"Erreur momentum (bulk) : {e}")
+    return {}
+
+
+def _bulk_listing_stats(target_date: date) -> Dict[Tuple[str, str], Dict]:
+    """Stats listings (30 jours) par scope"""
+    query = """
+    SELECT 
+        community,
+        rooms_bucket,
+        COUNT(*) as listing_count,
+        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY price_per_sqft) as median_psf
+    FROM features
+    WHERE source_type = 'listing'
+        AND community IS NOT NULL
+        AND rooms_bucket IS NOT NULL
+        AND record_date >= %s - INTERVAL '30 days'
+        AND price_per_sqft IS NOT NULL
+    GROUP BY community, rooms_bucket
+    """
+    try:
+        rows = db.execute_query(query, (target_date,))
+        return {
+            (r["community"], r["rooms_bucket"]): {
+                "listing_count": r.get("listing_count", 0),
+                "median_psf": Decimal(str(r["median_psf"])) if r.get("median_psf") else None
+            }
+            for r in rows or []
+        }
+    except Exception as e:
+        logger.warning(f"Erreur listing stats (bulk) : {e}")
+    return {}
+
+
+def _bulk_rental_stats() -> Dict[Tuple[str, str], Dict]:
+    """Dernier loyer connu par scope (rental_index)"""
+    query = """
+    SELECT DISTINCT ON (community, rooms_bucket)
+        community, rooms_bucket, median_rent_aed, avg_rent_aed
+    FROM rental_index
+    WHERE community IS NOT NULL
+        AND rooms_bucket IS NOT NULL
+    ORDER BY community, rooms_bucket, period_date DESC
+    """
+    try:
+        rows = db.execute_query(query)
+        return {
+            (r["community"], r["rooms_bucket"]): {
+                "median_rent": r.get("median_rent_aed") or r.get("avg_rent_aed")
+            }
+            for r in rows or []
+        }
+    except Exception as e:
+        logger.warning(f"Erreur rental stats (bulk) : {e}")
+    return {}
+
+
+def _bulk_supply_data() -> Dict[str, Dict]:
+    """Supply future à 12 mois par communauté"""
+    cutoff_12m = date.today() + timedelta(days=365)
+    
+    query = """
+    SELECT 
+        community,
+        COALESCE(SUM(total_units), 0) as planned_units_12m
+    FROM developers_pipeline
+    WHERE community IS NOT NULL
+        AND expected_handover_date <= %s
+        AND status != 'delivered'
+    GROUP BY community
+    """
+    try:
+        rows = db.execute_query(query, (cutoff_12m,))
+        return {r["community"]: {"planned_units_12m": r.get("planned_units_12m", 0)} for r in rows or []}
+    except Exception as e:
+        logger.warning(f"Erreur supply data (bulk) : {e}")
+    return {}
+
+
+def _bulk_regime_data() -> Dict[str, Dict]:
+    """Dernier régime connu par communauté"""
+    query = """
+    SELECT DISTINCT ON (community)
+        community, regime, confidence_score
+    FROM market_regimes
+    WHERE community IS NOT NULL
+    ORDER BY community, regime_date DESC
+    """
+    try:
+        rows = db.execute_query(query)
+        return {
+            r["community"]: {"regime": r.get("regime"), "confidence": r.get("confidence_score")}
+            for r in rows or []
+        }
+    except Exception as e:
+        logger.warning(f"Erreur regime data (bulk) : {e}")
+    return {}
+
+
+def _bulk_geo_stats() -> Dict[Tuple[str, str], Dict]:
+    """Score de localisation moyen (Makani) par scope"""
+    query = """
+    SELECT community, rooms_bucket, AVG(location_score) as avg_location_score
+    FROM features
+    WHERE community IS NOT NULL
+        AND rooms_bucket IS NOT NULL
+        AND location_score IS NOT NULL
+    GROUP BY community, rooms_bucket
+    """
+    try:
+        rows = db.execute_query(query)
+        return {
+            (r["community"], r["rooms_bucket"]): {"avg_location_score": float(r["avg_location_score"])}
+            for r in rows or []
+            if r.get("avg_location_score")
+        }
+    except Exception as e:
+        logger.warning(f"Erreur geo stats (bulk) : {e}")
+    return {}
+
+
+def _bulk_anomaly_stats(target_date: date) -> Dict[Tuple[str, str, int], Dict]:
+    """Jours d'anomalies actives par scope et fenêtre"""
+    query = """
+    SELECT 
+        o.community,
+        o.rooms_bucket,
+        w.window_days,
+        COUNT(DISTINCT o.detection_date) as days_active
+    FROM opportunities o
+    CROSS JOIN unnest(%s::int[]) AS w(window_days)
+    WHERE o.community IS NOT NULL
+        AND o.rooms_bucket IS NOT NULL
+        AND o.detection_date >= %s - make_interval(days => w.window_days)
+        AND o.detection_date <= %s
+        AND o.status = 'active'
+    GROUP BY o.community, o.rooms_bucket, w.window_days
+    """
+    try:
+        rows = db.execute_query(query, (WINDOWS, target_date, target_date))
+        return {
+            (r["community"], r["rooms_bucket"], r["window_days"]): {"days_active": r.get("days_active", 0)}
+            for r in rows or []
+        }
+    except Exception as e:
+        logger.warning(f"Erreur anomaly stats (bulk) : {e}")
+    return {}
+
+
 # ====================================================================
 # FONCTIONS DE CALCUL DES KPIs
 # ====================================================================
@@ -594,29 +923,14 @@ def _insert_kpis(kpis: List[KPI]) -> int:
         ))
     
     try:
-        query = f"""
-        INSERT INTO kpis ({', '.join(columns)})
-        VALUES ({', '.join(['%s'] * len(columns))})
-        ON CONFLICT (calculation_date, community, project, rooms_bucket, window_days)
-        DO UPDATE SET
-            tls = EXCLUDED.tls,
-            lad = EXCLUDED.lad,
-            rsg = EXCLUDED.rsg,
-            spi = EXCLUDED.spi,
-            gpi = EXCLUDED.gpi,
-            rcwm = EXCLUDED.rcwm,
-            ord = EXCLUDED.ord,
-            aps = EXCLUDED.aps,
-            median_tx_psf = EXCLUDED.median_tx_psf,
-            median_listing_psf = EXCLUDED.median_listing_psf,
-            tx_count = EXCLUDED.tx_count,
-            listing_count = EXCLUDED.listing_count,
-            planned_units_12m = EXCLUDED.planned_units_12m,
-            median_rent_aed = EXCLUDED.median_rent_aed
-        """
-        
-        db.execute_batch(query, values)
-        return len(values)
+        # UPSERT sur le scope (COPY + merge set-based au-delà du seuil)
+        return db.execute_batch_insert(
+            'kpis',
+            columns,
+            values,
+            conflict_columns=['calculation_date', 'community', 'project', 'rooms_bucket', 'window_days'],
+            update_columns=columns[5:]
+        )
         
     except Exception as e:
         logger.error(f"Erreur insertion KPIs : {e}")
@@ -7,17 +7,20 @@ from loguru import logger
 from core.db import db
 
 
-def compute_market_baselines(target_date: Optional[date] = None) -> bool:
+def compute_market_baselines(target_date: Optional[date] = None, incremental: bool = True) -> bool:
     """
     Calculer les baselines marché (7j, 30j, 90j)
     
-    Utilise la procédure SQL stockée refresh_market_baselines
+    Utilise la procédure SQL stockée refresh_market_baselines, ou sa variante
+    refresh_market_baselines_incremental qui ne recalcule que les scopes
+    marqués dans dirty_scopes (recalcul complet au premier passage du jour).
     """
     if not target_date:
         target_date = date.today()
     
     try:
-        db.execute_procedure("refresh_market_baselines", (target_date,))
+        procedure = "refresh_market_baselines_incremental" if incremental else "refresh_market_baselines"
+        db.execute_procedure(procedure, (target_date,))
         logger.info(f"✅ Baselines calculées pour {target_date}")
         return True
     except Exception as e:
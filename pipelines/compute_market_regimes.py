@@ -7,17 +7,20 @@ from loguru import logger
 from core.db import db
 
 
-def compute_market_regimes(target_date: Optional[date] = None) -> bool:
+def compute_market_regimes(target_date: Optional[date] = None, incremental: bool = True) -> bool:
     """
     Calculer les régimes de marché (ACCUMULATION, EXPANSION, etc.)
     
-    Utilise la procédure SQL stockée refresh_market_regimes
+    Utilise la procédure SQL stockée refresh_market_regimes, ou sa variante
+    refresh_market_regimes_incremental qui ne recalcule que les scopes
+    marqués dans dirty_scopes (recalcul complet au premier passage du jour).
     """
     if not target_date:
         target_date = date.today()
     
     try:
-        db.execute_procedure("refresh_market_regimes", (target_date,))
+        procedure = "refresh_market_regimes_incremental" if incremental else "refresh_market_regimes"
+        db.execute_procedure(procedure, (target_date,))
         logger.info(f"✅ Régimes de marché calculés pour {target_date}")
         return True
     except Exception as e:
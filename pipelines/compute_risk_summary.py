@@ -330,8 +330,7 @@ def _insert_risk_summaries(summaries: List[RiskSummary]) -> int:
             risk_factors = EXCLUDED.risk_factors
         """
         
-        db.execute_batch(query, values)
-        return len(values)
+        return db.execute_batch(query, values)
         
     except Exception as e:
         logger.error(f"Erreur insertion risk summaries : {e}")
@@ -2,13 +2,14 @@
 Pipeline : Calcul des scores multi-stratégies
 """
 from datetime import date
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 from decimal import Decimal
 from loguru import logger
 from core.db import db
 from strategies.flip import FlipStrategy
 from strategies.rent import RentStrategy
 from strategies.long_term import LongTermStrategy
+from strategies.base import load_kpi_contexts
 
 
 def compute_scores(target_date: Optional[date] = None) -> int:
@@ -36,18 +37,36 @@ def compute_scores(target_date: Optional[date] = None) -> int:
     rent_strategy = RentStrategy()
     long_term_strategy = LongTermStrategy()
     
+    # Précharger le contexte marché et KPI de tous les scopes en une passe
+    try:
+        market_contexts = _load_market_contexts(anomalies, target_date)
+        kpi_contexts = load_kpi_contexts(
+            (anomaly['community'], anomaly['rooms_bucket']) for anomaly in anomalies
+        )
+    except Exception as e:
+        logger.warning(f"Préchargement du contexte marché impossible, repli unitaire : {e}")
+        market_contexts, kpi_contexts = {}, {}
+    
     # Scorer chaque opportunité
     opportunities = []
     for anomaly in anomalies:
         try:
             # Contexte marché
-            context = _get_market_context(
-                anomaly['community'],
-                anomaly.get('project'),
-                anomaly.get('building'),
-                anomaly['rooms_bucket'],
-                target_date
-            )
+            context = market_contexts.get(_scope_key(anomaly))
+            if context is None:
+                context = _get_market_context(
+                    anomaly['community'],
+                    anomaly.get('project'),
+                    anomaly.get('building'),
+                    anomaly['rooms_bucket'],
+                    target_date
+                )
+            else:
+                context = dict(context)
+            
+            kpi_context = kpi_contexts.get((anomaly['community'], anomaly['rooms_bucket']))
+            if kpi_context is not None:
+                context['kpi_context'] = kpi_context
             
             # Calcul des scores par stratégie
             flip_score = flip_strategy.score(anomaly, context)
@@ -118,6 +137,78 @@ def compute_scores(target_date: Optional[date] = None) -> int:
     return len(opportunities)
 
 
+def _scope_key(anomaly: Dict) -> Tuple:
+    """Clé de scope utilisée par les requêtes de contexte (project NULL = '')"""
+    return (anomaly['community'], anomaly.get('project') or '', anomaly['rooms_bucket'])
+
+
+def _build_market_context(baseline: Optional[Dict], regime: Optional[Dict]) -> Dict:
+    """Construire le contexte marché à partir d'une baseline 30j et d'un régime"""
+    context = {}
+    
+    if baseline:
+        context['baseline'] = baseline
+        context['liquidity_score'] = min(100, baseline.get('transaction_count', 0) * 5)
+    else:
+        context['liquidity_score'] = 0
+    
+    if regime:
+        context['regime'] = regime.get('regime')
+        context['regime_confidence'] = regime.get('confidence_score')
+    else:
+        context['regime'] = 'NEUTRAL'
+        context['regime_confidence'] = 0.5
+    
+    # Supply risk (à enrichir avec developers_pipeline)
+    context['supply_risk'] = 'low'  # Placeholder
+    
+    return context
+
+
+def _load_market_contexts(anomalies: List[Dict], target_date: date) -> Dict[Tuple, Dict]:
+    """
+    Précharger le contexte marché de toutes les anomalies
+    
+    Équivalent ensembliste de _get_market_context : une requête pour les
+    baselines 30j, une pour les régimes, quel que soit le nombre d'anomalies.
+    
+    Returns:
+        Dict (community, project, rooms_bucket) -> contexte
+    """
+    scopes = {_scope_key(anomaly) for anomaly in anomalies}
+    communities = sorted({scope[0] for scope in scopes if scope[0] is not None})
+    
+    query_baselines = """
+    SELECT DISTINCT ON (community, COALESCE(project, ''), rooms_bucket) *
+    FROM market_baselines
+    WHERE calculation_date = %s
+        AND community = ANY(%s)
+        AND window_days = 30
+    ORDER BY community, COALESCE(project, ''), rooms_bucket
+    """
+    baselines = {
+        (row['community'], row.get('project') or '', row['rooms_bucket']): row
+        for row in db.execute_query(query_baselines, (target_date, communities))
+    }
+    
+    query_regimes = """
+    SELECT DISTINCT ON (community, COALESCE(project, '')) *
+    FROM market_regimes
+    WHERE regime_date = %s
+        AND community = ANY(%s)
+    ORDER BY community, COALESCE(project, '')
+    """
+    regimes = {
+        (row['community'], row.get('project') or ''): row
+        for row in db.execute_query(query_regimes, (target_date, communities))
+    }
+    
+    return {
+        scope: _build_market_context(baselines.get(scope), regimes.get(scope[:2]))
+        for scope in scopes
+    }
+
+
 def _get_market_context(
     community: str,
     project: Optional[str],
@@ -125,9 +216,7 @@ def _get_market_context(
     rooms_bucket: str,
     target_date: date
 ) -> Dict:
-    """Récupérer le contexte marché pour le scoring"""
-    context = {}
-    
+    """Récupérer le contexte marché pour le scoring (requêtes unitaires)"""
     # Baseline 30j
     query_baseline = """
     SELECT * FROM market_baselines
@@ -139,11 +228,6 @@ def _get_market_context(
     LIMIT 1
     """
     baseline = db.execute_query(query_baseline, (target_date, community, project, rooms_bucket))
-    if baseline:
-        context['baseline'] = baseline[0]
-        context['liquidity_score'] = min(100, baseline[0].get('transaction_count', 0) * 5)
-    else:
-        context['liquidity_score'] = 0
     
     # Régime de marché
     query_regime = """
@@ -154,17 +238,11 @@ def _get_market_context(
     LIMIT 1
     """
     regime = db.execute_query(query_regime, (target_date, community, project))
-    if regime:
-        context['regime'] = regime[0].get('regime')
-        context['regime_confidence'] = regime[0].get('confidence_score')
-    else:
-        context['regime'] = 'NEUTRAL'
-        context['regime_confidence'] = 0.5
-    
-    # Supply risk (à enrichir avec developers_pipeline)
-    context['supply_risk'] = 'low'  # Placeholder
     
-    return context
+    return _build_market_context(
+        baseline[0] if baseline else None,
+        regime[0] if regime else None
+    )
 
 
 if __name__ == "__main__":
@@ -5,16 +5,32 @@ from datetime import date, timedelta
 from typing import Optional
 from loguru import logger
 from core.db import db
+from core.watermarks import advance_watermark, incremental_start
 from connectors.dld_mortgages import DLDMortgagesConnector
 
 
-def ingest_mortgages(start_date: Optional[date] = None, end_date: Optional[date] = None) -> int:
-    """Ingérer les hypothèques DLD"""
+def ingest_mortgages(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    incremental: bool = False
+) -> int:
+    """
+    Ingérer les hypothèques DLD
+    
+    Avec incremental=True, seules les dates >= watermark sont demandées et
+    le nombre retourné est celui des hypothèques nouvelles ; le watermark
+    n'avance pas sur des données simulées.
+    """
+    if incremental:
+        start_date = incremental_start("mortgages", start_date)
+    
     connector = DLDMortgagesConnector()
     mortgages = connector.fetch_mortgages(start_date, end_date)
     
     if not mortgages:
         logger.info("Aucune hypothèque à ingérer")
+        if incremental:
+            advance_watermark("mortgages", None, new_count=0)
         return 0
     
     columns = [
@@ -36,7 +52,13 @@ def ingest_mortgages(start_date: Optional[date] = None, end_date: Optional[date]
             m.borrower
         ))
     
-    db.execute_batch_insert("mortgages", columns, values)
+    inserted = db.execute_batch_insert("mortgages", columns, values)
+    
+    if incremental:
+        latest = max(m.mortgage_date for m in mortgages) if connector.last_fetch_complete else None
+        advance_watermark("mortgages", latest, new_count=inserted)
+        logger.info(f"✅ Hypothèques ingérées : {inserted} nouvelles sur {len(mortgages)} récupérées")
+        return inserted
     
     logger.info(f"✅ Hypothèques ingérées : {len(mortgages)}")
     return len(mortgages)
@@ -144,8 +144,7 @@ def _insert_rental_index(records: List[RentalIndex]) -> int:
             rent_count = EXCLUDED.rent_count
         """
         
-        db.execute_batch(query, values)
-        return len(values)
+        return db.execute_batch(query, values)
         
     except Exception as e:
         logger.error(f"Erreur insertion rental index : {e}")
@@ -2,29 +2,88 @@
 Pipeline : Ingestion des transactions DLD
 """
 from datetime import date, timedelta
-from typing import Optional
+from typing import List, Optional
 from loguru import logger
+from core.config import settings
 from core.db import db
 from core.models import Transaction
+from core.watermarks import advance_watermark, incremental_start
 from connectors.transactions import DLDTransactionsConnector
 
 
-def ingest_transactions(start_date: Optional[date] = None, end_date: Optional[date] = None) -> int:
+def ingest_transactions(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    incremental: bool = False,
+    strict: bool = False
+) -> int:
     """
     Ingérer les transactions DLD dans la base
     
+    Args:
+        start_date: Début de période
+        end_date: Fin de période
+        incremental: Ne demander que les dates >= watermark de la source
+            et avancer le watermark (ingestion périodique) si toutes les
+            pages ont été récupérées depuis une source réelle
+        strict: Échouer sur toute récupération incomplète (erreur HTTP,
+            repli MOCK, pagination tronquée) ; utilisé par le backfill
+    
     Returns:
-        Nombre de transactions insérées
+        Nombre de transactions nouvelles (hors doublons déjà en base)
     """
+    if incremental:
+        start_date = incremental_start("transactions", start_date)
+    
     connector = DLDTransactionsConnector()
     
-    # Récupérer les transactions
-    transactions = connector.fetch_transactions(start_date, end_date)
+    # Récupérer les transactions par paquets (une page API par paquet) et
+    # les insérer par tampons de settings.db_copy_threshold lignes (COPY)
+    fetched = 0
+    count = 0
+    latest = None
+    buffer: List[Transaction] = []
+    for transactions in connector.iter_transactions(start_date, end_date, strict=strict):
+        if not transactions:
+            continue
+        
+        fetched += len(transactions)
+        buffer.extend(transactions)
+        newest = max(tx.transaction_date for tx in transactions)
+        if latest is None or newest > latest:
+            latest = newest
+        
+        if len(buffer) >= settings.db_copy_threshold:
+            count += _flush_transactions(buffer)
+            buffer = []
+    
+    if buffer:
+        count += _flush_transactions(buffer)
+    
+    if incremental:
+        if not connector.last_fetch_complete:
+            logger.warning("Récupération incomplète ou MOCK : watermark transactions inchangé")
+            latest = None
+        advance_watermark("transactions", latest, new_count=count)
     
-    if not transactions:
-        logger.info("Aucune transaction à ingérer")
+    if not count:
+        logger.info(f"Aucune nouvelle transaction ({fetched} récupérées)")
         return 0
     
+    logger.info(f"✅ Transactions ingérées : {count} nouvelles sur {fetched} récupérées")
+    return count
+
+
+def _flush_transactions(transactions: List[Transaction]) -> int:
+    """Insérer un tampon et marquer ses scopes pour le recalcul incrémental"""
+    inserted = _insert_transactions(transactions)
+    if inserted:
+        _mark_dirty_scopes(transactions)
+    return inserted
+
+
+def _insert_transactions(transactions: List[Transaction]) -> int:
+    """Insérer un paquet de transactions (retourne le nombre de lignes nouvelles)"""
     # Préparer les données pour batch insert
     columns = [
         "transaction_id", "transaction_date", "transaction_type",
@@ -57,10 +116,36 @@ def ingest_transactions(start_date: Optional[date] = None, end_date: Optional[da
         ))
     
     # Insert batch
-    db.execute_batch_insert("transactions", columns, values)
+    return db.execute_batch_insert("transactions", columns, values)
+
+
+def _mark_dirty_scopes(transactions: List[Transaction]) -> int:
+    """
+    Enregistrer dans dirty_scopes les scopes touchés par les transactions
+    
+    Les baselines sont calculées par (community, project, building,
+    rooms_bucket), les régimes par (community, project, building) :
+    chaque consommateur reçoit sa propre granularité.
+    """
+    baseline_scopes = {
+        (tx.community, tx.project, tx.building, tx.rooms_bucket)
+        for tx in transactions
+    }
+    regime_scopes = {scope[:3] for scope in baseline_scopes}
+    
+    columns = ["consumer", "community", "project", "building", "rooms_bucket"]
+    values = [("baselines",) + scope for scope in baseline_scopes]
+    values += [("regimes",) + scope + (None,) for scope in regime_scopes]
+    
+    try:
+        db.execute_batch_insert("dirty_scopes", columns, values)
+    except Exception as e:
+        # Non bloquant : le prochain recalcul du jour suivant sera complet
+        logger.warning(f"Marquage des scopes modifiés impossible : {e}")
+        return 0
     
-    logger.info(f"✅ Transactions ingérées : {len(transactions)}")
-    return len(transactions)
+    logger.debug(f"Scopes marqués : {len(baseline_scopes)} baselines, {len(regime_scopes)} régimes")
+    return len(values)
 
 
 if __name__ == "__main__":
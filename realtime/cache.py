@@ -1,72 +1,418 @@
 """
 Cache intelligent pour données temps réel
+
+Cache mémoire borné partagé par les sessions Streamlit d'un même process :
+- LRU en O(1) (OrderedDict), borné en nombre d'entrées et en octets (estimés) ;
+- expiration sur horloge monotone via un tas des échéances, purgé à chaque
+  accès (pas de balayage complet) ;
+- accès protégés par un verrou ;
+- compteurs hits / misses / évictions / expirations.
+
+get_or_compute() protège les calculs coûteux (requêtes dashboard, API
+live) contre l'effet de meute : un seul calcul par clé à la fois, les
+autres appelants attendent son résultat ; une entrée expirée mais encore
+dans sa fenêtre de péremption est servie immédiatement pendant qu'un
+thread de fond la recalcule (stale-while-revalidate).
+
+Avec un backend partagé (realtime.cache_backends, CACHE_BACKEND), le cache
+local devient un premier niveau : les écritures sont propagées au backend,
+un défaut local y est cherché avant tout calcul. invalidate() vide les
+deux niveaux et le signale aux autres processus.
 """
-from typing import Optional, Any, Dict
-from datetime import datetime, timedelta
+import heapq
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Any, Callable, Dict, List, Tuple, Union
 from loguru import logger
+from core.config import settings
+from realtime.cache_backends import CacheBackend, create_backend, decode, encode
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "stale_until", "size")
+
+    def __init__(self, value: Any, expires_at: float, stale_until: float, size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.size = size
+
+
+class _Flight:
+    """Calcul en cours pour une clé (partagé par les appelants concurrents)"""
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
 
 
 class InMemoryCache:
-    """Cache en mémoire simple avec TTL"""
-    
-    def __init__(self, ttl_minutes: int = 10):
-        self.ttl_minutes = ttl_minutes
-        self._cache: Dict[str, Dict[str, Any]] = {}
-    
+    """
+    Cache en mémoire LRU + TTL, thread-safe et borné
+
+    Args:
+        ttl_minutes: TTL par défaut des entrées
+        max_entries: Nombre maximal d'entrées (0 = illimité)
+        max_bytes: Taille maximale approximative des valeurs (0 = illimitée)
+        stale_minutes: Fenêtre de péremption par défaut de get_or_compute()
+        backend: Backend partagé entre processus (None = cache local seul)
+    """
+
+    def __init__(
+        self,
+        ttl_minutes: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        stale_minutes: Optional[int] = None,
+        backend: Optional[CacheBackend] = None
+    ):
+        self.ttl_minutes = settings.cache_ttl_minutes if ttl_minutes is None else ttl_minutes
+        self.stale_minutes = settings.cache_stale_minutes if stale_minutes is None else stale_minutes
+        self.max_entries = settings.cache_max_entries if max_entries is None else max_entries
+        self.max_bytes = settings.cache_max_bytes if max_bytes is None else max_bytes
+        self.backend = backend
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Tas (fin de péremption, clé) ; les éléments orphelins (clé réécrite ou évincée) sont ignorés
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._bytes = 0
+        self._flights: Dict[str, _Flight] = {}
+        # Génération du backend vue par ce process (invalidations des autres processus)
+        self._generation: Optional[int] = None
+        self._generation_checked_at = float("-inf")
+        self._stats = {
+            "hits": 0, "misses": 0, "evictions": 0, "expirations": 0,
+            "stale_hits": 0, "coalesced": 0, "refreshes": 0, "compute_errors": 0,
+            "shared_hits": 0, "invalidations": 0,
+        }
+
     def get(self, key: str) -> Optional[Any]:
-        """Récupérer une valeur du cache"""
-        if key not in self._cache:
-            return None
-        
-        entry = self._cache[key]
-        
-        # Vérifier l'expiration
-        if datetime.now() > entry['expires_at']:
-            del self._cache[key]
-            return None
-        
-        logger.debug(f"Cache HIT : {key}")
-        return entry['value']
-    
-    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        """Récupérer une valeur du cache (None si absente ou expirée)"""
+        entry = self._lookup(key)
+
+        with self._lock:
+            if entry is None or entry.expires_at <= time.monotonic():
+                self._stats["misses"] += 1
+                return None
+
+            self._stats["hits"] += 1
+            return entry.value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, stale_ttl: float = 0):
         """Stocker une valeur dans le cache
-        
+
         Args:
             key: Clé du cache
             value: Valeur à stocker
             ttl: TTL en secondes (optionnel, sinon utilise ttl_minutes par défaut)
+            stale_ttl: Secondes pendant lesquelles get_or_compute() peut encore
+                servir la valeur expirée (get() ne la retourne plus)
         """
-        if ttl is not None:
-            expires_at = datetime.now() + timedelta(seconds=ttl)
+        ttl_seconds = ttl if ttl is not None else self.ttl_minutes * 60
+        entry = self._store_local(key, value, ttl_seconds, stale_ttl)
+
+        if self.backend is not None and entry is None:
+            # Valeur trop volumineuse : l'ancienne ne doit plus être servie
+            self._backend_call("suppression", self.backend.delete, key)
+        elif self.backend is not None:
+            try:
+                payload = encode(value)
+            except TypeError as e:
+                logger.debug(f"Cache : {key} non partagé ({e})")
+                self._backend_call("suppression", self.backend.delete, key)
+                return
+            wall = time.time()
+            self._backend_call(
+                "écriture", self.backend.set,
+                key, payload, wall + ttl_seconds, wall + ttl_seconds + stale_ttl
+            )
+
+    def _store_local(self, key: str, value: Any, ttl_seconds: float, stale_ttl: float) -> Optional[_Entry]:
+        """Stocker dans le niveau local (None si la valeur dépasse max_bytes, ancienne entrée retirée)"""
+        size = _approximate_size(value)
+
+        if self.max_bytes and size > self.max_bytes:
+            logger.debug(f"Cache : {key} non stocké ({size} octets > {self.max_bytes})")
+            with self._lock:
+                self._remove(key)
+            return None
+
+        now = time.monotonic()
+        expires_at = now + ttl_seconds
+        stale_until = expires_at + stale_ttl
+        entry = _Entry(value, expires_at, stale_until, size)
+
+        with self._lock:
+            self._expire(now)
+            self._remove(key)
+
+            self._cache[key] = entry
+            self._bytes += size
+            heapq.heappush(self._expiry_heap, (stale_until, key))
+
+            while self._cache and (
+                (self.max_entries and len(self._cache) > self.max_entries)
+                or (self.max_bytes and self._bytes > self.max_bytes)
+            ):
+                _, evicted = self._cache.popitem(last=False)
+                self._bytes -= evicted.size
+                self._stats["evictions"] += 1
+
+            # Compacter le tas s'il accumule trop d'éléments orphelins
+            # (clés réécrites ou évincées avant leur échéance)
+            if len(self._expiry_heap) > 2 * len(self._cache) + 64:
+                self._expiry_heap = [(e.stale_until, k) for k, e in self._cache.items()]
+                heapq.heapify(self._expiry_heap)
+
+        return entry
+
+    def _lookup(self, key: str) -> Optional[_Entry]:
+        """Entrée locale, sinon chargée depuis le backend (fraîche ou en péremption)"""
+        self._sync_generation()
+
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                return entry
+
+        if self.backend is None:
+            return None
+
+        shared = self._backend_call("lecture", self.backend.get, key)
+        if shared is None:
+            return None
+
+        payload, expires_at, stale_until = shared
+        wall = time.time()
+        if stale_until <= wall:
+            return None
+
+        try:
+            value = decode(payload)
+        except ValueError as e:
+            logger.warning(f"Cache partagé : valeur illisible pour {key}, ignorée ({e})")
+            return None
+
+        entry = self._store_local(key, value, expires_at - wall, stale_until - expires_at)
+        if entry is not None:
+            with self._lock:
+                self._stats["shared_hits"] += 1
+        return entry
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: Union[int, Callable[[Any], Optional[int]], None] = None,
+        stale_ttl: Optional[float] = None
+    ) -> Any:
+        """
+        Valeur en cache, sinon calculée une seule fois pour tous les appelants
+
+        - entrée fraîche : retournée ;
+        - entrée expirée dans sa fenêtre de péremption : retournée telle
+          quelle, recalcul lancé en arrière-plan (un seul par clé) ;
+        - absente : le premier appelant calcule, les appelants concurrents
+          attendent son résultat (ou son exception).
+
+        Un résultat None n'est pas mis en cache.
+
+        Args:
+            key: Clé du cache
+            compute: Calcul de la valeur
+            ttl: TTL en secondes, ou fonction valeur -> TTL (None = défaut)
+            stale_ttl: Fenêtre de péremption en secondes (défaut stale_minutes)
+        """
+        stale_ttl = self.stale_minutes * 60 if stale_ttl is None else stale_ttl
+        entry = self._lookup(key)
+
+        with self._lock:
+            now = time.monotonic()
+            flight = self._flights.get(key)
+
+            if entry is not None and entry.stale_until > now:
+                if entry.expires_at > now:
+                    self._stats["hits"] += 1
+                    return entry.value
+
+                self._stats["stale_hits"] += 1
+                if flight is None:
+                    flight = self._flights[key] = _Flight()
+                    self._stats["refreshes"] += 1
+                    threading.Thread(
+                        target=self._run_flight,
+                        args=(key, flight, compute, ttl, stale_ttl),
+                        name=f"cache-refresh-{key}",
+                        daemon=True
+                    ).start()
+                return entry.value
+
+            self._stats["misses"] += 1
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self._stats["coalesced"] += 1
+
+        if leader:
+            self._run_flight(key, flight, compute, ttl, stale_ttl)
         else:
-            expires_at = datetime.now() + timedelta(minutes=self.ttl_minutes)
-        
-        self._cache[key] = {
-            'value': value,
-            'expires_at': expires_at
-        }
-        
-        logger.debug(f"Cache SET : {key} (expire: {expires_at})")
-    
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _run_flight(self, key: str, flight: _Flight, compute: Callable[[], Any], ttl, stale_ttl: float):
+        """Exécuter un calcul et publier son résultat aux appelants en attente"""
+        try:
+            value = compute()
+            if value is not None:
+                self.set(key, value, ttl=ttl(value) if callable(ttl) else ttl, stale_ttl=stale_ttl)
+            flight.value = value
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self._stats["compute_errors"] += 1
+            logger.warning(f"Cache : calcul de {key} en échec : {e}")
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def delete(self, key: str):
+        """Supprimer une entrée (local et backend)"""
+        with self._lock:
+            self._remove(key)
+        if self.backend is not None:
+            self._backend_call("suppression", self.backend.delete, key)
+
     def clear(self):
-        """Vider le cache"""
-        self._cache.clear()
+        """Vider le cache (local et backend, diffusé aux autres processus)"""
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Vider les deux niveaux et signaler l'invalidation aux autres processus
+
+        Appelée en fin de pipeline : les caches locaux des autres processus
+        se vident à leur prochain accès (au plus CACHE_INVALIDATION_POLL_SECONDS
+        plus tard).
+        """
+        self._clear_local()
+
+        if self.backend is not None:
+            self._backend_call("invalidation", self.backend.clear)
+            generation = self._backend_call("invalidation", self.backend.bump_generation)
+            if generation is not None:
+                with self._lock:
+                    self._generation = generation
+
         logger.info("Cache vidé")
-    
+
+    def _clear_local(self):
+        with self._lock:
+            self._cache.clear()
+            self._expiry_heap = []
+            self._bytes = 0
+
+    def _sync_generation(self):
+        """Vider le niveau local si un autre processus a invalidé le backend"""
+        if self.backend is None:
+            return
+
+        now = time.monotonic()
+        if now - self._generation_checked_at < settings.cache_invalidation_poll_seconds:
+            return
+        self._generation_checked_at = now
+
+        generation = self._backend_call("génération", self.backend.generation)
+        if generation is None:
+            return
+
+        with self._lock:
+            changed = self._generation is not None and generation != self._generation
+            self._generation = generation
+            if changed:
+                self._stats["invalidations"] += 1
+        if changed:
+            self._clear_local()
+            logger.debug(f"Cache local vidé (invalidation de génération {generation})")
+
+    def _backend_call(self, operation: str, method: Callable, *args) -> Any:
+        """Appel au backend ; une panne ne casse jamais le cache local"""
+        try:
+            return method(*args)
+        except Exception as e:
+            logger.warning(f"Cache partagé ({self.backend.name}) indisponible, {operation} ignorée : {e}")
+            return None
+
     def cleanup(self):
         """Nettoyer les entrées expirées"""
-        now = datetime.now()
-        expired_keys = [
-            key for key, entry in self._cache.items()
-            if now > entry['expires_at']
-        ]
-        
-        for key in expired_keys:
-            del self._cache[key]
-        
-        if expired_keys:
-            logger.debug(f"Cache cleanup : {len(expired_keys)} entrées supprimées")
+        with self._lock:
+            expired = self._expire(time.monotonic())
+
+        if expired:
+            logger.debug(f"Cache cleanup : {expired} entrées supprimées")
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs, taille et taux de hit"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._cache)
+            stats["bytes"] = self._bytes
+        stats["backend"] = self.backend.name if self.backend is not None else "memory"
+        served = stats["hits"] + stats["stale_hits"]
+        lookups = served + stats["misses"]
+        stats["hit_rate"] = round(served / lookups, 3) if lookups else 0.0
+        return stats
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._cache)
+
+    # Appelées sous verrou
+
+    def _remove(self, key: str):
+        entry = self._cache.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _expire(self, now: float) -> int:
+        """Retirer les entrées sorties de leur fenêtre de péremption (tête du tas uniquement)"""
+        expired = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            stale_until, key = heapq.heappop(heap)
+            entry = self._cache.get(key)
+            if entry is not None and entry.stale_until == stale_until:
+                self._remove(key)
+                expired += 1
+        self._stats["expirations"] += expired
+        return expired
+
+
+def _approximate_size(value: Any, depth: int = 0) -> int:
+    """Taille approximative en octets (conteneurs parcourus sur 6 niveaux)"""
+    size = sys.getsizeof(value)
+    if depth >= 6:
+        return size
+    if isinstance(value, dict):
+        size += sum(
+            _approximate_size(k, depth + 1) + _approximate_size(v, depth + 1)
+            for k, v in value.items()
+        )
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_approximate_size(item, depth + 1) for item in value)
+    return size
 
 
 # Instance globale
-cache = InMemoryCache()
+cache = InMemoryCache(backend=create_backend())
@@ -0,0 +1,270 @@
+"""
+Backends partagés du cache temps réel (entre processus)
+
+L'app Streamlit, le poller et le job quotidien partagent un même stockage
+derrière leur cache mémoire local (realtime.cache.InMemoryCache) :
+- sqlite : fichier SQLite en mode WAL (lecteurs concurrents, un écrivain),
+  suffisant pour des processus d'une même machine ;
+- redis : tout serveur parlant le protocole Redis (Redis, Valkey, ou un
+  équivalent local), via le client redis-py s'il est installé ;
+- memory : aucun partage (cache local uniquement), valeur par défaut.
+
+Un chemin SQLite relatif est résolu depuis la racine du projet : les
+processus lancés depuis des répertoires différents partagent le fichier.
+
+Les valeurs sont encodées en JSON : Decimal, dates, UUID, tuples et
+clés de dict non textuelles sont balisés pour être restitués à
+l'identique. Le décodage n'exécute aucun code, même si le stockage
+partagé (Redis réseau) est compromis ; un contenu illisible est traité
+comme une absence de valeur.
+
+Invalidation : chaque backend porte un compteur de génération ; le
+vider l'incrémente et les caches locaux des autres processus se vident
+en observant le changement.
+"""
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Optional, Tuple
+from uuid import UUID
+
+from loguru import logger
+
+from core.config import settings
+
+
+# Racine du projet (résolution des chemins relatifs)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (valeur encodée, expiration, fin de péremption) ; horodatages time.time()
+SharedEntry = Tuple[bytes, float, float]
+
+
+# Balises JSON des types restitués à l'identique (objet à clé unique)
+_TAGS = {
+    "__decimal__": Decimal,
+    "__datetime__": datetime.fromisoformat,
+    "__date__": date.fromisoformat,
+    "__uuid__": UUID,
+    "__tuple__": tuple,
+    "__dict__": dict,
+}
+
+
+def _tag(value: Any) -> Any:
+    """Convertir une valeur en structure JSON balisée"""
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, dict):
+        if not all(isinstance(k, str) for k in value) or (len(value) == 1 and next(iter(value)) in _TAGS):
+            # Clés non textuelles, ou dict confondable avec une balise
+            return {"__dict__": [[_tag(k), _tag(v)] for k, v in value.items()]}
+        return {k: _tag(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_tag(v) for v in value]
+    if isinstance(value, tuple):
+        return {"__tuple__": [_tag(v) for v in value]}
+    if isinstance(value, Decimal):
+        return {"__decimal__": str(value)}
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    if isinstance(value, UUID):
+        return {"__uuid__": str(value)}
+    raise TypeError(f"Type non supporté par le cache partagé : {type(value).__name__}")
+
+
+def _untag(obj: dict) -> Any:
+    """object_hook : restituer les types balisés"""
+    if len(obj) == 1:
+        name, raw = next(iter(obj.items()))
+        restore = _TAGS.get(name)
+        if restore is dict:
+            return {k: v for k, v in raw}
+        if restore is not None:
+            return restore(raw)
+    return obj
+
+
+def encode(value: Any) -> bytes:
+    return json.dumps(_tag(value), separators=(",", ":")).encode("utf-8")
+
+
+def decode(payload: bytes) -> Any:
+    """Décoder une valeur (ValueError si le contenu n'est pas un JSON balisé valide)"""
+    try:
+        return json.loads(payload, object_hook=_untag)
+    except (TypeError, ArithmeticError) as e:
+        raise ValueError(f"Valeur de cache invalide : {e}") from e
+
+
+class CacheBackend(ABC):
+    """Interface des backends partagés (valeurs déjà encodées)"""
+
+    name = "base"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[SharedEntry]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, payload: bytes, expires_at: float, stale_until: float):
+        pass
+
+    @abstractmethod
+    def delete(self, key: str):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @abstractmethod
+    def generation(self) -> int:
+        """Compteur d'invalidation courant"""
+        pass
+
+    @abstractmethod
+    def bump_generation(self) -> int:
+        """Incrémenter le compteur d'invalidation (diffusion aux autres processus)"""
+        pass
+
+
+class SqliteCacheBackend(CacheBackend):
+    """Fichier SQLite en mode WAL, une connexion par thread (ouverte au premier accès)"""
+
+    name = "sqlite"
+
+    # Purge des entrées périmées toutes les N écritures
+    PURGE_EVERY = 256
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = os.path.join(PROJECT_ROOT, path or settings.cache_sqlite_path)
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "expires_at REAL NOT NULL, stale_until REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[SharedEntry]:
+        row = self._connection().execute(
+            "SELECT value, expires_at, stale_until FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        return (bytes(row[0]), row[1], row[2]) if row else None
+
+    def set(self, key: str, payload: bytes, expires_at: float, stale_until: float):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at, stale_until) VALUES (?, ?, ?, ?)",
+            (key, payload, expires_at, stale_until)
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM cache_entries WHERE stale_until < ?", (time.time(),))
+
+    def delete(self, key: str):
+        self._connection().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache_entries")
+
+    def generation(self) -> int:
+        row = self._connection().execute(
+            "SELECT value FROM cache_meta WHERE name = 'generation'"
+        ).fetchone()
+        return row[0] if row else 0
+
+    def bump_generation(self) -> int:
+        conn = self._connection()
+        conn.execute(
+            "INSERT INTO cache_meta (name, value) VALUES ('generation', 1) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + 1"
+        )
+        return self.generation()
+
+
+# En-tête des valeurs Redis : expiration et fin de péremption (2 doubles)
+_REDIS_HEADER = struct.Struct("!dd")
+
+
+class RedisCacheBackend(CacheBackend):
+    """Serveur compatible Redis (client redis-py) ; les clés expirent côté serveur"""
+
+    name = "redis"
+
+    def __init__(self, url: Optional[str] = None, prefix: str = "robin:cache:"):
+        import redis
+
+        self._client = redis.Redis.from_url(url or settings.cache_redis_url, socket_timeout=1.0)
+        self.prefix = prefix
+        self._generation_key = f"{prefix.rstrip(':')}-generation"
+
+    def get(self, key: str) -> Optional[SharedEntry]:
+        raw = self._client.get(self.prefix + key)
+        if raw is None:
+            return None
+        expires_at, stale_until = _REDIS_HEADER.unpack_from(raw)
+        return raw[_REDIS_HEADER.size:], expires_at, stale_until
+
+    def set(self, key: str, payload: bytes, expires_at: float, stale_until: float):
+        ttl_ms = max(1, int((stale_until - time.time()) * 1000))
+        self._client.set(self.prefix + key, _REDIS_HEADER.pack(expires_at, stale_until) + payload, px=ttl_ms)
+
+    def delete(self, key: str):
+        self._client.delete(self.prefix + key)
+
+    def clear(self):
+        keys = list(self._client.scan_iter(match=f"{self.prefix}*", count=500))
+        for i in range(0, len(keys), 500):
+            self._client.delete(*keys[i:i + 500])
+
+    def generation(self) -> int:
+        return int(self._client.get(self._generation_key) or 0)
+
+    def bump_generation(self) -> int:
+        return int(self._client.incr(self._generation_key))
+
+
+def create_backend(kind: Optional[str] = None) -> Optional[CacheBackend]:
+    """
+    Backend configuré (settings.cache_backend), None pour un cache local seul
+
+    Un backend redis indisponible (client absent) retombe sur le cache local.
+    """
+    kind = (kind or settings.cache_backend).lower()
+    if kind == "memory":
+        return None
+    if kind == "sqlite":
+        return SqliteCacheBackend()
+    if kind == "redis":
+        try:
+            return RedisCacheBackend()
+        except ImportError:
+            logger.warning("redis non installé - cache temps réel local uniquement")
+            return None
+    logger.warning(f"CACHE_BACKEND inconnu : {kind} - cache temps réel local uniquement")
+    return None
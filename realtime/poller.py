@@ -1,12 +1,16 @@
 """
 Polling temps réel des données
 """
+import calendar
 import time
 from datetime import datetime, timedelta
+from typing import Dict
 from loguru import logger
 from core.config import settings
+from core.rate_limit import quota_snapshot
 from core.utils import get_dubai_now
 from graphs.market_intelligence_graph import run_daily_pipeline
+from realtime.refresher import warm_dashboard_cache
 
 
 class RealtimePoller:
@@ -15,6 +19,8 @@ class RealtimePoller:
     def __init__(self, interval_minutes: int = None):
         self.interval_minutes = interval_minutes or settings.polling_interval_minutes
         self.last_run = None
+        # Requêtes consommées par API lors du dernier run (estimation du coût d'un run)
+        self.last_run_cost: Dict[str, int] = {}
     
     def start(self):
         """Démarrer le polling continu"""
@@ -29,9 +35,15 @@ class RealtimePoller:
                     logger.info(f"⏰ Refresh à {now}")
                     
                     # Exécuter le pipeline
+                    used_before = self._quota_used()
                     run_daily_pipeline(now.date())
+                    warm_dashboard_cache(now.date())
                     
                     self.last_run = now
+                    self.last_run_cost = {
+                        api: used - used_before.get(api, 0)
+                        for api, used in self._quota_used().items()
+                    }
                 
                 # Attendre avant le prochain check
                 time.sleep(60)  # Check chaque minute
@@ -49,7 +61,41 @@ class RealtimePoller:
             return True
         
         elapsed = (now - self.last_run).total_seconds() / 60
-        return elapsed >= self.interval_minutes
+        return elapsed >= self._effective_interval(now)
+    
+    def _quota_used(self) -> Dict[str, int]:
+        return {api: state["used_this_month"] for api, state in quota_snapshot().items()}
+    
+    def _effective_interval(self, now: datetime) -> float:
+        """
+        Intervalle entre deux runs compatible avec les quotas mensuels
+        
+        Pour chaque API dont le quota restant est connu, on étale les runs
+        encore finançables (quota restant / coût du dernier run) sur le
+        reste du mois. L'intervalle retenu est le plus contraignant, jamais
+        inférieur à l'intervalle configuré.
+        """
+        days_in_month = calendar.monthrange(now.year, now.month)[1]
+        month_end = now.replace(day=days_in_month, hour=23, minute=59, second=59, microsecond=0)
+        minutes_left = max(1.0, (month_end - now).total_seconds() / 60)
+        
+        interval = float(self.interval_minutes)
+        for api, state in quota_snapshot().items():
+            cost = self.last_run_cost.get(api, 0)
+            remaining = state["remaining"]
+            if not cost or remaining is None:
+                continue
+            
+            affordable_runs = remaining // cost
+            quota_interval = minutes_left / affordable_runs if affordable_runs else minutes_left
+            if quota_interval > interval:
+                interval = quota_interval
+                logger.debug(
+                    f"Quota {api} : {remaining} requêtes restantes, {cost} par run "
+                    f"→ intervalle {interval:.0f} min"
+                )
+        
+        return interval
 
 
 if __name__ == "__main__":
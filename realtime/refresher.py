@@ -4,10 +4,13 @@ Refresher pour Streamlit - Dashboard Data Provider
 Fournit les données pour le dashboard avec cache intelligent.
 Fallback sur API live si base de données vide.
 """
+import time
 from datetime import date, timedelta
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from loguru import logger
+from core.config import settings
 from core.db import db
+from pipelines.compute_dashboard_snapshot import FRESH_SNAPSHOT_CONDITION, normalize_payload
 from realtime.cache import cache
 
 
@@ -16,31 +19,106 @@ class DataRefresher:
     
     @staticmethod
     def get_dashboard_data(target_date: date = None) -> Dict[str, Any]:
-        """Récupérer les données du dashboard avec cache"""
+        """
+        Récupérer les données du dashboard avec cache
+        
+        Lit le snapshot précalculé par le pipeline s'il est à jour, sinon
+        calcule les agrégats. Un seul calcul par date à la fois, partagé par
+        les sessions concurrentes ; à expiration, les données précédentes
+        restent servies pendant leur recalcul en arrière-plan
+        (cf. InMemoryCache.get_or_compute).
+        """
+        if not target_date:
+            from core.utils import get_dubai_today
+            target_date = get_dubai_today()
+        
+        return cache.get_or_compute(
+            f"dashboard_{target_date}",
+            lambda: DataRefresher._build_dashboard_data(target_date),
+            ttl=DataRefresher._dashboard_ttl
+        )
+    
+    @staticmethod
+    def get_community_data(community: str, target_date: date = None) -> Optional[Dict[str, Any]]:
+        """Données dashboard d'une communauté (snapshot précalculé, None si absent)"""
         if not target_date:
             from core.utils import get_dubai_today
             target_date = get_dubai_today()
         
-        cache_key = f"dashboard_{target_date}"
+        return cache.get_or_compute(
+            f"dashboard_{target_date}_{community}",
+            lambda: DataRefresher.get_snapshot(target_date, community)
+        )
+    
+    @staticmethod
+    def get_snapshot(
+        target_date: date,
+        community: str = '',
+        fresh_only: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Snapshot précalculé par le pipeline (lecture par clé primaire)
+        
+        Args:
+            target_date: Date du snapshot
+            community: Communauté ('' = marché global)
+            fresh_only: Ignorer un snapshot antérieur à la dernière ingestion
+                de lignes nouvelles (cf. compute_dashboard_snapshot)
+        """
+        freshness = f"AND {FRESH_SNAPSHOT_CONDITION}" if fresh_only else ""
+        query = f"""
+        SELECT s.payload, s.computed_at FROM dashboard_snapshots s
+        WHERE s.snapshot_date = %s AND s.community = %s
+            {freshness}
+        """
+        try:
+            results = db.execute_query(query, (target_date, community))
+        except Exception as e:
+            logger.warning(f"Snapshot dashboard indisponible : {e}")
+            return None
+        
+        if not results:
+            return None
         
-        # Vérifier le cache
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
+        data = normalize_payload(results[0]['payload'])
+        data['data_source'] = 'SNAPSHOT'
+        data['snapshot_computed_at'] = results[0]['computed_at']
+        return data
+    
+    @staticmethod
+    def _build_dashboard_data(target_date: date, allow_live: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Calculer les données du dashboard (snapshot, sinon requêtes DB, sinon API live)
+        
+        Le snapshot n'est utilisé que s'il est postérieur aux dernières
+        lignes ingérées. Toutes les sources renvoient les mêmes types
+        (normalize_payload). Avec allow_live=False, retourne None au lieu
+        d'appeler l'API live quand la base est vide (préchauffage sans
+        consommer de quota).
+        """
+        snapshot = DataRefresher.get_snapshot(target_date, fresh_only=True)
+        if snapshot is not None:
+            return snapshot
         
         # Récupérer les données enrichies
         kpis = DataRefresher._get_kpis(target_date)
         
         # Si pas de données DB, essayer l'API live
         if (kpis.get('transactions_30d') or 0) == 0:
+            if not allow_live:
+                return None
             logger.info("Base vide - récupération données API live")
             live_data = DataRefresher._get_live_api_data(target_date)
             if live_data:
-                cache.set(cache_key, live_data, ttl=300)  # Cache 5 min pour API
-                return live_data
+                return normalize_payload(live_data)
         
-        data = {
-            'kpis': kpis,
+        return normalize_payload(DataRefresher.compute_dashboard_payload(target_date, kpis))
+    
+    @staticmethod
+    def compute_dashboard_payload(target_date: date, kpis: Optional[Dict] = None) -> Dict[str, Any]:
+        """Données du dashboard calculées depuis la base (source des snapshots)"""
+        return {
+            'kpis': kpis if kpis is not None else DataRefresher._get_kpis(target_date),
             'transaction_stats': DataRefresher._get_transaction_stats(target_date),
             'top_neighborhoods': DataRefresher._get_top_neighborhoods(target_date),
             'property_types': DataRefresher._get_property_types_breakdown(target_date),
@@ -48,11 +126,11 @@ class DataRefresher:
             'regimes': DataRefresher._get_regimes(target_date),
             'brief': DataRefresher._get_daily_brief(target_date)
         }
-        
-        # Mettre en cache
-        cache.set(cache_key, data)
-        
-        return data
+    
+    @staticmethod
+    def _dashboard_ttl(data: Dict[str, Any]) -> Optional[int]:
+        """TTL des données : 5 min pour l'API live, sinon TTL par défaut du cache"""
+        return 300 if data.get('data_source') == 'API_LIVE' else None
     
     @staticmethod
     def _get_live_api_data(target_date: date) -> Dict[str, Any]:
@@ -380,3 +458,72 @@ class DataRefresher:
         """
         results = db.execute_query(query, (target_date,))
         return results[0] if results else None
+
+
+def warm_dashboard_cache(target_date: date = None, top_communities: Optional[int] = None) -> Dict[str, float]:
+    """
+    Précalculer les données dashboard dans le cache après un run du pipeline
+    
+    Réchauffe aujourd'hui, hier et les top_communities communautés du jour
+    (par nombre de transactions) : le premier visiteur ne paie plus le
+    calcul à froid. Les clés invalidées en fin de pipeline sont recalculées,
+    les clés encore valides sont laissées telles quelles. L'API live n'est
+    jamais appelée (base vide : clé non préchauffée).
+    
+    Sans backend partagé (CACHE_BACKEND=memory), le préchauffage est sauté :
+    le cache local de ce processus n'est lu ni par l'app ni par les autres
+    workers.
+    
+    Args:
+        target_date: Date de référence (défaut: aujourd'hui)
+        top_communities: Nombre de communautés (défaut settings.cache_warm_top_communities)
+    
+    Returns:
+        Durée de préchauffage par clé préchauffée, en secondes
+    """
+    if cache.backend is None:
+        logger.info("Préchauffage du cache sauté : pas de backend partagé (CACHE_BACKEND=memory)")
+        return {}
+    
+    if not target_date:
+        from core.utils import get_dubai_today
+        target_date = get_dubai_today()
+    if top_communities is None:
+        top_communities = settings.cache_warm_top_communities
+    
+    report: Dict[str, float] = {}
+    
+    def warm(key: str, compute) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            data = cache.get_or_compute(key, compute, ttl=DataRefresher._dashboard_ttl)
+        except Exception as e:
+            logger.warning(f"Préchauffage {key} en échec : {e}")
+            return None
+        if data is None:
+            logger.info(f"  Cache non préchauffé : {key} (aucune donnée)")
+            return None
+        report[key] = round(time.perf_counter() - started, 3)
+        return data
+    
+    today_data = None
+    for day in (target_date, target_date - timedelta(days=1)):
+        data = warm(f"dashboard_{day}", lambda day=day: DataRefresher._build_dashboard_data(day, allow_live=False))
+        if day == target_date:
+            today_data = data
+    
+    communities = [
+        row['community'] for row in ((today_data or {}).get('top_neighborhoods') or [])
+        if row.get('community')
+    ][:top_communities]
+    for community in communities:
+        warm(
+            f"dashboard_{target_date}_{community}",
+            lambda community=community: DataRefresher.get_snapshot(target_date, community)
+        )
+    
+    for key, seconds in report.items():
+        logger.info(f"  Cache préchauffé : {key} ({seconds:.3f}s)")
+    logger.info(f"✅ Cache dashboard préchauffé : {len(report)} clés en {sum(report.values()):.2f}s")
+    
+    return report
@@ -91,6 +91,132 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- ====================================================================
+-- BASELINES MULTI-FENÊTRES EN UNE SEULE PASSE
+-- ====================================================================
+-- Une seule lecture des 180 derniers jours (2 x 90j) : chaque transaction
+-- est rattachée aux fenêtres 7/30/90 dont elle relève (courante et/ou
+-- précédente), puis agrégée avec des FILTER. Remplace 3 appels à
+-- compute_market_baselines (6 scans de transactions).
+-- Index compagnon : idx_transactions_baseline_scan (schema.sql)
+--
+-- max_dirty_id : si renseigné, seuls les scopes présents dans dirty_scopes
+-- (consumer 'baselines', id <= max_dirty_id) sont recalculés.
+DROP FUNCTION IF EXISTS compute_market_baselines_all(DATE);
+CREATE OR REPLACE FUNCTION compute_market_baselines_all(
+    target_date DATE,
+    max_dirty_id BIGINT DEFAULT NULL
+)
+RETURNS TABLE (
+    window_days INTEGER,
+    community VARCHAR,
+    project VARCHAR,
+    building VARCHAR,
+    rooms_bucket VARCHAR,
+    median_price_per_sqft DECIMAL,
+    p25_price_per_sqft DECIMAL,
+    p75_price_per_sqft DECIMAL,
+    avg_price_per_sqft DECIMAL,
+    transaction_count INTEGER,
+    total_volume_aed DECIMAL,
+    momentum DECIMAL,
+    volatility DECIMAL,
+    dispersion DECIMAL
+) AS $$
+BEGIN
+    RETURN QUERY
+    WITH recent AS (
+        SELECT 
+            t.community,
+            t.project,
+            t.building,
+            t.rooms_bucket,
+            t.transaction_date,
+            t.price_per_sqft,
+            t.price_aed
+        FROM transactions t
+        WHERE t.transaction_date BETWEEN (target_date - 180) AND target_date
+            AND t.price_per_sqft IS NOT NULL
+            AND t.price_per_sqft > 0
+            AND (
+                max_dirty_id IS NULL
+                OR EXISTS (
+                    SELECT 1 FROM dirty_scopes d
+                    WHERE d.consumer = 'baselines'
+                        AND d.id <= max_dirty_id
+                        AND d.community IS NOT DISTINCT FROM t.community
+                        AND d.project IS NOT DISTINCT FROM t.project
+                        AND d.building IS NOT DISTINCT FROM t.building
+                        AND d.rooms_bucket IS NOT DISTINCT FROM t.rooms_bucket
+                )
+            )
+    ),
+    bucketed AS (
+        -- Bornes identiques à compute_market_baselines (BETWEEN inclusifs) :
+        -- le jour target_date - w appartient aux deux fenêtres
+        SELECT 
+            w.win,
+            r.*,
+            r.transaction_date >= (target_date - w.win) as in_current,
+            r.transaction_date <= (target_date - w.win) as in_previous
+        FROM recent r
+        CROSS JOIN (VALUES (7), (30), (90)) AS w(win)
+        WHERE r.transaction_date >= (target_date - 2*w.win)
+    ),
+    windows AS (
+        SELECT 
+            b.win,
+            b.community,
+            b.project,
+            b.building,
+            b.rooms_bucket,
+            PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY b.price_per_sqft) FILTER (WHERE b.in_current) as median_sqft,
+            PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY b.price_per_sqft) FILTER (WHERE b.in_current) as p25_sqft,
+            PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY b.price_per_sqft) FILTER (WHERE b.in_current) as p75_sqft,
+            AVG(b.price_per_sqft) FILTER (WHERE b.in_current) as avg_sqft,
+            COUNT(*) FILTER (WHERE b.in_current) as tx_count,
+            SUM(b.price_aed) FILTER (WHERE b.in_current) as volume,
+            STDDEV(b.price_per_sqft) FILTER (WHERE b.in_current) as std_dev,
+            PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY b.price_per_sqft) FILTER (WHERE b.in_previous) as prev_median_sqft
+        FROM bucketed b
+        GROUP BY b.win, b.community, b.project, b.building, b.rooms_bucket
+    )
+    SELECT 
+        cw.win,
+        cw.community,
+        cw.project,
+        cw.building,
+        cw.rooms_bucket,
+        cw.median_sqft::DECIMAL(10,2),
+        cw.p25_sqft::DECIMAL(10,2),
+        cw.p75_sqft::DECIMAL(10,2),
+        cw.avg_sqft::DECIMAL(10,2),
+        cw.tx_count::INTEGER,
+        cw.volume::DECIMAL(15,2),
+        CASE 
+            -- Comme la jointure par égalité de compute_market_baselines :
+            -- pas de fenêtre précédente si une clé de scope est NULL
+            WHEN cw.community IS NULL OR cw.project IS NULL
+                OR cw.building IS NULL OR cw.rooms_bucket IS NULL THEN NULL
+            WHEN cw.prev_median_sqft IS NOT NULL AND cw.prev_median_sqft > 0 
+            THEN ((cw.median_sqft - cw.prev_median_sqft) / cw.prev_median_sqft)::DECIMAL(8,4)
+            ELSE NULL
+        END as momentum,
+        CASE 
+            WHEN cw.median_sqft > 0 
+            THEN (cw.std_dev / cw.median_sqft)::DECIMAL(8,4)
+            ELSE NULL
+        END as volatility,
+        CASE 
+            WHEN cw.median_sqft > 0 
+            THEN ((cw.p75_sqft - cw.p25_sqft) / cw.median_sqft)::DECIMAL(8,4)
+            ELSE NULL
+        END as dispersion
+    FROM windows cw
+    WHERE cw.tx_count >= 3;
+END;
+$$ LANGUAGE plpgsql;
+
 -- ====================================================================
 -- INSERTION DES BASELINES
 -- ====================================================================
@@ -98,17 +224,17 @@ CREATE OR REPLACE PROCEDURE refresh_market_baselines(target_date DATE DEFAULT CU
 LANGUAGE plpgsql
 AS $$
 BEGIN
-    -- 7 jours
+    -- 7, 30 et 90 jours en une seule passe
     INSERT INTO market_baselines (
         calculation_date, community, project, building, rooms_bucket, window_days,
         median_price_per_sqft, p25_price_per_sqft, p75_price_per_sqft, avg_price_per_sqft,
         transaction_count, total_volume_aed, momentum, volatility, dispersion
     )
     SELECT 
-        target_date, community, project, building, rooms_bucket, 7,
+        target_date, community, project, building, rooms_bucket, window_days,
         median_price_per_sqft, p25_price_per_sqft, p75_price_per_sqft, avg_price_per_sqft,
         transaction_count, total_volume_aed, momentum, volatility, dispersion
-    FROM compute_market_baselines(target_date, 7)
+    FROM compute_market_baselines_all(target_date)
     ON CONFLICT (calculation_date, community, project, building, rooms_bucket, window_days)
     DO UPDATE SET
         median_price_per_sqft = EXCLUDED.median_price_per_sqft,
@@ -121,52 +247,58 @@ BEGIN
         volatility = EXCLUDED.volatility,
         dispersion = EXCLUDED.dispersion;
 
-    -- 30 jours
-    INSERT INTO market_baselines (
-        calculation_date, community, project, building, rooms_bucket, window_days,
-        median_price_per_sqft, p25_price_per_sqft, p75_price_per_sqft, avg_price_per_sqft,
-        transaction_count, total_volume_aed, momentum, volatility, dispersion
-    )
-    SELECT 
-        target_date, community, project, building, rooms_bucket, 30,
-        median_price_per_sqft, p25_price_per_sqft, p75_price_per_sqft, avg_price_per_sqft,
-        transaction_count, total_volume_aed, momentum, volatility, dispersion
-    FROM compute_market_baselines(target_date, 30)
-    ON CONFLICT (calculation_date, community, project, building, rooms_bucket, window_days)
-    DO UPDATE SET
-        median_price_per_sqft = EXCLUDED.median_price_per_sqft,
-        p25_price_per_sqft = EXCLUDED.p25_price_per_sqft,
-        p75_price_per_sqft = EXCLUDED.p75_price_per_sqft,
-        avg_price_per_sqft = EXCLUDED.avg_price_per_sqft,
-        transaction_count = EXCLUDED.transaction_count,
-        total_volume_aed = EXCLUDED.total_volume_aed,
-        momentum = EXCLUDED.momentum,
-        volatility = EXCLUDED.volatility,
-        dispersion = EXCLUDED.dispersion;
+    RAISE NOTICE 'Baselines refreshed for %', target_date;
+END;
+$$;
 
-    -- 90 jours
-    INSERT INTO market_baselines (
-        calculation_date, community, project, building, rooms_bucket, window_days,
-        median_price_per_sqft, p25_price_per_sqft, p75_price_per_sqft, avg_price_per_sqft,
-        transaction_count, total_volume_aed, momentum, volatility, dispersion
-    )
-    SELECT 
-        target_date, community, project, building, rooms_bucket, 90,
-        median_price_per_sqft, p25_price_per_sqft, p75_price_per_sqft, avg_price_per_sqft,
-        transaction_count, total_volume_aed, momentum, volatility, dispersion
-    FROM compute_market_baselines(target_date, 90)
-    ON CONFLICT (calculation_date, community, project, building, rooms_bucket, window_days)
-    DO UPDATE SET
-        median_price_per_sqft = EXCLUDED.median_price_per_sqft,
-        p25_price_per_sqft = EXCLUDED.p25_price_per_sqft,
-        p75_price_per_sqft = EXCLUDED.p75_price_per_sqft,
-        avg_price_per_sqft = EXCLUDED.avg_price_per_sqft,
-        transaction_count = EXCLUDED.transaction_count,
-        total_volume_aed = EXCLUDED.total_volume_aed,
-        momentum = EXCLUDED.momentum,
-        volatility = EXCLUDED.volatility,
-        dispersion = EXCLUDED.dispersion;
+-- ====================================================================
+-- INSERTION INCRÉMENTALE DES BASELINES
+-- ====================================================================
+-- Premier passage du jour : recalcul complet (les fenêtres glissent d'un
+-- jour, tous les scopes changent). Passages suivants (poller) : seuls les
+-- scopes marqués dans dirty_scopes sont recalculés, les autres gardent
+-- leurs baselines du jour déjà à jour.
+CREATE OR REPLACE PROCEDURE refresh_market_baselines_incremental(target_date DATE DEFAULT CURRENT_DATE)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_max_id BIGINT;
+BEGIN
+    SELECT MAX(id) INTO v_max_id FROM dirty_scopes WHERE consumer = 'baselines';
 
-    RAISE NOTICE 'Baselines refreshed for %', target_date;
+    IF NOT EXISTS (SELECT 1 FROM market_baselines WHERE calculation_date = target_date) THEN
+        CALL refresh_market_baselines(target_date);
+    ELSIF v_max_id IS NULL THEN
+        RAISE NOTICE 'Baselines: no dirty scope for %', target_date;
+        RETURN;
+    ELSE
+        INSERT INTO market_baselines (
+            calculation_date, community, project, building, rooms_bucket, window_days,
+            median_price_per_sqft, p25_price_per_sqft, p75_price_per_sqft, avg_price_per_sqft,
+            transaction_count, total_volume_aed, momentum, volatility, dispersion
+        )
+        SELECT 
+            target_date, community, project, building, rooms_bucket, window_days,
+            median_price_per_sqft, p25_price_per_sqft, p75_price_per_sqft, avg_price_per_sqft,
+            transaction_count, total_volume_aed, momentum, volatility, dispersion
+        FROM compute_market_baselines_all(target_date, v_max_id)
+        ON CONFLICT (calculation_date, community, project, building, rooms_bucket, window_days)
+        DO UPDATE SET
+            median_price_per_sqft = EXCLUDED.median_price_per_sqft,
+            p25_price_per_sqft = EXCLUDED.p25_price_per_sqft,
+            p75_price_per_sqft = EXCLUDED.p75_price_per_sqft,
+            avg_price_per_sqft = EXCLUDED.avg_price_per_sqft,
+            transaction_count = EXCLUDED.transaction_count,
+            total_volume_aed = EXCLUDED.total_volume_aed,
+            momentum = EXCLUDED.momentum,
+            volatility = EXCLUDED.volatility,
+            dispersion = EXCLUDED.dispersion;
+
+        RAISE NOTICE 'Baselines refreshed incrementally for %', target_date;
+    END IF;
+
+    IF v_max_id IS NOT NULL THEN
+        DELETE FROM dirty_scopes WHERE consumer = 'baselines' AND id <= v_max_id;
+    END IF;
 END;
 $$;
@@ -59,6 +59,34 @@ CREATE INDEX IF NOT EXISTS idx_features_source_type ON robin.features (source_ty
 CREATE INDEX IF NOT EXISTS idx_features_price_sqft ON robin.features (price_per_sqft);
 CREATE INDEX IF NOT EXISTS idx_features_rooms ON robin.features (rooms_bucket);
 
+-- ====================================================================
+-- GEOCODE CACHE (résultats Makani persistés entre les runs)
+-- ====================================================================
+CREATE TABLE IF NOT EXISTS robin.geocode_cache (
+    -- Clé normalisée "community|project|building" (minuscules)
+    location_key VARCHAR(800) PRIMARY KEY,
+    
+    -- Résultat (found = FALSE : cache négatif, aucune adresse Makani)
+    found BOOLEAN NOT NULL,
+    makani_number VARCHAR(20),
+    community VARCHAR(255),
+    project VARCHAR(255),
+    building VARCHAR(255),
+    street VARCHAR(255),
+    latitude DECIMAL(10, 7),
+    longitude DECIMAL(10, 7),
+    metro_station VARCHAR(255),
+    metro_distance_m INTEGER,
+    beach_distance_m INTEGER,
+    mall_distance_m INTEGER,
+    
+    -- Métadonnées
+    fetched_at TIMESTAMP DEFAULT NOW(),
+    expires_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_geocode_cache_expires ON robin.geocode_cache (expires_at);
+
 -- ====================================================================
 -- KPIs (8 KPIs avancés)
 -- ====================================================================
@@ -52,7 +52,13 @@ $$ LANGUAGE plpgsql IMMUTABLE;
 -- ====================================================================
 -- CALCUL DES RÉGIMES
 -- ====================================================================
-CREATE OR REPLACE FUNCTION compute_market_regimes(target_date DATE)
+-- max_dirty_id : si renseigné, seuls les scopes présents dans dirty_scopes
+-- (consumer 'regimes', id <= max_dirty_id) sont lus et classés.
+DROP FUNCTION IF EXISTS compute_market_regimes(DATE);
+CREATE OR REPLACE FUNCTION compute_market_regimes(
+    target_date DATE,
+    max_dirty_id BIGINT DEFAULT NULL
+)
 RETURNS TABLE (
     community VARCHAR,
     project VARCHAR,
@@ -78,6 +84,17 @@ BEGIN
         FROM market_baselines mb
         WHERE mb.calculation_date = target_date
             AND mb.window_days = 30
+            AND (
+                max_dirty_id IS NULL
+                OR EXISTS (
+                    SELECT 1 FROM dirty_scopes d
+                    WHERE d.consumer = 'regimes'
+                        AND d.id <= max_dirty_id
+                        AND d.community IS NOT DISTINCT FROM mb.community
+                        AND d.project IS NOT DISTINCT FROM mb.project
+                        AND d.building IS NOT DISTINCT FROM mb.building
+                )
+            )
     ),
     previous_metrics AS (
         SELECT 
@@ -88,6 +105,17 @@ BEGIN
         FROM market_baselines mb
         WHERE mb.calculation_date = target_date - 30
             AND mb.window_days = 30
+            AND (
+                max_dirty_id IS NULL
+                OR EXISTS (
+                    SELECT 1 FROM dirty_scopes d
+                    WHERE d.consumer = 'regimes'
+                        AND d.id <= max_dirty_id
+                        AND d.community IS NOT DISTINCT FROM mb.community
+                        AND d.project IS NOT DISTINCT FROM mb.project
+                        AND d.building IS NOT DISTINCT FROM mb.building
+                )
+            )
     ),
     trends AS (
         SELECT 
@@ -177,3 +205,50 @@ BEGIN
     RAISE NOTICE 'Market regimes refreshed for %', target_date;
 END;
 $$;
+
+-- ====================================================================
+-- INSERTION INCRÉMENTALE DES RÉGIMES
+-- ====================================================================
+-- Même principe que refresh_market_baselines_incremental : recalcul
+-- complet au premier passage du jour, puis uniquement les scopes
+-- (community, project, building) marqués dans dirty_scopes (filtre
+-- appliqué dès la lecture des baselines par compute_market_regimes).
+CREATE OR REPLACE PROCEDURE refresh_market_regimes_incremental(target_date DATE DEFAULT CURRENT_DATE)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_max_id BIGINT;
+BEGIN
+    SELECT MAX(id) INTO v_max_id FROM dirty_scopes WHERE consumer = 'regimes';
+
+    IF NOT EXISTS (SELECT 1 FROM market_regimes WHERE regime_date = target_date) THEN
+        CALL refresh_market_regimes(target_date);
+    ELSIF v_max_id IS NULL THEN
+        RAISE NOTICE 'Market regimes: no dirty scope for %', target_date;
+        RETURN;
+    ELSE
+        INSERT INTO market_regimes (
+            regime_date, community, project, building, regime, confidence_score,
+            volume_trend, price_trend, dispersion_level, volatility_level
+        )
+        SELECT 
+            target_date, r.community, r.project, r.building, r.regime, r.confidence_score,
+            r.volume_trend, r.price_trend, r.dispersion_level, r.volatility_level
+        FROM compute_market_regimes(target_date, v_max_id) r
+        ON CONFLICT (regime_date, community, project, building)
+        DO UPDATE SET
+            regime = EXCLUDED.regime,
+            confidence_score = EXCLUDED.confidence_score,
+            volume_trend = EXCLUDED.volume_trend,
+            price_trend = EXCLUDED.price_trend,
+            dispersion_level = EXCLUDED.dispersion_level,
+            volatility_level = EXCLUDED.volatility_level;
+
+        RAISE NOTICE 'Market regimes refreshed incrementally for %', target_date;
+    END IF;
+
+    IF v_max_id IS NOT NULL THEN
+        DELETE FROM dirty_scopes WHERE consumer = 'regimes' AND id <= v_max_id;
+    END IF;
+END;
+$$;
@@ -53,6 +53,9 @@ CREATE INDEX IF NOT EXISTS idx_project ON robin.transactions (project);
 CREATE INDEX IF NOT EXISTS idx_building ON robin.transactions (building);
 CREATE INDEX IF NOT EXISTS idx_rooms_bucket ON robin.transactions (rooms_bucket);
 CREATE INDEX IF NOT EXISTS idx_price_per_sqft ON robin.transactions (price_per_sqft);
+-- Scan des baselines (compute_market_baselines_all) : plage de dates + clés de scope
+CREATE INDEX IF NOT EXISTS idx_transactions_baseline_scan ON robin.transactions
+    (transaction_date, community, project, building, rooms_bucket) INCLUDE (price_per_sqft, price_aed);
 
 -- ====================================================================
 -- MORTGAGES (DLD)
@@ -220,6 +223,53 @@ CREATE TABLE IF NOT EXISTS robin.market_baselines (
 CREATE INDEX IF NOT EXISTS idx_baseline_date ON robin.market_baselines (calculation_date DESC);
 CREATE INDEX IF NOT EXISTS idx_baseline_scope ON robin.market_baselines (community, project, building);
 
+-- ====================================================================
+-- DIRTY SCOPES (recalcul incrémental baselines / régimes)
+-- ====================================================================
+-- Alimentée par ingest_transactions, consommée (puis vidée) par
+-- refresh_market_baselines_incremental et refresh_market_regimes_incremental
+CREATE TABLE IF NOT EXISTS robin.dirty_scopes (
+    id BIGSERIAL PRIMARY KEY,
+    consumer VARCHAR(50) NOT NULL, -- baselines, regimes
+    
+    -- Scope touché par de nouvelles transactions
+    community VARCHAR(255),
+    project VARCHAR(255),
+    building VARCHAR(255),
+    rooms_bucket VARCHAR(20),
+    
+    -- Metadata
+    marked_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Un scope n'est marqué qu'une fois par consommateur (NULL = valeur vide)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_dirty_scopes_key ON robin.dirty_scopes (
+    consumer, COALESCE(community, ''), COALESCE(project, ''),
+    COALESCE(building, ''), COALESCE(rooms_bucket, '')
+);
+
+-- ====================================================================
+-- INGESTION WATERMARKS (ingestion incrémentale par source)
+-- ====================================================================
+-- Dernier enregistrement vu par source : les ingestions suivantes ne
+-- demandent que les dates >= last_record_date
+CREATE TABLE IF NOT EXISTS robin.ingestion_watermarks (
+    source VARCHAR(50) PRIMARY KEY, -- transactions, mortgages
+    last_record_date DATE,
+    
+    -- Dernier run
+    last_new_count INTEGER DEFAULT 0,
+    last_run_at TIMESTAMP DEFAULT NOW(),
+    
+    -- Dernier run ayant inséré des lignes (fraîcheur des snapshots dashboard)
+    last_new_at TIMESTAMP
+);
+
+ALTER TABLE robin.ingestion_watermarks ADD COLUMN IF NOT EXISTS last_new_at TIMESTAMP;
+
+-- Colonne des premières versions, jamais lue
+ALTER TABLE robin.ingestion_watermarks DROP COLUMN IF EXISTS last_record_id;
+
 -- ====================================================================
 -- MARKET REGIMES (classification institutionnelle)
 -- ====================================================================
@@ -246,6 +296,25 @@ CREATE TABLE IF NOT EXISTS robin.market_regimes (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Unicité d'un régime par date et scope (cible des ON CONFLICT de
+-- refresh_market_regimes). Index plutôt que contrainte de table : il est
+-- aussi créé sur les bases existantes, après suppression des doublons
+-- (la ligne la plus récente est conservée).
+DELETE FROM robin.market_regimes r
+USING robin.market_regimes newer
+WHERE r.regime_date = newer.regime_date
+    AND r.community IS NOT DISTINCT FROM newer.community
+    AND r.project IS NOT DISTINCT FROM newer.project
+    AND r.building IS NOT DISTINCT FROM newer.building
+    AND (COALESCE(newer.created_at, '-infinity'), newer.id::TEXT)
+        > (COALESCE(r.created_at, '-infinity'), r.id::TEXT)
+    AND NOT EXISTS (
+        SELECT 1 FROM pg_indexes
+        WHERE schemaname = 'robin' AND indexname = 'idx_regime_unique_scope'
+    );
+CREATE UNIQUE INDEX IF NOT EXISTS idx_regime_unique_scope
+    ON robin.market_regimes (regime_date, community, project, building);
+
 CREATE INDEX IF NOT EXISTS idx_regime_date ON robin.market_regimes (regime_date DESC);
 CREATE INDEX IF NOT EXISTS idx_regime_type ON robin.market_regimes (regime);
 CREATE INDEX IF NOT EXISTS idx_regime_scope ON robin.market_regimes (community, project);
@@ -351,6 +420,24 @@ CREATE TABLE IF NOT EXISTS robin.daily_briefs (
 
 CREATE INDEX IF NOT EXISTS idx_brief_date ON robin.daily_briefs (brief_date DESC);
 
+-- ====================================================================
+-- DASHBOARD SNAPSHOTS (données dashboard précalculées)
+-- ====================================================================
+-- Écrite en fin de pipeline (après le brief) : une ligne marché global
+-- (community = '') et une ligne par communauté. Le dashboard lit une
+-- seule ligne par clé primaire au lieu de recalculer ses agrégats.
+CREATE TABLE IF NOT EXISTS robin.dashboard_snapshots (
+    snapshot_date DATE NOT NULL,
+    community VARCHAR(255) NOT NULL DEFAULT '', -- '' = marché global
+    
+    payload JSONB NOT NULL, -- kpis, stats, top quartiers, types, opportunités, régimes, brief
+    
+    -- Metadata
+    computed_at TIMESTAMP DEFAULT NOW(),
+    
+    PRIMARY KEY (snapshot_date, community)
+);
+
 -- ====================================================================
 -- VIEWS
 -- ====================================================================
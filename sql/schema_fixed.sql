@@ -218,6 +218,25 @@ CREATE TABLE IF NOT EXISTS market_regimes (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Unicité d'un régime par date et scope (cible des ON CONFLICT de
+-- refresh_market_regimes). Index plutôt que contrainte de table : il est
+-- aussi créé sur les bases existantes, après suppression des doublons
+-- (la ligne la plus récente est conservée).
+DELETE FROM market_regimes r
+USING market_regimes newer
+WHERE r.regime_date = newer.regime_date
+    AND r.community IS NOT DISTINCT FROM newer.community
+    AND r.project IS NOT DISTINCT FROM newer.project
+    AND r.building IS NOT DISTINCT FROM newer.building
+    AND (COALESCE(newer.created_at, '-infinity'), newer.id::TEXT)
+        > (COALESCE(r.created_at, '-infinity'), r.id::TEXT)
+    AND NOT EXISTS (
+        SELECT 1 FROM pg_indexes
+        WHERE schemaname = current_schema() AND indexname = 'idx_regime_unique_scope'
+    );
+CREATE UNIQUE INDEX IF NOT EXISTS idx_regime_unique_scope
+    ON market_regimes (regime_date, community, project, building);
+
 -- ====================================================================
 -- OPPORTUNITIES (deals détectés)
 -- ====================================================================
@@ -12,7 +12,7 @@ Enrichi avec les KPIs avancés :
 - APS (Anomaly Persistence Score)
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
+from typing import Dict, Iterable, Optional, Tuple
 from decimal import Decimal
 from loguru import logger
 
@@ -20,6 +20,126 @@ from core.db import db
 from core.models import KPIContext
 
 
+# Score par régime de marché et type de stratégie
+REGIME_SCORES = {
+    'flip': {
+        'ACCUMULATION': 80.0,  # Bon timing pour flip
+        'EXPANSION': 90.0,     # Excellent pour flip
+        'DISTRIBUTION': 50.0,  # Risqué
+        'RETOURNEMENT': 20.0,  # Très risqué
+        'NEUTRAL': 60.0
+    },
+    'rent': {
+        'ACCUMULATION': 70.0,
+        'EXPANSION': 75.0,
+        'DISTRIBUTION': 80.0,  # Bon pour location (marché stable)
+        'RETOURNEMENT': 60.0,
+        'NEUTRAL': 70.0
+    },
+    'long_term': {
+        'ACCUMULATION': 100.0,  # Meilleur moment pour long term
+        'EXPANSION': 80.0,
+        'DISTRIBUTION': 40.0,
+        'RETOURNEMENT': 20.0,
+        'NEUTRAL': 60.0
+    }
+}
+
+KPI_FIELDS = ("tls", "lad", "rsg", "spi", "gpi", "rcwm", "ord", "aps")
+
+
+def build_kpi_context(kpi_row: Optional[Dict], risk_row: Optional[Dict]) -> KPIContext:
+    """Construire un KPIContext à partir d'une ligne kpis et d'une ligne risk_summaries"""
+    kpi_context = KPIContext()
+    
+    if kpi_row:
+        for field in KPI_FIELDS:
+            value = kpi_row.get(field)
+            setattr(kpi_context, field, float(value) if value else None)
+    
+    if risk_row:
+        kpi_context.supply_risk = risk_row.get("supply_risk_level", "UNKNOWN")
+        kpi_context.volatility_risk = risk_row.get("volatility_risk_level", "UNKNOWN")
+        kpi_context.divergence_risk = risk_row.get("divergence_risk_level", "UNKNOWN")
+        kpi_context.overall_risk_score = float(risk_row["overall_risk_score"]) if risk_row.get("overall_risk_score") else None
+    
+    return kpi_context
+
+
+def load_kpi_contexts(
+    scopes: Iterable[Tuple[str, Optional[str]]],
+    window_days: int = 30
+) -> Dict[Tuple[str, Optional[str]], KPIContext]:
+    """
+    Précharger les contextes KPI de plusieurs scopes en un seul aller-retour par table
+    
+    Équivalent ensembliste de BaseStrategy._get_kpi_context : dernier KPI
+    par (community, rooms_bucket) et dernier risk summary par community.
+    
+    Args:
+        scopes: Couples (community, rooms_bucket)
+        window_days: Fenêtre en jours
+        
+    Returns:
+        Dict (community, rooms_bucket) -> KPIContext
+    """
+    scopes = set(scopes)
+    if not scopes:
+        return {}
+    
+    communities = sorted({community for community, _ in scopes if community is not None})
+    with_rooms = {scope for scope in scopes if scope[1]}
+    kpi_rows = {}
+    
+    if with_rooms:
+        query = """
+        SELECT DISTINCT ON (community, rooms_bucket)
+            community, rooms_bucket, tls, lad, rsg, spi, gpi, rcwm, ord, aps
+        FROM kpis
+        WHERE window_days = %s
+            AND community = ANY(%s)
+            AND rooms_bucket = ANY(%s)
+        ORDER BY community, rooms_bucket, calculation_date DESC
+        """
+        rooms_buckets = sorted({rooms_bucket for _, rooms_bucket in with_rooms})
+        for row in db.execute_query(query, (window_days, communities, rooms_buckets)):
+            kpi_rows[(row["community"], row["rooms_bucket"])] = row
+    
+    if len(with_rooms) < len(scopes):
+        # Scopes sans rooms_bucket : dernier KPI de la communauté, tous buckets confondus
+        query = """
+        SELECT DISTINCT ON (community)
+            community, tls, lad, rsg, spi, gpi, rcwm, ord, aps
+        FROM kpis
+        WHERE window_days = %s
+            AND community = ANY(%s)
+        ORDER BY community, calculation_date DESC
+        """
+        bare = sorted({community for community, rooms_bucket in scopes if not rooms_bucket})
+        for row in db.execute_query(query, (window_days, bare)):
+            for scope in scopes:
+                if scope[0] == row["community"] and not scope[1]:
+                    kpi_rows[scope] = row
+    
+    risk_query = """
+    SELECT DISTINCT ON (community)
+        community,
+        supply_risk_level,
+        volatility_risk_level,
+        divergence_risk_level,
+        overall_risk_score
+    FROM risk_summaries
+    WHERE community = ANY(%s)
+    ORDER BY community, summary_date DESC
+    """
+    risk_rows = {row["community"]: row for row in db.execute_query(risk_query, (communities,))}
+    
+    return {
+        scope: build_kpi_context(kpi_rows.get(scope), risk_rows.get(scope[0]))
+        for scope in scopes
+    }
+
+
 class BaseStrategy(ABC):
     """Stratégie de base abstraite"""
     
@@ -61,7 +181,8 @@ class BaseStrategy(ABC):
         Returns:
             KPIContext avec les KPIs et risques
         """
-        kpi_context = KPIContext()
+        kpi_row = None
+        risk_row = None
         
         # Récupérer les KPIs
         kpi_query = """
@@ -81,15 +202,7 @@ class BaseStrategy(ABC):
         try:
             results = db.execute_query(kpi_query, tuple(params))
             if results:
-                row = results[0]
-                kpi_context.tls = float(row["tls"]) if row.get("tls") else None
-                kpi_context.lad = float(row["lad"]) if row.get("lad") else None
-                kpi_context.rsg = float(row["rsg"]) if row.get("rsg") else None
-                kpi_context.spi = float(row["spi"]) if row.get("spi") else None
-                kpi_context.gpi = float(row["gpi"]) if row.get("gpi") else None
-                kpi_context.rcwm = float(row["rcwm"]) if row.get("rcwm") else None
-                kpi_context.ord = float(row["ord"]) if row.get("ord") else None
-                kpi_context.aps = float(row["aps"]) if row.get("aps") else None
+                kpi_row = results[0]
         except Exception as e:
             logger.warning(f"Erreur récupération KPIs pour scoring : {e}")
         
@@ -109,15 +222,25 @@ class BaseStrategy(ABC):
         try:
             risk_results = db.execute_query(risk_query, (community,))
             if risk_results:
-                row = risk_results[0]
-                kpi_context.supply_risk = row.get("supply_risk_level", "UNKNOWN")
-                kpi_context.volatility_risk = row.get("volatility_risk_level", "UNKNOWN")
-                kpi_context.divergence_risk = row.get("divergence_risk_level", "UNKNOWN")
-                kpi_context.overall_risk_score = float(row["overall_risk_score"]) if row.get("overall_risk_score") else None
+                risk_row = risk_results[0]
         except Exception as e:
             logger.warning(f"Erreur récupération risques pour scoring : {e}")
         
-        return kpi_context
+        return build_kpi_context(kpi_row, risk_row)
+    
+    def _resolve_kpi_context(self, opportunity: Dict, context: Dict) -> KPIContext:
+        """
+        Contexte KPI préchargé (context['kpi_context']) si disponible,
+        sinon requête unitaire via _get_kpi_context
+        """
+        kpi_ctx = context.get('kpi_context')
+        if kpi_ctx is not None:
+            return kpi_ctx
+        
+        return self._get_kpi_context(
+            opportunity.get('community', ''),
+            opportunity.get('rooms_bucket')
+        )
     
     def _get_discount_score(self, discount_pct: Decimal) -> float:
         """Score basé sur le discount (0-100)"""
@@ -175,28 +298,4 @@ class BaseStrategy(ABC):
             regime: ACCUMULATION, EXPANSION, DISTRIBUTION, RETOURNEMENT, NEUTRAL
             strategy_type: flip, rent, long_term
         """
-        regime_scores = {
-            'flip': {
-                'ACCUMULATION': 80.0,  # Bon timing pour flip
-                'EXPANSION': 90.0,     # Excellent pour flip
-                'DISTRIBUTION': 50.0,  # Risqué
-                'RETOURNEMENT': 20.0,  # Très risqué
-                'NEUTRAL': 60.0
-            },
-            'rent': {
-                'ACCUMULATION': 70.0,
-                'EXPANSION': 75.0,
-                'DISTRIBUTION': 80.0,  # Bon pour location (marché stable)
-                'RETOURNEMENT': 60.0,
-                'NEUTRAL': 70.0
-            },
-            'long_term': {
-                'ACCUMULATION': 100.0,  # Meilleur moment pour long term
-                'EXPANSION': 80.0,
-                'DISTRIBUTION': 40.0,
-                'RETOURNEMENT': 20.0,
-                'NEUTRAL': 60.0
-            }
-        }
-        
-        return regime_scores.get(strategy_type, {}).get(regime, 50.0)
+        return REGIME_SCORES.get(strategy_type, {}).get(regime, 50.0)
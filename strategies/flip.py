@@ -34,10 +34,7 @@ class FlipStrategy(BaseStrategy):
         """Calculer le score FLIP enrichi avec KPIs avancés"""
         
         # Récupérer le contexte KPI
-        kpi_ctx = self._get_kpi_context(
-            opportunity.get('community', ''),
-            opportunity.get('rooms_bucket')
-        )
+        kpi_ctx = self._resolve_kpi_context(opportunity, context)
         
         # 1. Discount ajusté (35% du score)
         # Utilise LAD si disponible, sinon discount classique
@@ -10,6 +10,19 @@ from typing import Dict
 from strategies.base import BaseStrategy
 
 
+# Score par niveau de risque de supply future
+SUPPLY_SCORES = {
+    'low': 100.0,
+    'LOW': 100.0,
+    'medium': 60.0,
+    'MEDIUM': 60.0,
+    'high': 20.0,
+    'HIGH': 20.0,
+    'unknown': 50.0,
+    'UNKNOWN': 50.0
+}
+
+
 class LongTermStrategy(BaseStrategy):
     """
     Stratégie LONG_TERM (appréciation du capital)
@@ -34,10 +47,7 @@ class LongTermStrategy(BaseStrategy):
         """Calculer le score LONG_TERM enrichi avec KPIs avancés"""
         
         # Récupérer le contexte KPI
-        kpi_ctx = self._get_kpi_context(
-            opportunity.get('community', ''),
-            opportunity.get('rooms_bucket')
-        )
+        kpi_ctx = self._resolve_kpi_context(opportunity, context)
         
         # 1. Régime de marché avec RCWM (30% du score)
         regime = context.get('regime', 'NEUTRAL')
@@ -134,14 +144,4 @@ class LongTermStrategy(BaseStrategy):
     
     def _get_supply_score(self, supply_risk: str) -> float:
         """Score basé sur le risque de supply future"""
-        supply_scores = {
-            'low': 100.0,
-            'LOW': 100.0,
-            'medium': 60.0,
-            'MEDIUM': 60.0,
-            'high': 20.0,
-            'HIGH': 20.0,
-            'unknown': 50.0,
-            'UNKNOWN': 50.0
-        }
-        return supply_scores.get(supply_risk, 50.0)
+        return SUPPLY_SCORES.get(supply_risk, 50.0)
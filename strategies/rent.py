@@ -33,10 +33,7 @@ class RentStrategy(BaseStrategy):
         """Calculer le score RENT enrichi avec KPIs avancés"""
         
         # Récupérer le contexte KPI
-        kpi_ctx = self._get_kpi_context(
-            opportunity.get('community', ''),
-            opportunity.get('rooms_bucket')
-        )
+        kpi_ctx = self._resolve_kpi_context(opportunity, context)
         
         # 1. Rendement avec RSG (35% du score)
         discount_pct = opportunity.get('discount_pct', 0)
@@ -0,0 +1,301 @@
+"""
+Scoring vectorisé des stratégies FLIP, RENT et LONG_TERM
+
+Équivalent colonnaire de FlipStrategy.score, RentStrategy.score et
+LongTermStrategy.score : les cascades if/elif sont remplacées par des
+lookups de seuils (np.searchsorted / np.select) évalués sur tout un lot
+d'opportunités. Sert au re-scoring de l'historique complet et aux
+simulations de pondération.
+
+Les valeurs absentes (None côté scalaire) sont représentées par NaN.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.models import KPIContext
+from strategies.base import REGIME_SCORES
+from strategies.long_term import SUPPLY_SCORES
+
+
+# Pondération du score global (cf. compute_scores)
+GLOBAL_WEIGHTS = {'FLIP': 0.4, 'RENT': 0.3, 'LONG': 0.3}
+
+# Colonnes attendues par score_batch
+FRAME_COLUMNS = [
+    # Opportunité
+    'discount_pct', 'price_per_sqft',
+    # Contexte marché
+    'transaction_count', 'momentum', 'volatility', 'regime', 'supply_risk',
+    # Contexte KPI
+    'tls', 'lad', 'rsg', 'spi', 'gpi', 'rcwm', 'ord', 'aps',
+    'kpi_supply_risk', 'kpi_volatility_risk',
+]
+
+
+def build_score_frame(opportunities: List[Dict], contexts: List[Dict]) -> pd.DataFrame:
+    """
+    Aplatir des couples (opportunité, contexte) en lot colonnaire
+
+    Les contextes sont ceux de compute_scores ; le KPIContext doit être
+    préchargé dans context['kpi_context'] (absent = KPIs inconnus).
+    """
+    rows = []
+    for opportunity, context in zip(opportunities, contexts):
+        baseline = context.get('baseline', {})
+        kpi_ctx = context.get('kpi_context') or KPIContext()
+        rows.append({
+            'discount_pct': opportunity.get('discount_pct', 0),
+            'price_per_sqft': opportunity.get('price_per_sqft', 0),
+            'transaction_count': baseline.get('transaction_count', 0),
+            'momentum': baseline.get('momentum'),
+            'volatility': baseline.get('volatility', 0.15),
+            'regime': context.get('regime', 'NEUTRAL'),
+            'supply_risk': context.get('supply_risk', 'low'),
+            'tls': kpi_ctx.tls,
+            'lad': kpi_ctx.lad,
+            'rsg': kpi_ctx.rsg,
+            'spi': kpi_ctx.spi,
+            'gpi': kpi_ctx.gpi,
+            'rcwm': kpi_ctx.rcwm,
+            'ord': kpi_ctx.ord,
+            'aps': kpi_ctx.aps,
+            'kpi_supply_risk': kpi_ctx.supply_risk,
+            'kpi_volatility_risk': kpi_ctx.volatility_risk,
+        })
+
+    return pd.DataFrame(rows, columns=FRAME_COLUMNS)
+
+
+def score_batch(frame: pd.DataFrame, weights: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    """
+    Scorer un lot d'opportunités pour les trois stratégies
+
+    Args:
+        frame: Lot colonnaire (cf. FRAME_COLUMNS / build_score_frame)
+        weights: Pondération du score global par stratégie (défaut GLOBAL_WEIGHTS)
+
+    Returns:
+        DataFrame (même index) avec flip_score, rent_score, long_term_score,
+        global_score et recommended_strategy
+    """
+    weights = weights or GLOBAL_WEIGHTS
+
+    flip = _score_flip(frame)
+    rent = _score_rent(frame)
+    long_term = _score_long_term(frame)
+
+    global_score = flip * weights['FLIP'] + rent * weights['RENT'] + long_term * weights['LONG']
+
+    # Première stratégie au score maximal (même départage que max() sur dict)
+    labels = np.array(['FLIP', 'RENT', 'LONG'])
+    recommended = labels[np.argmax(np.column_stack([flip, rent, long_term]), axis=1)]
+    recommended = np.where(global_score < 40, 'IGNORE', recommended)
+
+    return pd.DataFrame({
+        'flip_score': flip,
+        'rent_score': rent,
+        'long_term_score': long_term,
+        'global_score': global_score,
+        'recommended_strategy': recommended,
+    }, index=frame.index)
+
+
+# ====================================================================
+# LOOKUPS DE SEUILS
+# ====================================================================
+
+def _col(frame: pd.DataFrame, name: str) -> np.ndarray:
+    """Colonne numérique en float64 (None -> NaN)"""
+    return pd.to_numeric(frame[name], errors='coerce').to_numpy(dtype=float)
+
+
+def _step_above(values: np.ndarray, bounds: List[float], scores: List[float], missing: float) -> np.ndarray:
+    """
+    Score par paliers « values > bound » (bornes croissantes)
+
+    scores[i] s'applique quand exactement i bornes sont strictement dépassées.
+    """
+    idx = np.searchsorted(np.asarray(bounds), values, side='left')
+    result = np.asarray(scores)[np.minimum(idx, len(bounds))]
+    return np.where(np.isnan(values), missing, result)
+
+
+def _step_at_least(values: np.ndarray, bounds: List[float], scores: List[float], missing: float) -> np.ndarray:
+    """Score par paliers « values >= bound » (bornes croissantes)"""
+    idx = np.searchsorted(np.asarray(bounds), values, side='right')
+    result = np.asarray(scores)[np.minimum(idx, len(bounds))]
+    return np.where(np.isnan(values), missing, result)
+
+
+def _discount_score(discount: np.ndarray) -> np.ndarray:
+    """Vectorisation de BaseStrategy._get_discount_score"""
+    return np.select(
+        [discount >= 30, discount >= 20, discount >= 10],
+        [100.0, 75.0 + (discount - 20) * 2.5, 50.0 + (discount - 10) * 2.5],
+        default=discount * 5.0
+    )
+
+
+def _liquidity_score(count: np.ndarray) -> np.ndarray:
+    """Vectorisation de BaseStrategy._get_liquidity_score"""
+    return np.select(
+        [count >= 20, count >= 10, count >= 5],
+        [100.0, 50.0 + (count - 10) * 5.0, 25.0 + (count - 5) * 5.0],
+        default=count * 5.0
+    )
+
+
+def _momentum_score(momentum: np.ndarray) -> np.ndarray:
+    """Vectorisation de BaseStrategy._get_momentum_score"""
+    score = np.select(
+        [momentum > 0.10, momentum > 0.05, momentum > -0.05],
+        [100.0, 75.0, 50.0 + momentum * 500],
+        default=0.0
+    )
+    return np.where(np.isnan(momentum), 50.0, score)
+
+
+def _regime_score(regime: pd.Series, strategy_type: str) -> np.ndarray:
+    """Vectorisation de BaseStrategy._get_regime_score"""
+    return regime.map(REGIME_SCORES[strategy_type]).fillna(50.0).to_numpy(dtype=float)
+
+
+# ====================================================================
+# STRATÉGIES
+# ====================================================================
+
+def _score_flip(frame: pd.DataFrame) -> np.ndarray:
+    """Vectorisation de FlipStrategy.score"""
+    lad = _col(frame, 'lad')
+    tls = _col(frame, 'tls')
+    ord_ = _col(frame, 'ord')
+    discount = np.nan_to_num(_col(frame, 'discount_pct'))
+    regime = frame['regime']
+
+    # 1. Discount ajusté (LAD si > 0)
+    discount_score = np.where(
+        lad > 0,
+        np.minimum(100, lad * 20),
+        _discount_score(discount)
+    ) * 0.35
+
+    # 2. Liquidité
+    liquidity_score = _liquidity_score(np.nan_to_num(_col(frame, 'transaction_count'))) * 0.25
+
+    # 3. Spread TLS
+    tls_score = _step_above(tls, [0, 0.05, 0.10, 0.15], [20, 40, 60, 80, 100], missing=50) * 0.15
+
+    # 4. Momentum / 5. Régime
+    momentum_score = _momentum_score(_col(frame, 'momentum')) * 0.10
+    regime_score = _regime_score(regime, 'flip') * 0.15
+
+    raw_score = discount_score + liquidity_score + tls_score + momentum_score + regime_score
+
+    # Pénalités
+    supply_risk = np.where(
+        frame['kpi_supply_risk'] != 'UNKNOWN',
+        frame['kpi_supply_risk'],
+        frame['supply_risk']
+    )
+    penalties = np.select([supply_risk == 'HIGH', supply_risk == 'MEDIUM'], [20, 10], default=0)
+    penalties = penalties + np.where(regime == 'RETOURNEMENT', 15, 0)
+    penalties = penalties + np.where(ord_ > 0.15, 10, 0)
+
+    return np.clip(raw_score - penalties, 0.0, 100.0)
+
+
+def _score_rent(frame: pd.DataFrame) -> np.ndarray:
+    """Vectorisation de RentStrategy.score"""
+    rsg = _col(frame, 'rsg')
+    gpi = _col(frame, 'gpi')
+    volatility = _col(frame, 'volatility')
+    price_per_sqft = np.nan_to_num(_col(frame, 'price_per_sqft'))
+    discount = np.nan_to_num(_col(frame, 'discount_pct'))
+    volatility_risk = frame['kpi_volatility_risk']
+
+    # 1. Rendement ajusté par RSG
+    with np.errstate(divide='ignore'):
+        base_yield = np.where(
+            price_per_sqft > 0,
+            (100.0 / np.where(price_per_sqft > 0, price_per_sqft, 1.0)) * 100 + discount * 0.05,
+            5.0
+        )
+    yield_bonus = _step_above(rsg, [-0.15, -0.05, 0.05, 0.15], [-20, -10, 0, 10, 20], missing=0)
+    adjusted_yield = base_yield + yield_bonus * 0.1
+    yield_score = np.select(
+        [adjusted_yield >= 8.0, adjusted_yield >= 6.0, adjusted_yield >= 4.0],
+        [100.0, 70.0 + (adjusted_yield - 6.0) * 15.0, 40.0 + (adjusted_yield - 4.0) * 15.0],
+        default=np.maximum(0, adjusted_yield * 10.0)
+    ) * 0.35
+
+    # 2. Stabilité prix (« volatility < bound »)
+    stability_score = _step_at_least(
+        volatility, [0.05, 0.10, 0.15, 0.20], [100, 80, 60, 40, 20], missing=50
+    ) * 0.20
+
+    # 3. Localisation GPI
+    gpi_score = _step_at_least(gpi, [40, 60, 80], [25, 50, 75, 100], missing=50) * 0.20
+
+    # 4. Liquidité / 5. Régime
+    liquidity_score = _liquidity_score(np.nan_to_num(_col(frame, 'transaction_count'))) * 0.10
+    regime_score = _regime_score(frame['regime'], 'rent') * 0.15
+
+    raw_score = yield_score + stability_score + gpi_score + liquidity_score + regime_score
+
+    # Pénalités
+    penalties = np.select(
+        [volatility_risk == 'HIGH', volatility_risk == 'MEDIUM', volatility > 0.25],
+        [15, 5, 15],
+        default=0
+    )
+    penalties = penalties + np.where(rsg < -0.20, 10, 0)
+
+    return np.clip(raw_score - penalties, 0.0, 100.0)
+
+
+def _score_long_term(frame: pd.DataFrame) -> np.ndarray:
+    """Vectorisation de LongTermStrategy.score"""
+    rcwm = _col(frame, 'rcwm')
+    spi = _col(frame, 'spi')
+    aps = _col(frame, 'aps')
+    volatility = _col(frame, 'volatility')
+    discount = np.nan_to_num(_col(frame, 'discount_pct'))
+    regime = frame['regime']
+    volatility_risk = frame['kpi_volatility_risk']
+
+    # 1. Régime ajusté par RCWM
+    base_regime_score = _regime_score(regime, 'long_term')
+    rcwm_bonus = _step_above(rcwm, [-0.05, -0.02, 0, 0.02, 0.05], [-15, -8, 0, 3, 8, 15], missing=0)
+    regime_score = np.where(
+        np.isnan(rcwm),
+        base_regime_score,
+        np.clip(base_regime_score + rcwm_bonus, 0, 100)
+    ) * 0.30
+
+    # 2. Discount
+    discount_score = _discount_score(discount) * 0.25
+
+    # 3. Supply (SPI, sinon risque de supply du contexte)
+    supply_score = frame['supply_risk'].map(SUPPLY_SCORES).fillna(50.0).to_numpy(dtype=float)
+    spi_score = np.where(np.isnan(spi), supply_score, 100 - spi) * 0.20
+
+    # 4. Momentum
+    momentum_score = _momentum_score(_col(frame, 'momentum')) * 0.15
+
+    # 5. Anomaly Persistence
+    aps_score = _step_above(aps, [0.1, 0.3, 0.5, 0.7], [10, 30, 50, 75, 100], missing=30) * 0.10
+
+    raw_score = regime_score + discount_score + spi_score + momentum_score + aps_score
+
+    # Pénalités
+    penalties = np.select(
+        [volatility_risk == 'HIGH', volatility_risk == 'MEDIUM', volatility > 0.25, volatility > 0.20],
+        [20, 10, 20, 10],
+        default=0
+    )
+    penalties = penalties + np.where(regime == 'RETOURNEMENT', 25, 0)
+    penalties = penalties + np.where((spi > 80) | (frame['kpi_supply_risk'] == 'HIGH').to_numpy(), 15, 0)
+
+    return np.clip(raw_score - penalties, 0.0, 100.0)
@@ -0,0 +1,183 @@
+"""
+Tests du cache mémoire borné (realtime.cache.InMemoryCache)
+
+Bornes LRU / TTL, accès concurrents, calcul unique par clé,
+stale-while-revalidate de get_or_compute et partage via backend SQLite.
+"""
+import os
+import pickle
+import tempfile
+import threading
+import time
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from realtime.cache import InMemoryCache
+from realtime.cache_backends import SqliteCacheBackend
+
+
+class TestInMemoryCache(unittest.TestCase):
+
+    def test_lru_eviction_by_entries(self):
+        cache = InMemoryCache(ttl_minutes=10, max_entries=2, max_bytes=0)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_eviction_by_bytes(self):
+        cache = InMemoryCache(ttl_minutes=10, max_entries=0, max_bytes=10_000)
+        for i in range(50):
+            cache.set(str(i), list(range(100)))
+
+        stats = cache.stats()
+        self.assertLessEqual(stats["bytes"], 10_000)
+        self.assertGreater(stats["evictions"], 0)
+        self.assertEqual(cache.get("49"), list(range(100)))
+
+    def test_oversized_value_replaces_previous_entry(self):
+        cache = InMemoryCache(ttl_minutes=10, max_entries=0, max_bytes=10_000)
+        cache.set("k", "small")
+        cache.set("k", list(range(5_000)))
+
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+    def test_ttl_expiry(self):
+        cache = InMemoryCache(ttl_minutes=10, max_entries=0, max_bytes=0)
+        cache.set("short", "x", ttl=0.05)
+        cache.set("long", "y")
+        time.sleep(0.1)
+
+        self.assertIsNone(cache.get("short"))
+        self.assertEqual(cache.get("long"), "y")
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_rewrite_resets_ttl(self):
+        cache = InMemoryCache(ttl_minutes=10, max_entries=0, max_bytes=0)
+        cache.set("k", 1, ttl=0.05)
+        cache.set("k", 2)
+        time.sleep(0.1)
+        self.assertEqual(cache.get("k"), 2)
+
+    def test_concurrent_access_stays_bounded(self):
+        cache = InMemoryCache(ttl_minutes=10, max_entries=100, max_bytes=0)
+
+        def worker(offset):
+            for i in range(5000):
+                cache.set(str((i + offset) % 300), i)
+                cache.get(str(i % 300))
+
+        threads = [threading.Thread(target=worker, args=(n * 37,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 100)
+        self.assertEqual(stats["hits"] + stats["misses"], 8 * 5000)
+
+    def test_concurrent_misses_compute_once(self):
+        cache = InMemoryCache(ttl_minutes=10, max_entries=0, max_bytes=0)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return {"value": len(calls)}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute)))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"value": 1}] * 10)
+        self.assertEqual(cache.stats()["coalesced"], 9)
+
+    def test_stale_value_served_while_refreshing(self):
+        cache = InMemoryCache(ttl_minutes=10, max_entries=0, max_bytes=0)
+        refreshed = threading.Event()
+        cache.set("k", "old", ttl=0.05, stale_ttl=60)
+        time.sleep(0.1)
+
+        def compute():
+            refreshed.set()
+            return "new"
+
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.get_or_compute("k", compute, stale_ttl=60), "old")
+        self.assertTrue(refreshed.wait(2))
+        for _ in range(100):
+            if cache.get("k") == "new":
+                break
+            time.sleep(0.01)
+        self.assertEqual(cache.get("k"), "new")
+
+    def test_compute_error_reaches_all_waiters_and_is_not_cached(self):
+        cache = InMemoryCache(ttl_minutes=10, max_entries=0, max_bytes=0)
+
+        def compute():
+            raise ValueError("db down")
+
+        with self.assertRaises(ValueError):
+            cache.get_or_compute("k", compute)
+        self.assertEqual(cache.get_or_compute("k", lambda: "ok"), "ok")
+
+
+class TestSharedBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+
+    def _cache(self):
+        return InMemoryCache(ttl_minutes=10, max_entries=0, max_bytes=0, backend=SqliteCacheBackend(self.path))
+
+    def test_value_shared_between_instances(self):
+        writer, reader = self._cache(), self._cache()
+        value = {"kpis": {"avg_price_sqft": Decimal("1520.5")}, "date": date(2026, 10, 16)}
+        writer.set("dashboard_2026-10-16", value)
+
+        self.assertEqual(reader.get_or_compute("dashboard_2026-10-16", lambda: "computed"), value)
+        self.assertEqual(reader.stats()["shared_hits"], 1)
+
+    def test_oversized_value_removed_from_backend(self):
+        backend = SqliteCacheBackend(self.path)
+        cache = InMemoryCache(ttl_minutes=10, max_entries=0, max_bytes=10_000, backend=backend)
+        cache.set("k", "small")
+        cache.set("k", list(range(5_000)))
+
+        self.assertIsNone(backend.get("k"))
+        self.assertIsNone(self._cache().get("k"))
+
+    def test_unreadable_payload_is_a_miss(self):
+        backend = SqliteCacheBackend(self.path)
+        backend.set("k", pickle.dumps({"x": 1}), time.time() + 60, time.time() + 60)
+
+        self.assertEqual(self._cache().get_or_compute("k", lambda: "computed"), "computed")
+
+    def test_invalidation_reaches_other_instances(self):
+        writer, reader = self._cache(), self._cache()
+        writer.set("k", "v")
+        self.assertEqual(reader.get("k"), "v")
+
+        writer.invalidate()
+        reader._generation_checked_at = float("-inf")
+        self.assertIsNone(reader.get("k"))
+        self.assertEqual(reader.stats()["invalidations"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Tests de parité de la normalisation en colonnes (pipelines.compute_features)
+
+Compare _build_feature_frame aux chemins ligne à ligne _process_transactions
+et _process_listings : mêmes features acceptées, mêmes valeurs et mêmes
+compteurs de rejet, valeurs limites et données invalides incluses.
+"""
+import random
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from pipelines.compute_features import (
+    FEATURE_COLUMNS,
+    _build_feature_frame,
+    _process_listings,
+    _process_transactions,
+)
+
+
+PRICES = [None, 0, Decimal("-5"), Decimal("250000"), Decimal("1200000.50"), Decimal("5000000"), "abc"]
+AREAS = [None, 0, Decimal("-1"), Decimal("100"), Decimal("850.25"), Decimal("1500"), Decimal("2400000")]
+PSF = [None, 0, Decimal("499.99"), Decimal("500"), Decimal("1411.76"), Decimal("10000"), Decimal("10000.01")]
+NAMES = [None, "", "  Dubai   Marina ", "Dubai Marina", "JVC", "Business  Bay"]
+
+
+def _random_transaction(rng, i):
+    return {
+        "transaction_id": f"tx-{i}",
+        "transaction_date": rng.choice([date(2026, 10, 1), date(2026, 10, 2), None]) if rng.random() < 0.05 else date(2026, 10, 1),
+        "community": rng.choice(NAMES),
+        "project": rng.choice(NAMES),
+        "building": rng.choice(NAMES),
+        "rooms_bucket": rng.choice([None, "1BR", "2BR"]),
+        "property_type": rng.choice([None, "apartment", "villa"]),
+        "price_aed": rng.choice(PRICES),
+        "price_per_sqft": rng.choice(PSF),
+        "area_sqft": rng.choice(AREAS),
+        "is_offplan": rng.choice([True, False, False, None]),
+    }
+
+
+def _random_listing(rng, i):
+    return {
+        "listing_id": 1000 + i,
+        "listing_date": rng.choice([date(2026, 9, 20), None]),
+        "community": rng.choice(NAMES),
+        "project": rng.choice(NAMES),
+        "building": rng.choice(NAMES),
+        "rooms_bucket": rng.choice([None, "studio", "3BR+"]),
+        "property_type": "apartment",
+        "asking_price_aed": rng.choice(PRICES),
+        "asking_price_per_sqft": rng.choice(PSF),
+        "area_sqft": rng.choice(AREAS),
+        "days_on_market": rng.choice([None, 0, 12, 90]),
+        "price_changes": rng.choice([None, 0, 1, 3]),
+    }
+
+
+def _to_columns(rows):
+    return {key: [row[key] for row in rows] for key in rows[0]}
+
+
+class TestFeatureFrameParity(unittest.TestCase):
+    """Parité _build_feature_frame / traitement ligne à ligne"""
+
+    def assert_parity(self, rows, source_type, process):
+        expected_features, expected_stats = process(rows)
+        frame, stats = _build_feature_frame(_to_columns(rows), source_type)
+
+        self.assertEqual(stats, expected_stats)
+        self.assertEqual(list(frame.columns), FEATURE_COLUMNS)
+
+        records = frame.to_dict("records")
+        self.assertEqual(len(records), len(expected_features))
+        for record, feature in zip(records, expected_features):
+            self.assertEqual(record, feature.model_dump(), msg=feature.source_id)
+
+    def test_transactions(self):
+        rng = random.Random(7)
+        rows = [_random_transaction(rng, i) for i in range(3000)]
+        self.assert_parity(rows, "transaction", _process_transactions)
+
+    def test_listings(self):
+        rng = random.Random(11)
+        rows = [_random_listing(rng, i) for i in range(3000)]
+        self.assert_parity(rows, "listing", _process_listings)
+
+    def test_empty_batch(self):
+        frame, stats = _build_feature_frame({}, "transaction")
+
+        self.assertTrue(frame.empty)
+        self.assertEqual(stats["total"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,53 @@
+"""
+Tests de l'index trigrammes des noms de lieux (core.location_index)
+"""
+import unittest
+
+from core.location_index import TrigramIndex, trigrams
+
+
+AREAS = [
+    "Jumeirah Village Circle",
+    "Jumeirah Village Triangle",
+    "Dubai Marina",
+    "Al Barsha",
+    "Al Barsha South",
+    "Downtown Dubai",
+]
+
+
+class TestTrigramIndex(unittest.TestCase):
+
+    def setUp(self):
+        entries = [(name, "area") for name in AREAS]
+        entries += [("Marina Gate", "project"), ("Marina Gate Tower 1", "building")]
+        self.index = TrigramIndex(entries)
+
+    def test_trigrams_ignore_case_and_separators(self):
+        self.assertEqual(trigrams("Al-Barsha"), trigrams("al  barsha"))
+
+    def test_exact_name_scores_one(self):
+        self.assertEqual(self.index.search("dubai marina", k=1), [("Dubai Marina", 1.0, "area")])
+
+    def test_misspelling_ranks_first(self):
+        results = self.index.search("Jumeira Village Circle", k=3)
+        self.assertEqual(results[0][0], "Jumeirah Village Circle")
+        self.assertEqual([score for _, score, _ in results], sorted((s for _, s, _ in results), reverse=True))
+
+    def test_level_filter(self):
+        self.assertEqual(self.index.search("marina gate", k=5, level="project"), [("Marina Gate", 1.0, "project")])
+        self.assertEqual(self.index.search("marina", level="unknown"), [])
+
+    def test_best_threshold_and_margin(self):
+        self.assertEqual(self.index.best("Barsha South", min_similarity=0.6, min_margin=0.1), "Al Barsha South")
+        self.assertIsNone(self.index.best("Nowhere Land", min_similarity=0.6))
+        # Circle et Triangle sont trop proches pour trancher
+        self.assertIsNone(self.index.best("Jumeirah Village", level="area", min_similarity=0.5, min_margin=0.1))
+
+    def test_duplicates_are_indexed_once(self):
+        index = TrigramIndex([("Dubai Marina", "area"), ("dubai-marina", "area")])
+        self.assertEqual(len(index), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
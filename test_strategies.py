@@ -0,0 +1,115 @@
+"""
+Tests de parité du scoring vectorisé (strategies.vectorized)
+
+Compare score_batch aux stratégies scalaires FlipStrategy, RentStrategy
+et LongTermStrategy sur des opportunités générées aléatoirement, en
+incluant les valeurs aux seuils et les KPIs absents.
+"""
+import random
+import unittest
+
+from core.models import KPIContext
+from strategies.flip import FlipStrategy
+from strategies.rent import RentStrategy
+from strategies.long_term import LongTermStrategy
+from strategies.vectorized import GLOBAL_WEIGHTS, build_score_frame, score_batch
+
+
+REGIMES = ['ACCUMULATION', 'EXPANSION', 'DISTRIBUTION', 'RETOURNEMENT', 'NEUTRAL', None]
+RISK_LEVELS = ['LOW', 'MEDIUM', 'HIGH', 'UNKNOWN']
+
+
+def _maybe(rng, values):
+    """Valeur tirée dans values, ou None (KPI absent)"""
+    return None if rng.random() < 0.2 else rng.choice(values)
+
+
+def _random_case(rng):
+    """Générer un couple (opportunité, contexte) avec KPIContext préchargé"""
+    opportunity = {
+        'community': 'Dubai Marina',
+        'rooms_bucket': '1BR',
+        'discount_pct': rng.choice([0, 5, 10, 15.5, 20, 25, 30, 42]),
+        'price_per_sqft': rng.choice([0, 800, 1000, 1250.5, 1600, 2500]),
+    }
+
+    context = {
+        'regime': rng.choice(REGIMES),
+        'supply_risk': rng.choice(['low', 'medium', 'high']),
+        'kpi_context': KPIContext(
+            tls=_maybe(rng, [-0.1, 0, 0.05, 0.07, 0.10, 0.15, 0.3]),
+            lad=_maybe(rng, [-1.0, 0.5, 3.0, 5.0, 8.0]),
+            rsg=_maybe(rng, [-0.3, -0.20, -0.15, -0.1, -0.05, 0.05, 0.1, 0.15, 0.2]),
+            spi=_maybe(rng, [10.0, 50.0, 80.0, 95.0]),
+            gpi=_maybe(rng, [20.0, 40.0, 60.0, 79.9, 80.0]),
+            rcwm=_maybe(rng, [-0.1, -0.05, -0.02, 0.01, 0.02, 0.05, 0.08]),
+            ord=_maybe(rng, [-0.1, 0.1, 0.15, 0.2]),
+            aps=_maybe(rng, [0.05, 0.1, 0.3, 0.5, 0.7, 0.9]),
+            supply_risk=rng.choice(RISK_LEVELS),
+            volatility_risk=rng.choice(RISK_LEVELS),
+        ),
+    }
+
+    if rng.random() < 0.85:
+        context['baseline'] = {
+            'transaction_count': rng.choice([0, 3, 5, 8, 10, 15, 20, 40]),
+            'momentum': _maybe(rng, [-0.1, -0.05, -0.02, 0, 0.03, 0.05, 0.08, 0.10, 0.2]),
+            'volatility': _maybe(rng, [0, 0.03, 0.05, 0.10, 0.12, 0.15, 0.20, 0.22, 0.25, 0.3]),
+        }
+
+    return opportunity, context
+
+
+class TestVectorizedParity(unittest.TestCase):
+    """Parité score_batch / stratégies scalaires"""
+
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(42)
+        cls.cases = [_random_case(rng) for _ in range(2000)]
+        frame = build_score_frame(
+            [opportunity for opportunity, _ in cls.cases],
+            [context for _, context in cls.cases]
+        )
+        cls.result = score_batch(frame)
+
+    def test_strategy_scores_match_scalar(self):
+        """Les trois scores par stratégie sont identiques au chemin scalaire"""
+        strategies = {
+            'flip_score': FlipStrategy(),
+            'rent_score': RentStrategy(),
+            'long_term_score': LongTermStrategy(),
+        }
+
+        for i, (opportunity, context) in enumerate(self.cases):
+            for column, strategy in strategies.items():
+                expected = strategy.score(opportunity, context)
+                self.assertAlmostEqual(
+                    self.result[column].iloc[i], expected, places=9,
+                    msg=f"{column} cas {i} : {opportunity} {context}"
+                )
+
+    def test_global_score_and_recommendation(self):
+        """Score global et recommandation identiques à compute_scores"""
+        for i, (opportunity, context) in enumerate(self.cases):
+            scores_map = {
+                'FLIP': FlipStrategy().score(opportunity, context),
+                'RENT': RentStrategy().score(opportunity, context),
+                'LONG': LongTermStrategy().score(opportunity, context),
+            }
+            global_score = sum(scores_map[key] * GLOBAL_WEIGHTS[key] for key in scores_map)
+            recommended = max(scores_map, key=scores_map.get) if global_score >= 40 else 'IGNORE'
+
+            self.assertAlmostEqual(self.result['global_score'].iloc[i], global_score, places=9)
+            self.assertEqual(self.result['recommended_strategy'].iloc[i], recommended)
+
+    def test_custom_weights(self):
+        """Les pondérations personnalisées s'appliquent au score global"""
+        frame = build_score_frame([self.cases[0][0]], [self.cases[0][1]])
+        result = score_batch(frame, weights={'FLIP': 1.0, 'RENT': 0.0, 'LONG': 0.0})
+
+        self.assertAlmostEqual(result['global_score'].iloc[0], result['flip_score'].iloc[0])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)